@@ -0,0 +1,106 @@
+"""Throughput, memory and token-limit compliance of the chunkers.
+
+Every benchmark records, next to pytest-benchmark's timings, the throughput in
+MB/s and chunks/s, the peak traced memory of one run, the fraction of chunks
+within MAX_CHUNK_SIZE_TOKENS and the number of chunks over it. `--benchmark-json`
+writes all of it to a JSON file that can be compared between runs with
+`pytest-benchmark compare`.
+
+The text chunker benchmarks time the public `create_chunks`, i.e. with TextChunk
+construction, token counting and validation. Validation rejects chunks over the
+token limit, so compliance is measured beforehand, in a pass that is not timed,
+on the chunk contents of the same settings. Settings whose chunks are over the
+limit are skipped, with the violations in the skip reason.
+
+Usage:
+    pytest benchmarks/bench_chunkers.py --corpus-mb 4 --benchmark-json results.json
+"""
+import tracemalloc
+from typing import Callable, Dict, List
+
+import pytest
+
+from fastchain.chunker.code_chunker import CodeChunker
+from fastchain.chunker.text_chunker import TextChunker
+from fastchain.constants import MAX_CHUNK_SIZE_TOKENS
+from fastchain.tokenizer import count_tokens_batch
+
+ROUNDS = 3
+
+
+def token_limit_compliance(contents: List[str]) -> Dict[str, float]:
+    """Fraction and number of chunk contents over MAX_CHUNK_SIZE_TOKENS, and the largest chunk."""
+    num_tokens = count_tokens_batch(contents)
+    num_violations = sum(count > MAX_CHUNK_SIZE_TOKENS for count in num_tokens)
+    return {
+        "token_limit_compliance": 1 - num_violations / len(contents) if contents else 1.0,
+        "token_limit_violations": num_violations,
+        "max_chunk_tokens": max(num_tokens, default=0),
+    }
+
+
+def run_benchmark(benchmark, run: Callable[[], List], corpus_bytes: int) -> List:
+    """Benchmark `run` and attach throughput and peak memory metrics."""
+    chunks = benchmark.pedantic(run, rounds=ROUNDS, iterations=1)
+    mean = benchmark.stats.stats.mean
+
+    # Traced separately, tracemalloc slows down the timed runs
+    tracemalloc.start()
+    run()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    benchmark.extra_info.update(
+        {
+            "corpus_mb": corpus_bytes / (1024 * 1024),
+            "mb_per_s": corpus_bytes / (1024 * 1024) / mean,
+            "chunks_per_s": len(chunks) / mean,
+            "num_chunks": len(chunks),
+            "peak_memory_mb": peak_memory / (1024 * 1024),
+        }
+    )
+    return chunks
+
+
+@pytest.mark.parametrize("corpus", ["prose", "logs"])
+@pytest.mark.parametrize("subdivide_strategy", ["character", "words", "tokens"])
+def test_text_chunker(benchmark, request, corpus, subdivide_strategy):
+    text = request.getfixturevalue(corpus)
+
+    # Not timed, the contents of the chunks create_chunks builds, without validating them
+    chunker = TextChunker(subdivide_strategy=subdivide_strategy)
+    compliance = token_limit_compliance(
+        [text[start:end] for start, end, _ in chunker._chunk_spans(text)]
+    )
+    benchmark.extra_info.update(compliance)
+    if subdivide_strategy == "tokens":
+        assert compliance["token_limit_violations"] == 0
+    if compliance["token_limit_violations"]:
+        pytest.skip(
+            f"{compliance['token_limit_violations']} chunks over MAX_CHUNK_SIZE_TOKENS "
+            f"({compliance['max_chunk_tokens']} tokens at most), create_chunks rejects them"
+        )
+
+    def run():
+        # A new chunker every round, TextChunker accumulates its chunks
+        return list(TextChunker(subdivide_strategy=subdivide_strategy).create_chunks(text))
+
+    assert run_benchmark(benchmark, run, len(text.encode("utf-8")))
+
+
+def test_code_chunker(benchmark, source_tree, grammar_cache_dir):
+    def run():
+        chunker = CodeChunker(
+            source_tree, max_chunk_size=1500, coalesce=50, grammar_cache_dir=grammar_cache_dir
+        )
+        return list(chunker.create_chunks().chunks)
+
+    try:
+        run()
+    except FileNotFoundError as error:
+        pytest.skip(str(error))
+
+    corpus_bytes = sum(len(content.encode("utf-8")) for content in source_tree.values())
+    chunks = run_benchmark(benchmark, run, corpus_bytes)
+    assert chunks
+    benchmark.extra_info.update(token_limit_compliance([chunk.content for chunk in chunks]))
@@ -0,0 +1,83 @@
+"""Benchmark the "words" subdivide strategy of TextChunker against the previous
+implementation.
+
+Usage:
+    python benchmarks/bench_text_chunker_words.py --size-mb 10
+    python benchmarks/bench_text_chunker_words.py --size-mb 1 --length-function tokens
+"""
+import argparse
+import time
+from typing import Callable, List
+
+from fastchain.chunker.text_chunker import TextChunker
+from fastchain.chunker.utils import num_tokens_from_string
+from fastchain.constants import DEFAULT_CHUNK_OVERLAP_SIZE, DEFAULT_CHUNK_SIZE
+
+from corpus import generate_prose
+
+
+def legacy_words_chunks(
+    text: str, chunk_size: int, chunk_overlap: int, length_function: Callable = len
+) -> List[str]:
+    """The words strategy as it was before the prefix-sum rewrite."""
+    chunks = []
+    words = text.split()
+    num_words = len(words)
+
+    end = 1
+    chunk_text = words[0]
+    last_word_added = words[0]
+
+    while end < num_words:
+        last_word_added = words[end]
+        chunk_text += words[end] + " "
+
+        if length_function(chunk_text) >= chunk_size:
+            chunk_text = chunk_text[: -len(last_word_added)].strip()
+            chunks.append(chunk_text)
+            chunk_text = chunk_text[-chunk_overlap:] + " "
+            continue
+        end += 1
+
+    return chunks
+
+
+def words_chunks(chunker: TextChunker, text: str) -> List[str]:
+    """The words strategy of TextChunker without building TextChunk objects."""
+    return [text[start:end] for start, end, _ in chunker._chunk_spans(text)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=10)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=DEFAULT_CHUNK_OVERLAP_SIZE)
+    parser.add_argument("--length-function", choices=["len", "tokens"], default="len")
+    args = parser.parse_args()
+
+    length_function = len if args.length_function == "len" else num_tokens_from_string
+    text = generate_prose(int(args.size_mb * 1024 * 1024))
+    chunker = TextChunker(
+        text_chunk_size=args.chunk_size,
+        text_chunk_overlap=args.chunk_overlap,
+        text_length_function=length_function,
+    )
+
+    for name, run in [
+        (
+            "legacy",
+            lambda: legacy_words_chunks(text, args.chunk_size, args.chunk_overlap, length_function),
+        ),
+        ("prefix-sum", lambda: words_chunks(chunker, text)),
+    ]:
+        start = time.perf_counter()
+        chunks = run()
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>10}: {elapsed:8.3f}s  {args.size_mb / elapsed:8.2f} MB/s  "
+            f"{len(chunks)} chunks"
+        )
+
+
+if __name__ == "__main__":
+    main()
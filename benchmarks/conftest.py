@@ -0,0 +1,44 @@
+"""Fixtures of the chunking benchmark suite.
+
+Usage:
+    pytest benchmarks/bench_chunkers.py --corpus-mb 4 --benchmark-json results.json
+"""
+import pytest
+
+from corpus import generate_logs, generate_prose, generate_source_tree
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--corpus-mb", type=float, default=1, help="Size of every synthetic corpus in MB"
+    )
+    parser.addoption(
+        "--grammar-cache-dir",
+        default=None,
+        help="Directory of the compiled tree-sitter grammars used by the CodeChunker benchmarks",
+    )
+
+
+@pytest.fixture(scope="session")
+def corpus_size(request) -> int:
+    return int(request.config.getoption("--corpus-mb") * 1024 * 1024)
+
+
+@pytest.fixture(scope="session")
+def prose(corpus_size) -> str:
+    return generate_prose(corpus_size)
+
+
+@pytest.fixture(scope="session")
+def logs(corpus_size) -> str:
+    return generate_logs(corpus_size)
+
+
+@pytest.fixture(scope="session")
+def source_tree(corpus_size):
+    return generate_source_tree(corpus_size)
+
+
+@pytest.fixture(scope="session")
+def grammar_cache_dir(request):
+    return request.config.getoption("--grammar-cache-dir")
@@ -0,0 +1,141 @@
+"""Deterministic synthetic corpora for the chunking benchmarks.
+
+Every generator is seeded, so a given size and seed always produce the same
+text and benchmark results stay comparable across runs and machines.
+"""
+import random
+from typing import Dict, List
+
+LOG_LEVELS = ["DEBUG", "INFO", "INFO", "INFO", "WARNING", "ERROR"]
+LOG_COMPONENTS = ["api.gateway", "auth.session", "db.pool", "worker.queue", "cache.redis"]
+
+
+def _vocabulary(rng: random.Random, size: int = 5000) -> List[str]:
+    return [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(1, 12)))
+        for _ in range(size)
+    ]
+
+
+def generate_prose(size_bytes: int, seed: int = 0) -> str:
+    """Prose-like text of roughly `size_bytes`, with sentences and paragraphs."""
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng)
+    words, size = [], 0
+    while size < size_bytes:
+        word = rng.choice(vocabulary)
+        if rng.random() < 0.08:
+            word += rng.choice([".", ",", ".\n", "\n\n"])
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def generate_logs(size_bytes: int, seed: int = 0) -> str:
+    """Application logs of roughly `size_bytes`, with occasional stack traces."""
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng, 500)
+    lines, size = [], 0
+    second = 0
+    while size < size_bytes:
+        second += rng.randint(0, 3)
+        level = rng.choice(LOG_LEVELS)
+        message = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(4, 16)))
+        line = (
+            f"2024-01-01T{second // 3600 % 24:02d}:{second // 60 % 60:02d}:{second % 60:02d}Z "
+            f"{level:<7} [{rng.choice(LOG_COMPONENTS)}] request_id={rng.getrandbits(64):016x} {message}"
+        )
+        if level == "ERROR":
+            line += "\nTraceback (most recent call last):\n" + "".join(
+                f'  File "/srv/app/{rng.choice(vocabulary)}.py", line {rng.randint(1, 900)}, in {rng.choice(vocabulary)}\n'
+                for _ in range(rng.randint(2, 6))
+            ) + f"ValueError: {rng.choice(vocabulary)}"
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+_SOURCE_TEMPLATES = {
+    "py": (
+        "def {name}(value, count={n}):\n"
+        "    \"\"\"{doc}\"\"\"\n"
+        "    total = 0\n"
+        "    for i in range(count):\n"
+        "        if i % {m} == 0:\n"
+        "            total += value * i\n"
+        "    return total\n\n\n"
+    ),
+    "go": (
+        "// {name} {doc}\n"
+        "func {name}(value int) int {{\n"
+        "\ttotal := 0\n"
+        "\tfor i := 0; i < {n}; i++ {{\n"
+        "\t\tif i%{m} == 0 {{\n"
+        "\t\t\ttotal += value * i\n"
+        "\t\t}}\n"
+        "\t}}\n"
+        "\treturn total\n"
+        "}}\n\n"
+    ),
+    "java": (
+        "    /** {doc} */\n"
+        "    public static int {name}(int value) {{\n"
+        "        int total = 0;\n"
+        "        for (int i = 0; i < {n}; i++) {{\n"
+        "            if (i % {m} == 0) {{\n"
+        "                total += value * i;\n"
+        "            }}\n"
+        "        }}\n"
+        "        return total;\n"
+        "    }}\n\n"
+    ),
+    "rs": (
+        "/// {doc}\n"
+        "fn {name}(value: i64) -> i64 {{\n"
+        "    let mut total = 0;\n"
+        "    for i in 0..{n} {{\n"
+        "        if i % {m} == 0 {{\n"
+        "            total += value * i;\n"
+        "        }}\n"
+        "    }}\n"
+        "    total\n"
+        "}}\n\n"
+    ),
+    "cpp": (
+        "// {doc}\n"
+        "int {name}(int value) {{\n"
+        "    int total = 0;\n"
+        "    for (int i = 0; i < {n}; ++i) {{\n"
+        "        if (i % {m} == 0) {{\n"
+        "            total += value * i;\n"
+        "        }}\n"
+        "    }}\n"
+        "    return total;\n"
+        "}}\n\n"
+    ),
+}
+
+
+def generate_source_tree(size_bytes: int, seed: int = 0, file_size: int = 8192) -> Dict[str, str]:
+    """Multi-language source files of roughly `size_bytes` in total, by file path."""
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng, 2000)
+    files, size = {}, 0
+    while size < size_bytes:
+        extension = rng.choice(sorted(_SOURCE_TEMPLATES))
+        functions, file_bytes = [], 0
+        while file_bytes < file_size:
+            function = _SOURCE_TEMPLATES[extension].format(
+                name=f"{rng.choice(vocabulary)}_{len(functions)}",
+                doc=" ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 12))),
+                n=rng.randint(1, 1000),
+                m=rng.randint(2, 9),
+            )
+            functions.append(function)
+            file_bytes += len(function)
+        content = "".join(functions)
+        if extension == "java":
+            content = "public class Generated {\n" + content + "}\n"
+        files[f"src/module_{len(files)}.{extension}"] = content
+        size += len(content)
+    return files
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Type, Callable, Optional
+from bisect import bisect_right
+from typing import List, Type, Callable, Optional, Union
 from pydantic import BaseModel, Field, ValidationError, validator
 from enum import Enum
 
@@ -42,10 +43,14 @@ class Chunker(ABC):
             List[str]: List of splitted strings with separator attached to the previous string
         """
         splitted_strings = re.split(f"({separator})", text)
-        return [
+        splits = [
             "".join(x)
             for x in zip(splitted_strings[0::2], splitted_strings[1::2])
         ]
+        # Keep the text after the last separator
+        if splitted_strings[-1]:
+            splits.append(splitted_strings[-1])
+        return splits
 
     def _postprocess_chunks(self, chunks: List[str]) -> List[str]:
         """Post process and validate chunks."""
@@ -61,11 +66,53 @@ class Chunker(ABC):
         return text.split(separator)
 
 
+# Line breaks recognized by bytes.splitlines()
+_LINE_BREAK = re.compile(rb"\r\n|\r|\n")
+
+
+class LineIndex:
+    """Byte offsets of the start of every line of a file, built once per file.
+
+    Converting a byte offset to a line number and extracting a range of lines
+    are both O(log n) lookups instead of re-splitting the whole file.
+
+    Args:
+        source (Union[bytes, str]): File content, strings are encoded with `encoding`
+        encoding (str): Encoding of the file
+    """
+
+    def __init__(self, source: Union[bytes, str], encoding: str = "utf-8"):
+        self.data = source.encode(encoding) if isinstance(source, str) else source
+        self.encoding = encoding
+        self.line_starts = [0] + [match.end() for match in _LINE_BREAK.finditer(self.data)]
+        # The end of the file starts the line after the last one
+        if self.line_starts[-1] != len(self.data):
+            self.line_starts.append(len(self.data))
+
+    @property
+    def num_lines(self) -> int:
+        return len(self.line_starts) - 1
+
+    def line_number(self, offset: int) -> int:
+        """0-based number of the line containing the byte at `offset`."""
+        return bisect_right(self.line_starts, offset) - 1
+
+    def extract(self, start: int, end: int) -> str:
+        """Lines start to end (exclusive) joined by "\\n", like Span.extract."""
+        start = min(start, self.num_lines)
+        end = max(start, min(end, self.num_lines))
+        lines = self.data[self.line_starts[start] : self.line_starts[end]]
+        return "\n".join(lines.decode(self.encoding).splitlines())
+
+
 class Span(BaseModel):
     start: int
     end: int
 
-    def extract(self, s: str) -> str:
+    def extract(self, s: str, line_index: Optional[LineIndex] = None) -> str:
+        """Lines start to end (exclusive) of `s`, looked up in `line_index` when given."""
+        if line_index is not None:
+            return line_index.extract(self.start, self.end)
         return "\n".join(s.splitlines()[self.start : self.end])
 
     def __add__(self, other):
@@ -1,15 +1,17 @@
 from __future__ import annotations
 from tree_sitter import Node
 import os
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
 import subprocess
 from docarray.array import DocList
 
-from typing import Dict
-from fastchain.chunker.base import Chunker, Span
-from tree_sitter import Parser, Language
-from dataclasses import dataclass
-from fastchain.chunker.utils import read_file_content
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from fastchain.chunker.base import Chunker, LineIndex, Span
+from fastchain.chunker.grammars import extension_to_language, get_grammar_registry
+from tree_sitter import Parser, Language, Tree
+from dataclasses import dataclass, field
+from fastchain.chunker.utils import non_whitespace_prefix_sums, read_file_content
 from fastchain.document.chunk.schema import CodeChunk
 from fastchain.document.base import Document, Page, Metadata, Chunk
 
@@ -42,18 +44,7 @@ class ProgrammingLanguage(str, Enum):
     CSHARP = "csharp"
 
 
-extension_to_language = {
-    "mjs": "tsx",
-    "py": "python",
-    "rs": "rust",
-    "go": "go",
-    "java": "java",
-    "cpp": "cpp",
-}
-
-import os
 import re
-import subprocess
 
 
 def count_length_without_whitespace(s: str):
@@ -61,12 +52,87 @@ def count_length_without_whitespace(s: str):
     return len(string_without_whitespace)
 
 
+def _edit_range(old: bytes, new: bytes) -> Tuple[int, int, int]:
+    """Smallest single edit turning `old` into `new`, as (start, old_end, new_end).
+
+    The common prefix and suffix are found by binary search on slice equality,
+    which compares in C instead of looping over bytes.
+    """
+    low, high = 0, min(len(old), len(new))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if old[:mid] == new[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    prefix = low
+
+    low, high = 0, min(len(old), len(new)) - prefix
+    while low < high:
+        mid = (low + high + 1) // 2
+        if old[len(old) - mid :] == new[len(new) - mid :]:
+            low = mid
+        else:
+            high = mid - 1
+    suffix = low
+
+    return prefix, len(old) - suffix, len(new) - suffix
+
+
+def _point(source: bytes, offset: int) -> Tuple[int, int]:
+    """tree-sitter (row, column) of a byte offset."""
+    row = source.count(b"\n", 0, offset)
+    return row, offset - (source.rfind(b"\n", 0, offset) + 1)
+
+
+class _CodeSpan(NamedTuple):
+    """A chunk of a file, by byte offsets and 0-based lines, the ends excluded."""
+
+    start_byte: int
+    end_byte: int
+    start_line: int
+    end_line: int
+    content: str
+
+
+@dataclass
+class _FileState:
+    """What CodeChunker keeps of a chunked file to re-chunk it incrementally."""
+
+    source: bytes
+    # None when the file was chunked in a worker process
+    tree: Optional[Tree]
+    # Byte ranges of the chunks of the file
+    ranges: List[Tuple[int, int]]
+    # Ids of the chunks of the file, in `ranges` order
+    chunk_ids: List[str] = field(default_factory=list)
+
+
+@dataclass
+class CodeChunkUpdate:
+    """Changes to the chunks of a file re-chunked by CodeChunker.update_chunks.
+
+    Chunks that are not listed are unchanged, only moved when the edit came
+    before them, and keep their id.
+    """
+
+    # New or changed chunks, with their byte offsets and lines in the new content
+    chunks: List[CodeChunk]
+    # Previous chunks that no longer exist, as (chunk id, start byte, end byte) in
+    # the previous content
+    removed: List[Tuple[str, int, int]]
+
+
 class CodeChunker(Chunker):
     def __init__(
-        self, content_dict: Dict, max_chunk_size: int = 20, coalesce: int = 5
+        self,
+        content_dict: Dict,
+        max_chunk_size: int = 20,
+        coalesce: int = 5,
+        grammar_cache_dir: Optional[str] = None,
     ):
-        self.parser = None
-        self.language = None
+        self.grammars = get_grammar_registry(grammar_cache_dir)
+        self._file_states: Dict[str, _FileState] = {}
         self.content_dict = content_dict
         self.max_chunk_size = max_chunk_size
         self.coalesce = coalesce
@@ -74,7 +140,7 @@ class CodeChunker(Chunker):
 
 
     def chunker(
-        self, tree, source_code_bytes, max_chunk_size=512 * 3, coalesce=50
+        self, tree, source_code_bytes, max_chunk_size=512 * 3, coalesce=50, line_index=None
     ):
         # Recursively form chunks with a maximum chunk size of max_chunk_size
         # https://github.com/sweepai/sweep/blob/b267b613d4c706eaf959fe6789f11e9a856521d1/sweepai/utils/utils.py#L81
@@ -102,37 +168,32 @@ class CodeChunker(Chunker):
 
         chunks = chunker_helper(tree.root_node, source_code_bytes)
 
-        # removing gaps
-        for prev, curr in zip(chunks[:-1], chunks[1:]):
-            prev.end = curr.start
+        # removing gaps: every chunk ends where the next one starts, so the chunks
+        # are fully described by their boundaries
+        boundaries = [0] + [chunk.start for chunk in chunks[1:]] + [chunks[-1].end if chunks else 0]
+        non_whitespace_prefix, newline_prefix = non_whitespace_prefix_sums(source_code_bytes)
+        non_whitespace = non_whitespace_prefix[boundaries].tolist()
+        newlines = newline_prefix[boundaries].tolist()
 
-        # combining small chunks with bigger ones
+        # combining small chunks with bigger ones, in a single pass with O(1) checks
         new_chunks = []
-        i = 0
-        current_chunk = Span(start=0, end=0)
-        while i < len(chunks):
-            current_chunk += chunks[i]
-            if count_length_without_whitespace(
-                source_code_bytes[
-                    current_chunk.start : current_chunk.end
-                ].decode("utf-8")
-            ) > coalesce and "\n" in source_code_bytes[
-                current_chunk.start : current_chunk.end
-            ].decode(
-                "utf-8"
+        first = 0
+        for last in range(1, len(boundaries)):
+            if (
+                non_whitespace[last] - non_whitespace[first] > coalesce
+                and newlines[last] > newlines[first]
             ):
-                new_chunks.append(current_chunk)
-                current_chunk = Span(start=chunks[i].end, end=chunks[i].end)
-            i += 1
-        if len(current_chunk) > 0:
-            new_chunks.append(current_chunk)
+                new_chunks.append(Span(start=boundaries[first], end=boundaries[last]))
+                first = last
+        if boundaries[-1] > boundaries[first]:
+            new_chunks.append(Span(start=boundaries[first], end=boundaries[-1]))
 
+        if line_index is None:
+            line_index = LineIndex(source_code_bytes)
         line_chunks = [
             Span(start=
-                self._get_line_number(
-                    chunk.start, source_code=source_code_bytes
-                ),
-                end=self._get_line_number(chunk.end, source_code=source_code_bytes),
+                self._get_line_number(chunk.start, line_index=line_index),
+                end=self._get_line_number(chunk.end, line_index=line_index),
             )
             for chunk in new_chunks
         ]
@@ -140,88 +201,60 @@ class CodeChunker(Chunker):
 
         return line_chunks
 
-    def _get_line_number(self, index: int, source_code: str) -> int:
-        # optimized, use binary search
-        lines = source_code.splitlines(keepends=True)
-        left, right = 0, len(lines)
-        total_chars = 0
-        while left < right:
-            mid = (left + right) // 2
-            if total_chars + len(lines[mid]) > index:
-                right = mid
-            else:
-                total_chars += len(lines[mid])
-                left = mid + 1
-        return left
-
-    def create_chunks(self):
-        # Get the file extension
-        file_list = self.content_dict.keys()
-        ext_list = [os.path.splitext(file)[1][len(".") :] for file in file_list]
-        ext_list = set(extension_to_language.keys()).intersection(set(ext_list))
-        unique_file_extensions = ext_list 
-
-        # Get the language
-        languages = [
-            extension_to_language[ext] for ext in unique_file_extensions
+    def _get_line_number(self, index: int, line_index: LineIndex) -> int:
+        return line_index.line_number(index)
+
+    def create_chunks(self, workers: Optional[int] = None):
+        """Chunk every file of `content_dict` into a Document with one page per file.
+
+        Args:
+            workers (Optional[int]): Number of worker processes to spread the files
+                across. By default files are chunked in this process, which also
+                keeps their syntax trees so `update_chunks` can reparse them
+                incrementally.
+        """
+        files = [
+            (file, content)
+            for file, content in self.content_dict.items()
+            # Files are parsed with the grammar of their own language
+            if self.grammars.language_for_file(file) is not None
         ]
 
-        try:
-            print("Trying to load languages from library")
-            languages_dict = {
-                lang: Language(f"/tmp/{lang}.so", lang) for lang in languages
-            }
-        except:
-            print("Building languages from source")
-
-            for lang in languages:
-                subprocess.run(
-                    f"git clone https://github.com/tree-sitter/tree-sitter-{lang} cache/tree-sitter-{lang}",
-                    shell=True,
-                )
-
-                Language.build_library(
-                    f"cache/build/{lang}.so", [f"cache/tree-sitter-{lang}"]
+        workers = min(workers or 1, max(len(files), 1))
+        if workers == 1:
+            file_chunks = [self._chunk_file(file, content) for file, content in files]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_code_chunk_worker,
+                initargs=(self.max_chunk_size, self.coalesce, self.grammars.cache_dir),
+            ) as executor:
+                file_chunks = list(
+                    executor.map(
+                        _chunk_code_file,
+                        *zip(*files),
+                        chunksize=max(1, len(files) // (4 * workers)),
+                    )
                 )
-                subprocess.run(
-                    f"cp cache/build/{lang}.so /tmp/{lang}.so", shell=True
-                )  # copying for executability
+            for (file, content), spans in zip(files, file_chunks):
+                ranges = [(span.start_byte, span.end_byte) for span in spans]
+                self._file_states[file] = _FileState(bytes(content, "utf8"), None, ranges)
 
-            languages_dict = {
-                lang: Language(f"/tmp/{lang}.so", lang) for lang in languages
-            }
-
-        parser = Parser()
-        for lang in languages:
-            parser.set_language(languages_dict[lang])
-
-        
         self.pages = DocList()
         all_chunks = DocList()
         meta_data = Metadata()
         document  = Document(metadata=meta_data, pages=None)
-        
 
-        for ids, (file, content) in enumerate(self.content_dict):
+        for ids, ((file, _), spans) in enumerate(zip(files, file_chunks)):
             self.chunks = DocList()
 
-            # file_content = read_file_content(file)
-            code_byte = bytes(content, "utf8")
-
-            tree = parser.parse(code_byte)
-            spans = self.chunker(
-                tree,
-                code_byte,
-                max_chunk_size=self.max_chunk_size,
-                coalesce=self.coalesce,
-            )
-
             for span in spans:
-                chnk=CodeChunk(content=span.extract(content))
+                chnk = self._make_chunk(file, span)
                 all_chunks.append(chnk)
                 self.chunks.append(
                     chnk
                 )
+            self._file_states[file].chunk_ids = [str(chunk.id) for chunk in self.chunks]
 
             self.pages.append(
                 Page(page_info=file, doc_id=str(ids), chunks=self.chunks)
@@ -230,3 +263,167 @@ class CodeChunker(Chunker):
         document.chunks = all_chunks
         document.pages = self.pages
         return document
+
+    def update_chunks(self, content_dict: Dict) -> Dict[str, CodeChunkUpdate]:
+        """Re-chunk changed files incrementally.
+
+        Unchanged files are skipped. A changed file chunked before in this process
+        gets its previous tree edited and reparsed incrementally. Only the chunks
+        that intersect the changed ranges, or that did not exist before, are
+        emitted, along with the previous chunks they replace.
+
+        Args:
+            content_dict (Dict): New content of the files, by file path
+
+        Returns:
+            Dict[str, CodeChunkUpdate]: New or changed chunks, and removed chunks,
+                of every changed file
+        """
+        updates = {}
+        for file, content in content_dict.items():
+            if self.grammars.language_for_file(file) is None:
+                continue
+            code_byte = bytes(content, "utf8")
+            state = self._file_states.get(file)
+            if state is not None and state.source == code_byte:
+                continue
+
+            self.content_dict[file] = content
+            tree, edit, changed_ranges = self._parse(file, code_byte)
+            spans = self._chunk_tree(tree, content, code_byte)
+
+            # Ids of the previous chunks outside of the edit, by range in the new source
+            kept = {}
+            if state is not None:
+                start, old_end, new_end = edit
+                shift = new_end - old_end
+                for (chunk_start, chunk_end), chunk_id in zip(state.ranges, state.chunk_ids):
+                    if chunk_end <= start:
+                        kept[(chunk_start, chunk_end)] = chunk_id
+                    elif chunk_start >= old_end:
+                        kept[(chunk_start + shift, chunk_end + shift)] = chunk_id
+
+            chunks, chunk_ids = [], []
+            for span in spans:
+                chunk_id = kept.pop((span.start_byte, span.end_byte), None)
+                if chunk_id is None or any(
+                    span.start_byte <= changed_end and changed_start <= span.end_byte
+                    for changed_start, changed_end in changed_ranges
+                ):
+                    chunk = self._make_chunk(file, span)
+                    chunks.append(chunk)
+                    chunk_id = str(chunk.id)
+                chunk_ids.append(chunk_id)
+
+            removed = []
+            if state is not None:
+                remaining = set(chunk_ids)
+                removed = [
+                    (chunk_id, chunk_start, chunk_end)
+                    for (chunk_start, chunk_end), chunk_id in zip(state.ranges, state.chunk_ids)
+                    if chunk_id not in remaining
+                ]
+            self._file_states[file] = _FileState(
+                code_byte, tree, [(span.start_byte, span.end_byte) for span in spans], chunk_ids
+            )
+            updates[file] = CodeChunkUpdate(chunks, removed)
+        return updates
+
+    @staticmethod
+    def _make_chunk(file: str, span: _CodeSpan) -> CodeChunk:
+        return CodeChunk(
+            content=span.content,
+            file_path=file,
+            start_byte=span.start_byte,
+            end_byte=span.end_byte,
+            start_line=span.start_line,
+            end_line=span.end_line,
+        )
+
+    def _chunk_file(self, file: str, content: str) -> List[_CodeSpan]:
+        """Parse and chunk a file, reusing its previous tree when there is one."""
+        code_byte = bytes(content, "utf8")
+        tree, _, _ = self._parse(file, code_byte)
+        spans = self._chunk_tree(tree, content, code_byte)
+        self._file_states[file] = _FileState(
+            code_byte, tree, [(span.start_byte, span.end_byte) for span in spans]
+        )
+        return spans
+
+    def _parse(
+        self, file: str, code_byte: bytes
+    ) -> Tuple[Tree, Optional[Tuple[int, int, int]], List[Tuple[int, int]]]:
+        """Parse a file, editing and reparsing its previous tree when there is one.
+
+        Returns:
+            Tuple: The tree, the edit (start, old_end, new_end) from the previous
+                source, None if the file was not chunked before, and the byte
+                ranges that changed in the new source
+        """
+        parser = self.grammars.get_parser(self.grammars.language_for_file(file))
+        state = self._file_states.get(file)
+        if state is None:
+            return parser.parse(code_byte), None, []
+
+        start, old_end, new_end = _edit_range(state.source, code_byte)
+        changed_ranges = [(start, new_end)]
+        if state.tree is None:
+            return parser.parse(code_byte), (start, old_end, new_end), changed_ranges
+
+        state.tree.edit(
+            start_byte=start,
+            old_end_byte=old_end,
+            new_end_byte=new_end,
+            start_point=_point(state.source, start),
+            old_end_point=_point(state.source, old_end),
+            new_end_point=_point(code_byte, new_end),
+        )
+        tree = parser.parse(code_byte, state.tree)
+        changed_ranges.extend(
+            (changed.start_byte, changed.end_byte) for changed in state.tree.changed_ranges(tree)
+        )
+        return tree, (start, old_end, new_end), changed_ranges
+
+    def _chunk_tree(self, tree: Tree, content: str, code_byte: bytes) -> List[_CodeSpan]:
+        line_index = LineIndex(code_byte)
+        spans = self.chunker(
+            tree,
+            code_byte,
+            max_chunk_size=self.max_chunk_size,
+            coalesce=self.coalesce,
+            line_index=line_index,
+        )
+        code_spans = []
+        for span in spans:
+            start_line = min(span.start, line_index.num_lines)
+            end_line = min(span.end, line_index.num_lines)
+            code_spans.append(
+                _CodeSpan(
+                    line_index.line_starts[start_line],
+                    line_index.line_starts[end_line],
+                    start_line,
+                    end_line,
+                    span.extract(content, line_index=line_index),
+                )
+            )
+        return code_spans
+
+
+# Chunker of the current process, used by CodeChunker.create_chunks with workers
+_worker_code_chunker: Optional[CodeChunker] = None
+
+
+def _init_code_chunk_worker(
+    max_chunk_size: int, coalesce: int, grammar_cache_dir: str
+) -> None:
+    global _worker_code_chunker
+    _worker_code_chunker = CodeChunker(
+        {}, max_chunk_size=max_chunk_size, coalesce=coalesce, grammar_cache_dir=grammar_cache_dir
+    )
+
+
+def _chunk_code_file(file: str, content: str) -> List[_CodeSpan]:
+    chunks = _worker_code_chunker._chunk_file(file, content)
+    # Trees cannot be sent back to the parent process, do not keep them around
+    del _worker_code_chunker._file_states[file]
+    return chunks
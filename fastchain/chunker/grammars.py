@@ -0,0 +1,108 @@
+"""Registry of compiled tree-sitter grammars.
+
+Grammars are compiled once, ahead of time, into a cache directory with
+`GrammarRegistry.build`. Chunking only ever loads compiled libraries from that
+directory and never touches the network. Parsers are reused, one per language
+and per thread, since a tree-sitter Parser is not thread safe.
+"""
+import os
+import subprocess
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+from tree_sitter import Language, Parser
+
+DEFAULT_GRAMMAR_CACHE_DIR = os.environ.get(
+    "FASTCHAIN_GRAMMAR_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "fastchain", "tree-sitter"),
+)
+
+extension_to_language = {
+    "mjs": "javascript",
+    "py": "python",
+    "rs": "rust",
+    "go": "go",
+    "java": "java",
+    "cpp": "cpp",
+}
+
+
+class GrammarRegistry:
+    """Locate compiled tree-sitter grammars and hand out reusable parsers.
+
+    Args:
+        cache_dir (Optional[str]): Directory holding the compiled `{language}.so`
+            libraries, defaults to DEFAULT_GRAMMAR_CACHE_DIR
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or DEFAULT_GRAMMAR_CACHE_DIR
+        self._languages: Dict[str, Language] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def library_path(self, language: str) -> str:
+        return os.path.join(self.cache_dir, f"{language}.so")
+
+    def build(self, languages: Iterable[str]) -> None:
+        """Clone and compile grammars that are not in the cache directory yet.
+
+        This needs network access and a C compiler, run it at install or deploy
+        time rather than while chunking.
+        """
+        source_dir = os.path.join(self.cache_dir, "src")
+        os.makedirs(source_dir, exist_ok=True)
+        for language in languages:
+            if os.path.exists(self.library_path(language)):
+                continue
+            repo_dir = os.path.join(source_dir, f"tree-sitter-{language}")
+            if not os.path.exists(repo_dir):
+                subprocess.run(
+                    [
+                        "git",
+                        "clone",
+                        "--depth",
+                        "1",
+                        f"https://github.com/tree-sitter/tree-sitter-{language}",
+                        repo_dir,
+                    ],
+                    check=True,
+                )
+            Language.build_library(self.library_path(language), [repo_dir])
+
+    def get_language(self, language: str) -> Language:
+        """Load a compiled grammar, once per registry."""
+        with self._lock:
+            if language not in self._languages:
+                path = self.library_path(language)
+                if not os.path.exists(path):
+                    raise FileNotFoundError(
+                        f"No compiled tree-sitter grammar for {language} at {path}, "
+                        f"build it ahead of time with GrammarRegistry.build"
+                    )
+                self._languages[language] = Language(path, language)
+            return self._languages[language]
+
+    def get_parser(self, language: str) -> Parser:
+        """Parser for a language, reused by every call from the same thread."""
+        parsers = getattr(self._local, "parsers", None)
+        if parsers is None:
+            parsers = self._local.parsers = {}
+        if language not in parsers:
+            parser = Parser()
+            parser.set_language(self.get_language(language))
+            parsers[language] = parser
+        return parsers[language]
+
+    @staticmethod
+    def language_for_file(file_path: str) -> Optional[str]:
+        """Language of a file according to its extension, None if unsupported."""
+        extension = os.path.splitext(file_path)[1][len(".") :]
+        return extension_to_language.get(extension)
+
+
+@lru_cache(maxsize=None)
+def get_grammar_registry(cache_dir: Optional[str] = None) -> GrammarRegistry:
+    """Return the registry shared across the process for a cache directory."""
+    return GrammarRegistry(cache_dir)
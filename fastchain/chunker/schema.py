@@ -1,10 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import List, Type, Callable
-from pydantic import BaseModel, Field, ValidationError, validator
+from typing import List, Optional, Type, Callable
+from pydantic import BaseModel, Field, ValidationError, root_validator, validator
 from enum import Enum
 
-from fastchain.dataloaders.utils import num_tokens_from_string
-from fastchain.constants import MAX_CHUNK_SIZE_TOKENS
+from fastchain.document.chunk.schema import validate_num_tokens
 
 ChunkType = Enum("ChunkType", ["TEXT", "CODE", "TOKENS"])
 
@@ -14,16 +13,12 @@ class Chunk(BaseModel):
     chunk_type: ChunkType = Field(
         ..., description="Type of chunking used to generate the chunk"
     )
+    num_tokens: Optional[int] = None
 
-    @validator("text")
-    def validate_text_length(cls, text):
-        NUM_TOKENS = num_tokens_from_string(text)
-        if NUM_TOKENS > MAX_CHUNK_SIZE_TOKENS:
-            raise ValidationError(
-                f"Chunk size cannot be greater than MAX_CHUNK_SIZE_TOKENS: {MAX_CHUNK_SIZE_TOKENS}, NUM_TOKENS: {NUM_TOKENS}",
-                loc="text",
-            )
-        return text
+    @root_validator(skip_on_failure=True)
+    def validate_text_length(cls, values):
+        values["num_tokens"] = validate_num_tokens(values["text"], values.get("num_tokens"))
+        return values
 
 
 class Chunker(ABC):
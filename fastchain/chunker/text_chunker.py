@@ -1,25 +1,54 @@
 """Text chunkers"""
 import os
-from typing import Callable, List, Optional, Union
+import pickle
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import accumulate
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Type,
+    Union,
+)
 
 from fastchain.document.chunk.base import Chunk
 from fastchain.document.chunk.schema import TextChunk
+from fastchain.document.chunk.view import ChunkSource, ChunkView, SourceBuffer
 from fastchain.chunker.base import Chunker, Span
 from fastchain.constants import *
 from fastchain.dataloaders.utils import num_tokens_from_string
 import tiktoken
 from pydantic import BaseModel, Field, PrivateAttr
-import spacy
-import spacy.cli
 import math
+import numpy as np
 import re
 import logging
 import logging.config
 from dotenv import load_dotenv
 from fastchain.utils import num_tokens_from_string
 from docarray import DocList
-from fastchain.chunker.utils import num_tokens_from_string
-from uuid import UUID as UUID4
+from fastchain.chunker.utils import (
+    char_to_byte_offsets,
+    num_tokens_from_string,
+    sentence_offsets,
+    word_offsets,
+)
+from fastchain.tokenizer import (
+    DEFAULT_TOKENIZER_MODEL,
+    count_tokens,
+    count_tokens_batch,
+    get_encoder,
+)
+from uuid import UUID as UUID4, uuid4
 
 load_dotenv()
 
@@ -41,19 +70,25 @@ class TextChunker(BaseModel):
     )
     length_function: Callable = Field(default=len, alias="text_length_function")
     subdivide_strategy: str = Field(default=DEFAULT_SUBDIVIDE_STRATEGY)
+    # Used by the "tokens" subdivide strategy
+    token_chunk_size: int = Field(default=DEFAULT_TOKEN_CHUNK_SIZE, alias="token_chunk_size")
+    token_chunk_overlap: int = Field(
+        default=DEFAULT_TOKEN_CHUNK_OVERLAP_SIZE, alias="token_chunk_overlap"
+    )
+    tokenizer_model: str = Field(default=DEFAULT_TOKENIZER_MODEL)
 
     _document_id: Optional[UUID4] = PrivateAttr()
     _page_id: Optional[UUID4] = PrivateAttr()
     _chunk_count: int = PrivateAttr()
     _chunks: DocList[TextChunk] = PrivateAttr()
 
-    def __init__(self, document_id=None, page_id=None):
+    def __init__(self, document_id=None, page_id=None, **data):
         # Set the document and page ids
         self._document_id = document_id
         self._page_id = page_id
         self._chunks = DocList[TextChunk]()
         self._chunk_count = 0
-        super().__init__()
+        super().__init__(**data)
     @classmethod
     def class_name(cls) -> str:
         """Return object class name."""
@@ -74,8 +109,11 @@ class TextChunker(BaseModel):
 
         if isinstance(text, str):
 
+            if self.subdivide_strategy == "tokens":
+                return self._chunkify(text)
+
             if self.length_function(text) <= self.chunk_size:
-                self._chunks.append(TextChunk(content=text, document_id=self._document_id, page_id=self._page_id))
+                self._chunks.extend(self._make_chunks(text, [(0, len(text), None)]))
                 return self._chunks
             else:
                 return self._chunkify(text)
@@ -87,20 +125,253 @@ class TextChunker(BaseModel):
 
                 self.create_chunks(item)
 
+            return self._chunks
+
+    def chunk_many(
+        self,
+        texts: List[str],
+        document_ids: Optional[List[UUID4]] = None,
+        workers: Optional[int] = None,
+    ) -> List[List[TextChunk]]:
+        """Chunk many documents in parallel across a process pool.
+
+        Every worker process builds its own chunker from this chunker's settings, so
+        no state is shared between documents. The task chunksize is derived from the
+        number and average length of the texts.
+
+        Args:
+            texts (List[str]): Texts of the documents to chunk
+            document_ids (Optional[List[UUID4]]): Id of every document, generated if
+                not given
+            workers (Optional[int]): Number of worker processes, defaults to the
+                number of CPUs. With a single worker the texts are chunked in this
+                process.
+
+        Returns:
+            List[List[TextChunk]]: Chunks of every document, in input order, tagged
+                with the document id
+        """
+        for item in texts:
+            if not isinstance(item, str):
+                raise ValueError(f"List of text can only contain strings and not: {type(item)}")
+
+        if document_ids is None:
+            document_ids = [uuid4() for _ in texts]
+        elif len(document_ids) != len(texts):
+            raise ValueError(
+                f"Got {len(document_ids)} document ids for {len(texts)} texts, should be equal.")
+
+        workers = min(workers or os.cpu_count() or 1, max(len(texts), 1))
+        config = self.dict(by_alias=True)
+
+        if workers == 1:
+            chunker = type(self)(**config)
+            return [
+                chunker._chunk_document(text, document_id)
+                for text, document_id in zip(texts, document_ids)
+            ]
+
+        try:
+            pickle.dumps((type(self), config))
+        except (pickle.PicklingError, AttributeError, TypeError) as error:
+            raise ValueError(
+                f"Cannot send the settings of {self.class_name()} to worker processes: {error}. "
+                "length_function must be a module-level function, not a lambda or a local "
+                "function, or use workers=1.") from error
+
+        # Aim for a handful of tasks per worker, each carrying about
+        # CHUNK_MANY_TASK_SIZE characters, so both small and huge texts spread evenly
+        average_length = max(sum(map(len, texts)) // len(texts), 1)
+        chunksize = max(1, min(len(texts) // (4 * workers), CHUNK_MANY_TASK_SIZE // average_length))
+
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_chunk_worker, initargs=(type(self), config)
+        ) as executor:
+            return list(executor.map(_chunk_document, texts, document_ids, chunksize=chunksize))
+
+    def create_chunks_iter(
+        self, source: Union[str, Iterable[str], TextIO]
+    ) -> Iterator[TextChunk]:
+        """Lazily create chunks from a text source without loading it fully in memory.
+
+        Only a sliding window of roughly twice the chunk size plus the overlap is held
+        at any time. Chunks are yielded as soon as they are closed and are not added
+        to the chunker, so arbitrarily large sources can be chunked.
+
+        Args:
+            source (Union[str, Iterable[str], TextIO]): A string, an iterator of
+                strings (e.g. the lines of a file) or a text file object
+
+        Yields:
+            TextChunk: Chunks in order, with offsets into the whole source
+        """
+        if self.chunk_overlap > self.chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({self.chunk_overlap}) than chunk size "
+                f"({self.chunk_size}), should be smaller.")
+
+        if self.subdivide_strategy == "tokens":
+            # Roughly 4 characters per token for common English text
+            base_window = 2 * 4 * (self.token_chunk_size + self.token_chunk_overlap)
+        else:
+            base_window = 2 * (self.chunk_size + self.chunk_overlap)
+
+        if isinstance(source, str):
+            pieces = (source[i : i + base_window] for i in range(0, len(source), base_window))
+        elif hasattr(source, "read"):
+            pieces = iter(partial(source.read, base_window), "")
+        else:
+            pieces = iter(source)
+
+        buffer = ""
+        # Offset of buffer[0] in the whole source
+        offset = 0
+        window = base_window
+        emitted = False
+        for piece in pieces:
+            if not isinstance(piece, str):
+                raise ValueError(f"Cannot create chunks from {type(piece)} type of input | Expected str")
+
+            buffer += piece
+            if len(buffer) < window:
+                continue
+
+            limit = len(buffer)
+            if self.subdivide_strategy == "words":
+                # The last word may go on in the next piece, only chunk the words
+                # before it so that every word seen is complete. Its leading pieces
+                # of chunk_size characters are final already, so a text without
+                # whitespace never holds more than chunk_size characters back.
+                word_starts, word_ends = word_offsets(buffer)
+                if len(word_ends) and word_ends[-1] == len(buffer):
+                    last_word_length = len(buffer) - int(word_starts[-1])
+                    limit = len(buffer) - last_word_length % self.chunk_size
+
+            spans = self._chunk_spans(buffer[:limit]) if limit else []
+            if len(spans) < 2:
+                # Nothing can be closed yet, wait for more text
+                window *= 2
+                continue
+
+            # Every chunk but the last one is final, the last one may still grow
+            yield from self._make_chunks(buffer, spans[:-1], offset)
+            emitted = True
+
+            cut = spans[-1][0]
+            buffer = buffer[cut:]
+            offset += cut
+            window = base_window
+
+        if (
+            not emitted
+            and self.subdivide_strategy != "tokens"
+            and self.length_function(buffer) <= self.chunk_size
+        ):
+            if buffer:
+                yield from self._make_chunks(buffer, [(0, len(buffer), None)])
+            return
+
+        yield from self._make_chunks(buffer, self._chunk_spans(buffer), offset)
+
+    def create_chunk_views(
+        self, source: Union[SourceBuffer, ChunkSource], source_id: Optional[str] = None
+    ) -> List[ChunkView]:
+        """Create chunks as zero-copy views into a shared source.
+
+        Only the offsets of every chunk are kept, the chunk text is materialized when
+        a view's `content` is accessed. View content is the slice of the source, like
+        the content of the chunks from `create_chunks`.
+
+        Args:
+            source (Union[SourceBuffer, ChunkSource]): A string, an encoded buffer
+                (bytes, memoryview, mmap) or a ChunkSource
+            source_id (Optional[str]): Id of the source when `source` is not already
+                a ChunkSource
+
+        Returns:
+            List[ChunkView]: Views ordered by position, with character offsets for
+                string sources and byte offsets for encoded buffers. The whole
+                source is decoded once to find the chunk boundaries.
+        """
+        if not isinstance(source, ChunkSource):
+            source = ChunkSource(source, source_id=source_id)
+
+        text = source.text()
+        char_offsets = [(start, end) for start, end, _ in self._chunk_spans(text)]
+        offsets = char_offsets
+        if source.is_binary and not text.isascii():
+            offsets = char_to_byte_offsets(text, char_offsets, source.encoding)
+
+        return [
+            ChunkView(source, start, end, char_start=char_start)
+            for (start, end), (char_start, _) in zip(offsets, char_offsets)
+        ]
+
+    def _make_chunks(
+        self, text: str, spans: List[Tuple[int, int, Optional[int]]], offset: int = 0
+    ) -> List[TextChunk]:
+        """Build the TextChunks of `text` for the given spans.
+
+        Token counts the strategy did not already know are computed in a single
+        batch and stored on the chunks, so validation does not re-tokenize them.
+
+        Args:
+            text (str): Text the spans refer to
+            spans (List[Tuple[int, int, Optional[int]]]): (start, end, num_tokens)
+                of every chunk
+            offset (int): Offset of `text` in the whole source
+
+        Returns:
+            List[TextChunk]: One chunk per span
+        """
+        contents = [text[start:end] for start, end, _ in spans]
+        num_tokens = [count for _, _, count in spans]
+        missing = [i for i, count in enumerate(num_tokens) if count is None]
+        if missing:
+            counts = count_tokens_batch([contents[i] for i in missing], self.tokenizer_model)
+            for i, count in zip(missing, counts):
+                num_tokens[i] = count
+
+        return [
+            TextChunk(
+                content=content,
+                document_id=self._document_id,
+                page_id=self._page_id,
+                start_index=offset + start,
+                end_index=offset + end,
+                num_tokens=count,
+            )
+            for (start, end, _), content, count in zip(spans, contents, num_tokens)
+        ]
+
     def _chunkify(self, text: str) ->DocList[TextChunk]:
+        self._chunks.extend(self._make_chunks(text, self._chunk_spans(text)))
+        return self._chunks
+
+    def _chunk_spans(self, text: str) -> List[Tuple[int, int, Optional[int]]]:
+        """Divide text according to the subdivide strategy.
+
+        Args:
+            text (str): Text to be divided
+
+        Returns:
+            List[Tuple[int, int, Optional[int]]]: (start, end, num_tokens) of every
+                chunk, start and end being character offsets into `text`, num_tokens
+                being None when the strategy does not count tokens
+        """
         # Equally split the text
         if self.subdivide_strategy == "character":
 
+            offsets = []
             i = 0
-            while i < self.length_function(text):
+            while i < len(text):
                 # here 'i' cannot be less than 0 and we consider overlap size everytime
                 i = max(0, i - self.chunk_overlap)
-                chunk_text = text[i : min(i + self.chunk_size, self.length_function(text))]
-                self._chunks.append(TextChunk(content=chunk_text, document_id=self._document_id, page_id=self._page_id))
+                offsets.append((i, min(i + self.chunk_size, len(text)), None))
                 # Step i by chunk size
                 i += self.chunk_size
 
-            return self._chunks
+            return offsets
 
         elif self.subdivide_strategy == "words":
 
@@ -117,27 +388,244 @@ class TextChunker(BaseModel):
             # doc = nlp(text)
             # # Access tokens
             # words = [token.text for token in doc]
-            words = text.split()
-            num_words = len(words)
+            word_starts, word_ends = self._word_offsets(text)
 
+            if self.length_function is len:
+                # Chunks are slices of the text, their length is the distance
+                # between the first and the last word, whitespace included
+                length_starts, length_ends = word_starts, word_ends
+            else:
+                # Words measured on their own, joined by a single separator
+                word_lengths = [
+                    self.length_function(text[start:end])
+                    for start, end in zip(word_starts.tolist(), word_ends.tolist())
+                ]
+                sep_length = self.length_function(" ")
+                length_ends = np.cumsum(np.asarray(word_lengths) + sep_length) - sep_length
+                length_starts = length_ends - word_lengths
 
-            end=1
-            chunk_text = words[0]
-            last_word_added = words[0]  # Initialize a variable to keep track of the last word added
+            return [
+                (int(word_starts[start]), int(word_ends[end - 1]), None)
+                for start, end in self._word_ranges(length_starts, length_ends)
+            ]
 
-            while end < num_words:
-                # Keep track of last word added so that we can remove it later
-                last_word_added= words[end]
-                chunk_text += words[end] + " " #" ".join(words[start:end])
+        elif self.subdivide_strategy == "tokens":
 
-                if self.length_function(chunk_text) >= self.chunk_size:
-                    chunk_text = chunk_text[:-len(last_word_added)].strip()
-                    self._chunks.append(TextChunk(content=chunk_text, document_id=self._document_id, page_id=self._page_id))
-                    chunk_text = chunk_text[-self.chunk_overlap:] + " "
-                    continue
-                end += 1
+            return self._token_spans(text)
+
+        raise ValueError(f"Unknown subdivide strategy: {self.subdivide_strategy}")
+
+    def _word_offsets(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Start and end offset of every word, words longer than `chunk_size`
+        characters being hard-split into pieces of `chunk_size` characters.
+
+        Pieces are cut from the start of their word, so a word cut short at the end
+        of `text` has the same leading pieces as the whole word.
+        """
+        word_starts, word_ends = word_offsets(text)
+        num_pieces = np.maximum(-(-(word_ends - word_starts) // self.chunk_size), 1)
+        if len(num_pieces) == 0 or num_pieces.max() == 1:
+            return word_starts, word_ends
+
+        words = np.repeat(np.arange(len(word_starts)), num_pieces)
+        first_pieces = np.repeat(np.cumsum(num_pieces) - num_pieces, num_pieces)
+        piece_starts = word_starts[words] + (np.arange(len(words)) - first_pieces) * self.chunk_size
+        return piece_starts, np.minimum(piece_starts + self.chunk_size, word_ends[words])
+
+    def _word_ranges(
+        self, length_starts: np.ndarray, length_ends: np.ndarray
+    ) -> List[Tuple[int, int]]:
+        """Group words into chunks of at most `chunk_size` in a single linear pass.
+
+        Words are placed on a length axis, the length of words[start:end] being
+        `length_ends[end - 1] - length_starts[start]`, so no intermediate chunk
+        string is ever built and every chunk boundary is found with a binary
+        search. Consecutive chunks overlap by as many trailing words as fit in
+        `chunk_overlap`.
+
+        Args:
+            length_starts (np.ndarray): Non-decreasing position of the start of every word
+            length_ends (np.ndarray): Non-decreasing position of the end of every word
+
+        Returns:
+            List[Tuple[int, int]]: [start, end) word index range of every chunk
+        """
+        num_words = len(length_starts)
+
+        ranges = []
+        start = 0
+        while start < num_words:
+            # Furthest end that fits, a chunk always holds at least one word
+            end = int(np.searchsorted(length_ends, length_starts[start] + self.chunk_size, "right"))
+            end = min(max(end, start + 1), num_words)
+            ranges.append((start, end))
+            if end == num_words:
+                break
+
+            # Step back over as many trailing words as fit in the overlap, as long
+            # as the next chunk still has room for at least one new word
+            next_start = np.searchsorted(
+                length_starts,
+                [
+                    length_ends[end - 1] - self.chunk_overlap,
+                    length_ends[end] - self.chunk_size,
+                ],
+            ).max()
+            start = min(max(int(next_start), start + 1), end)
+
+        return ranges
+
+    def _token_spans(
+        self, text: str, window: Optional[int] = None, overlap: Optional[int] = None
+    ) -> List[Tuple[int, int, int]]:
+        """Split text into overlapping token windows in a single pass.
+
+        The whole text is encoded once and the token ids are cut into windows of
+        `token_chunk_size` tokens (never more than MAX_CHUNK_SIZE_TOKENS). Window
+        boundaries are mapped back to character offsets of `text`, so every chunk
+        is an exact slice of the source.
+
+        Args:
+            text (str): Text to be divided
+            window (Optional[int]): Tokens per window, `token_chunk_size` if None
+            overlap (Optional[int]): Tokens shared by consecutive windows,
+                `token_chunk_overlap` if None
+
+        Returns:
+            List[Tuple[int, int, int]]: (start, end, num_tokens) of every window,
+                start and end being character offsets into `text`
+        """
+        window = min(self.token_chunk_size if window is None else window, MAX_CHUNK_SIZE_TOKENS)
+        overlap = self.token_chunk_overlap if overlap is None else overlap
+        step = window - overlap
+        if step <= 0:
+            raise ValueError(
+                f"Got a larger token chunk overlap ({overlap}) than token "
+                f"chunk size ({window}), should be smaller.")
+
+        encoder = get_encoder(self.tokenizer_model)
+        tokens = encoder.encode_ordinary(text)
+        if not tokens:
+            return []
+
+        # Byte offset at which every token ends
+        token_ends = list(accumulate(len(b) for b in encoder.decode_tokens_bytes(tokens)))
+        data = text.encode("utf-8")
+
+        def byte_offset(token_index: int) -> int:
+            offset = token_ends[token_index - 1] if token_index else 0
+            return self._snap_to_char_boundary(data, offset)
+
+        token_windows = []
+        start = 0
+        while True:
+            end = min(start + window, len(tokens))
+            token_windows.append((start, end))
+            if end == len(tokens):
+                break
+            start += step
+
+        byte_windows = [(byte_offset(start), byte_offset(end)) for start, end in token_windows]
+
+        if len(data) == len(text):
+            # Pure ASCII, byte offsets are character offsets
+            char_windows = byte_windows
+        else:
+            # Convert byte offsets to character offsets, decoding every byte only once
+            char_offsets = {0: 0}
+            previous = 0
+            for offset in sorted({offset for byte_window in byte_windows for offset in byte_window}):
+                char_offsets[offset] = char_offsets[previous] + len(data[previous:offset].decode("utf-8"))
+                previous = offset
+            char_windows = [(char_offsets[start], char_offsets[end]) for start, end in byte_windows]
+
+        # Re-tokenizing a window on its own can give a slightly different count than
+        # the slice of token ids it came from, count once more in a single batch and
+        # pull back the end of the rare windows that overflow the token limit.
+        spans = []
+        window_tokens = count_tokens_batch(
+            [text[start:end] for start, end in char_windows], self.tokenizer_model
+        )
+        for (token_start, token_end), (start, end), num_tokens in zip(token_windows, char_windows, window_tokens):
+            while num_tokens > MAX_CHUNK_SIZE_TOKENS and token_end - token_start > 1:
+                token_end = max(token_start + 1, token_end - (num_tokens - MAX_CHUNK_SIZE_TOKENS))
+                byte_start = byte_offset(token_start)
+                end = start + len(data[byte_start:byte_offset(token_end)].decode("utf-8"))
+                num_tokens = count_tokens(text[start:end], self.tokenizer_model)
+            spans.append((start, end, num_tokens))
+
+        return spans
+
+    def _split_oversized_spans(
+        self, text: str, spans: List[Tuple[int, int, Optional[int]]]
+    ) -> List[Tuple[int, int, Optional[int]]]:
+        """Split the spans over MAX_CHUNK_SIZE_TOKENS tokens into token windows.
+
+        A token is at least one byte, so only spans longer than MAX_CHUNK_SIZE_TOKENS
+        bytes are tokenized, all in one batch. Their counts are kept on the spans so
+        that the chunks are not tokenized again.
+
+        Args:
+            text (str): Text the spans refer to
+            spans (List[Tuple[int, int, Optional[int]]]): (start, end, num_tokens)
+                of every chunk
+
+        Returns:
+            List[Tuple[int, int, Optional[int]]]: The spans, with every oversized one
+                replaced by consecutive windows of at most MAX_CHUNK_SIZE_TOKENS tokens
+        """
+        long = [
+            i for i, (start, end, count) in enumerate(spans)
+            if count is None and end - start > MAX_CHUNK_SIZE_TOKENS // 4
+            and len(text[start:end].encode("utf-8")) > MAX_CHUNK_SIZE_TOKENS
+        ]
+        if not long:
+            return spans
+
+        spans = list(spans)
+        counts = count_tokens_batch([text[spans[i][0]:spans[i][1]] for i in long], self.tokenizer_model)
+        for i, count in zip(long, counts):
+            spans[i] = (spans[i][0], spans[i][1], count)
+
+        fitted = []
+        for start, end, count in spans:
+            if count is not None and count > MAX_CHUNK_SIZE_TOKENS:
+                fitted.extend(
+                    (start + window_start, start + window_end, window_tokens)
+                    for window_start, window_end, window_tokens in self._token_spans(
+                        text[start:end], window=MAX_CHUNK_SIZE_TOKENS, overlap=0
+                    )
+                )
+            else:
+                fitted.append((start, end, count))
+        return fitted
+
+    def _chunk_document(self, text: str, document_id: UUID4) -> List[TextChunk]:
+        """Chunks of one document, without adding them to the chunker."""
+        self._document_id = document_id
+        if self.subdivide_strategy != "tokens" and self.length_function(text) <= self.chunk_size:
+            return self._make_chunks(text, [(0, len(text), None)]) if text else []
+        return self._make_chunks(text, self._chunk_spans(text))
+
+    @staticmethod
+    def _snap_to_char_boundary(data: bytes, offset: int) -> int:
+        """Move a byte offset back to the start of the UTF-8 character it falls into."""
+        while 0 < offset < len(data) and (data[offset] & 0xC0) == 0x80:
+            offset -= 1
+        return offset
+
+# Chunker of the current process, used by TextChunker.chunk_many
+_worker_chunker: Optional[TextChunker] = None
+
+
+def _init_chunk_worker(chunker_class: Type[TextChunker], config: Dict) -> None:
+    global _worker_chunker
+    _worker_chunker = chunker_class(**config)
+
+
+def _chunk_document(text: str, document_id: UUID4) -> List[TextChunk]:
+    return _worker_chunker._chunk_document(text, document_id)
 
-            return self._chunks
 
 # class TokenChunker(Chunker, BaseModel):
 #     """Create chunks based on MAX_TOKEN_SIZE."""
@@ -340,19 +828,391 @@ class TextChunker(BaseModel):
 #         return chunks
 
 
-class SentenceChunker(Chunker, BaseModel):
-    """Create chunks by dividing text into sentences."""
+@dataclass
+class _Split:
+    """A piece of text produced while recursively splitting, with its cached length."""
+
+    text: str
+    start: int
+    length: int
+    is_sentence: bool
+
+
+class RecursiveTextChunker(TextChunker, Chunker):
+    """Chunk text by recursively splitting it on paragraphs, sentences, phrases and
+    words until every split fits in `chunk_size`, then merging the splits back into
+    chunks.
+
+    The order of splitting is:
+    1. split by paragraph separator
+    2. split by sentence separator
+    3. split by phrase regex
+    4. split by spaces
+    5. split by characters
+    """
+
+    paragraph_separator: str = Field(default=DEFAULT_PARAGRAPH_SEP)
+    sentence_separator: str = Field(default=r"[.!?。]+\s+")
+    # Matches a run of non-punctuation characters with the punctuation following it,
+    # or a leading run of punctuation, so the phrases always cover the whole text
+    phrase_regex: str = Field(default="[^,.;。]+[,.;。]*|[,.;。]+")
+
+    @classmethod
+    def class_name(cls) -> str:
+        """Return object class name."""
+        return "RecursiveTextChunker"
+
+    def _chunk_spans(self, text: str) -> List[Tuple[int, int, Optional[int]]]:
+        splits = self._split(text, start=0, length=self.length_function(text))
+        return [(start, end, None) for start, end in self._merge(splits, text)]
+
+    def _sentence_split_fns(self) -> List[Callable[[str], List[str]]]:
+        return [
+            lambda text: self._split_and_keep_separator(text, re.escape(self.paragraph_separator)),
+            lambda text: self._split_and_keep_separator(text, self.sentence_separator),
+        ]
+
+    def _sub_sentence_split_fns(self) -> List[Callable[[str], List[str]]]:
+        return [
+            lambda text: re.findall(self.phrase_regex, text),
+            lambda text: self._split_and_keep_separator(text, " "),
+            list,
+        ]
+
+    def _split(self, text: str, start: int, length: int) -> List[_Split]:
+        """Break text into splits that are smaller than chunk size.
+
+        Every split keeps its separators, so the splits always cover the text
+        contiguously. The length of every piece is computed exactly once.
+
+        Args:
+            text (str): Text to be divided
+            start (int): Offset of `text` in the source text
+            length (int): Length of `text` according to `length_function`
+
+        Returns:
+            List[_Split]: Splits of at most `chunk_size` each
+        """
+        if length <= self.chunk_size:
+            return [_Split(text, start, length, is_sentence=True)]
+
+        for split_fn in self._sentence_split_fns():
+            pieces = split_fn(text)
+            if len(pieces) > 1:
+                is_sentence = True
+                break
+        else:
+            for split_fn in self._sub_sentence_split_fns():
+                pieces = split_fn(text)
+                if len(pieces) > 1:
+                    break
+            is_sentence = False
+
+        splits = []
+        for piece in pieces:
+            piece_length = self.length_function(piece)
+            if piece_length <= self.chunk_size:
+                splits.append(_Split(piece, start, piece_length, is_sentence=is_sentence))
+            else:
+                splits.extend(self._split(piece, start, piece_length))
+            start += len(piece)
+        return splits
+
+    def _merge(self, splits: List[_Split], text: str) -> List[Tuple[int, int]]:
+        """Merge splits into chunks in a single forward pass.
+
+        Args:
+            splits (List[_Split]): Contiguous splits of `text`
+            text (str): Source text of the splits
+
+        Returns:
+            List[Tuple[int, int]]: (start, end) offsets of every non-blank chunk,
+                with surrounding whitespace stripped
+        """
+        chunks = []
+
+        def close_chunk(first: int, last: int):
+            chunk_start = splits[first].start
+            chunk_end = splits[last].start + len(splits[last].text)
+            raw = text[chunk_start:chunk_end]
+            stripped = raw.strip()
+            if stripped:
+                chunk_start += len(raw) - len(raw.lstrip())
+                chunks.append((chunk_start, chunk_start + len(stripped)))
+
+        # The current chunk holds splits[chunk_first:i]
+        chunk_first = 0
+        chunk_length = 0
+        i = 0
+        while i < len(splits):
+            split = splits[i]
+            if split.length > self.chunk_size:
+                raise ValueError("Single token exceed chunk size")
+            if chunk_length + split.length > self.chunk_size and i > chunk_first:
+                # if adding split to current chunk exceed chunk size: close out chunk
+                close_chunk(chunk_first, i - 1)
+                chunk_first, chunk_length = i, 0
+            elif (
+                split.is_sentence
+                or chunk_length + split.length < self.chunk_size - self.chunk_overlap
+                or i == chunk_first
+            ):
+                # add split to chunk
+                chunk_length += split.length
+                i += 1
+            else:
+                # close out chunk
+                close_chunk(chunk_first, i - 1)
+                chunk_first, chunk_length = i, 0
+
+        # handle the last chunk
+        if i > chunk_first:
+            close_chunk(chunk_first, i - 1)
+
+        return chunks
+
+
+@lru_cache(maxsize=None)
+def _load_sentencizer(language: str):
+    """Blank spaCy pipeline with only the rule-based sentencizer, loaded once per language."""
+    try:
+        import spacy
+    except ImportError:
+        raise ImportError(
+            "spacy is required for the spacy sentence segmenter, install it with `pip install spacy`"
+        )
+    nlp = spacy.blank(language)
+    nlp.add_pipe("sentencizer")
+    return nlp
+
+
+class SentenceChunker(TextChunker, Chunker):
+    """Create chunks by dividing text into sentences.
+
+    Every chunk holds `num_sentences` consecutive sentences and shares
+    `overlap_size` sentences with the previous one. Sentences are found by the
+    rule-based segmenter by default, or by a sentencizer-only spaCy pipeline
+    when `tokenizer` is "spacy". Groups over MAX_CHUNK_SIZE_TOKENS tokens, e.g.
+    around an overlong sentence, are split into token windows.
+    """
 
     num_sentences: int = Field(
         default=DEFAULT_NUM_SENTANCES, alias="num_sentences"
     )
-    tokenizer: str = Field(default="spacy", alias="tokenizer")
-    length_function: Callable = Field(default=len, alias="text_length_function")
+    tokenizer: str = Field(default=DEFAULT_SENTENCE_SEGMENTER, alias="tokenizer")
     overlap_size: int = Field(default=DEFAULT_SENTENCE_OVERLAP_SIZE)
+    # Used by the "spacy" segmenter
+    spacy_language: str = Field(default=DEFAULT_SPACY_LANGUAGE)
+    spacy_batch_size: int = Field(default=DEFAULT_SPACY_BATCH_SIZE)
+    spacy_n_process: int = Field(default=1)
 
-    def create_chunks(self, text: str) -> DocList[TextChunk]:
-        ...
+    @classmethod
+    def class_name(cls) -> str:
+        """Return object class name."""
+        return "SentenceChunker"
+
+    def create_chunks(self, text: Union[List[str], str],
+                      document_id: Optional[UUID4] = None,
+                      page_id: Optional[UUID4] = None) -> DocList[TextChunk]:
+
+        if self.overlap_size >= self.num_sentences:
+            raise ValueError(
+                f"Got a sentence overlap ({self.overlap_size}) not smaller than the number "
+                f"of sentences per chunk ({self.num_sentences}).")
+
+        texts = [text] if isinstance(text, str) else text
+        if not isinstance(texts, List):
+            raise ValueError(f"Cannot create chunks from {type(text)} type of input | Expected List[str] or str")
+        for item in texts:
+            if not isinstance(item, str):
+                raise ValueError(f"List of text can only contain strings and not: {type(item)}")
+
+        # All the texts are segmented together so spaCy can batch them
+        for item, sentences in zip(texts, self._sentence_offsets(texts)):
+            spans = self._split_oversized_spans(item, self._group_sentences(sentences))
+            self._chunks.extend(self._make_chunks(item, spans))
+        return self._chunks
+
+    def _chunk_spans(self, text: str) -> List[Tuple[int, int, Optional[int]]]:
+        return self._split_oversized_spans(
+            text, self._group_sentences(self._sentence_offsets([text])[0])
+        )
+
+    def _sentence_offsets(self, texts: List[str]) -> List[List[Tuple[int, int]]]:
+        """Character offsets of the sentences of every text."""
+        if self.tokenizer == "rule":
+            return [sentence_offsets(text) for text in texts]
+
+        if self.tokenizer == "spacy":
+            nlp = _load_sentencizer(self.spacy_language)
+            docs = nlp.pipe(
+                texts, batch_size=self.spacy_batch_size, n_process=self.spacy_n_process
+            )
+            return [
+                [(sent.start_char, sent.end_char) for sent in doc.sents if sent.text.strip()]
+                for doc in docs
+            ]
+
+        raise ValueError(f"Invalid sentence tokenizer: {self.tokenizer}, expected rule or spacy")
+
+    def _group_sentences(
+        self, sentences: List[Tuple[int, int]]
+    ) -> List[Tuple[int, int, Optional[int]]]:
+        """Group sentences into overlapping spans of `num_sentences` sentences."""
+        spans = []
+        step = self.num_sentences - self.overlap_size
+        for i in range(0, len(sentences), step):
+            group = sentences[i : i + self.num_sentences]
+            spans.append((group[0][0], group[-1][1], None))
+            if i + self.num_sentences >= len(sentences):
+                break
+        return spans
 
 
 class ContextAwareTextChunker(TextChunker, BaseModel):
-    """Generate context aware text chunks given any text input"""
+    """Generate context aware text chunks given any text input.
+
+    The text is divided into sentences, which are embedded in large batches with
+    `embed_model`. Chunks are cut at the valleys of the cosine similarity between
+    adjacent sentences, i.e. at local minima below `breakpoint_threshold`, and
+    wherever a chunk would exceed `token_chunk_size` tokens. Sentences over
+    MAX_CHUNK_SIZE_TOKENS tokens are split into token windows.
+
+    Sentence embeddings are cached by model and sentence, up to
+    DEFAULT_SEMANTIC_EMBEDDING_CACHE_SIZE of them, so re-chunking the same text
+    with another threshold does not call the embedding model again.
+    """
+
+    # A fastchain.embedding.base.BaseEmbedding
+    embed_model: Any = Field(default=None)
+    breakpoint_threshold: float = Field(default=DEFAULT_SEMANTIC_BREAKPOINT_THRESHOLD)
+    embed_batch_size: int = Field(default=DEFAULT_SEMANTIC_EMBED_BATCH_SIZE)
+
+    # Unit-normalized sentence embeddings by (model id, sentence), in LRU order
+    _embedding_cache: "OrderedDict[Tuple[str, str], np.ndarray]" = PrivateAttr(
+        default_factory=OrderedDict
+    )
+    _token_cache: Dict[str, int] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def class_name(cls) -> str:
+        """Return object class name."""
+        return "ContextAwareTextChunker"
+
+    def create_chunks(self, text: Union[List[str], str],
+                      document_id: Optional[UUID4] = None,
+                      page_id: Optional[UUID4] = None) -> DocList[TextChunk]:
+
+        if self.embed_model is None:
+            raise ValueError("ContextAwareTextChunker needs an embed_model to create chunks")
+
+        texts = [text] if isinstance(text, str) else text
+        if not isinstance(texts, List):
+            raise ValueError(f"Cannot create chunks from {type(text)} type of input | Expected List[str] or str")
+        for item in texts:
+            if not isinstance(item, str):
+                raise ValueError(f"List of text can only contain strings and not: {type(item)}")
+
+        # Only the sentence caches are kept across calls, not the chunks
+        self._chunks = DocList[TextChunk]()
+        # Embed the sentences of all the texts together so the batches are full
+        offsets = [sentence_offsets(item) for item in texts]
+        contents = [
+            [item[start:end] for start, end in item_offsets]
+            for item, item_offsets in zip(texts, offsets)
+        ]
+        embeddings = self._sentence_embeddings([sentence for item in contents for sentence in item])
+
+        first = 0
+        for item, item_offsets, item_contents in zip(texts, offsets, contents):
+            item_embeddings = embeddings[first : first + len(item_contents)]
+            first += len(item_contents)
+            spans = self._semantic_spans(item, item_offsets, item_contents, item_embeddings)
+            self._chunks.extend(self._make_chunks(item, spans))
+        return self._chunks
+
+    def clear_cache(self) -> None:
+        """Forget the cached sentence embeddings and token counts."""
+        self._embedding_cache.clear()
+        self._token_cache.clear()
+
+    def _chunk_spans(self, text: str) -> List[Tuple[int, int, Optional[int]]]:
+        sentences = sentence_offsets(text)
+        contents = [text[start:end] for start, end in sentences]
+        return self._semantic_spans(text, sentences, contents, self._sentence_embeddings(contents))
+
+    def _semantic_spans(
+        self,
+        text: str,
+        sentences: List[Tuple[int, int]],
+        contents: List[str],
+        embeddings: np.ndarray,
+    ) -> List[Tuple[int, int, Optional[int]]]:
+        """Group the sentences of `text` into chunks, given their unit-normalized embeddings."""
+        if not sentences:
+            return []
+
+        num_tokens = self._sentence_num_tokens(contents)
+
+        # Cosine similarity of every sentence with the next one, and its valleys
+        similarities = np.einsum("ij,ij->i", embeddings[:-1], embeddings[1:])
+        previous = np.concatenate(([np.inf], similarities[:-1]))
+        following = np.concatenate((similarities[1:], [np.inf]))
+        breakpoints = (
+            (similarities < self.breakpoint_threshold)
+            & (similarities <= previous)
+            & (similarities <= following)
+        ).tolist()
+
+        spans = []
+        first = 0
+        chunk_tokens = num_tokens[0]
+        for i in range(1, len(sentences)):
+            if breakpoints[i - 1] or chunk_tokens + num_tokens[i] > self.token_chunk_size:
+                spans.append((sentences[first][0], sentences[i - 1][1], None))
+                first, chunk_tokens = i, 0
+            chunk_tokens += num_tokens[i]
+        spans.append((sentences[first][0], sentences[-1][1], None))
+        # A sentence longer than the token limit is a chunk of its own, split it
+        return self._split_oversized_spans(text, spans)
+
+    def _sentence_embeddings(self, sentences: List[str]) -> np.ndarray:
+        """Unit-normalized embeddings of sentences, embedding only the ones not cached
+        for the current `embed_model`."""
+        if not sentences:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Embeddings of another model are never reused, even when it replaces this one
+        model_id = getattr(self.embed_model, "model_id", None) or type(self.embed_model).__name__
+        cache = self._embedding_cache
+        embeddings: Dict[str, np.ndarray] = {}
+        for sentence in sentences:
+            key = (model_id, sentence)
+            if sentence not in embeddings and key in cache:
+                cache.move_to_end(key)
+                embeddings[sentence] = cache[key]
+
+        missing = list(dict.fromkeys(s for s in sentences if s not in embeddings))
+        for i in range(0, len(missing), self.embed_batch_size):
+            batch = missing[i : i + self.embed_batch_size]
+            batch_embeddings = np.asarray(
+                self.embed_model.get_text_embeddings(batch, batch_size=self.embed_batch_size),
+                dtype=np.float32,
+            )
+            norms = np.linalg.norm(batch_embeddings, axis=1, keepdims=True)
+            batch_embeddings /= np.where(norms == 0, 1, norms)
+            embeddings.update(zip(batch, batch_embeddings))
+            for sentence, embedding in zip(batch, batch_embeddings):
+                cache[(model_id, sentence)] = embedding
+            while len(cache) > DEFAULT_SEMANTIC_EMBEDDING_CACHE_SIZE:
+                cache.popitem(last=False)
+
+        return np.stack([embeddings[sentence] for sentence in sentences])
+
+    def _sentence_num_tokens(self, sentences: List[str]) -> List[int]:
+        missing = list(dict.fromkeys(s for s in sentences if s not in self._token_cache))
+        if missing:
+            self._token_cache.update(
+                zip(missing, count_tokens_batch(missing, self.tokenizer_model))
+            )
+        return [self._token_cache[sentence] for sentence in sentences]
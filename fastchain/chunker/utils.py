@@ -1,16 +1,165 @@
-from typing import Callable, List
+from typing import Callable, FrozenSet, List, Tuple
+import re
 import urllib.parse
 
-import tiktoken
+import numpy as np
+
+from fastchain.tokenizer import count_tokens
+
+# Every code point for which str.isspace() is true, i.e. what str.split() splits on
+WHITESPACE_CODE_POINTS = np.array(
+    [9, 10, 11, 12, 13, 28, 29, 30, 31, 32, 0x85, 0xA0, 0x1680]
+    + list(range(0x2000, 0x200B))
+    + [0x2028, 0x2029, 0x202F, 0x205F, 0x3000],
+    dtype=np.uint32,
+)
+_ASCII_WHITESPACE = np.isin(np.arange(128), WHITESPACE_CODE_POINTS)
+
+# Lowercased words that are followed by a period without ending a sentence
+DEFAULT_ABBREVIATIONS = frozenset(
+    [
+        "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "rev", "gen", "col",
+        "lt", "sgt", "capt", "gov", "sen", "rep", "vs", "etc", "al", "approx", "cf",
+        "inc", "ltd", "co", "corp", "dept", "univ", "fig", "figs", "eq", "no", "nos",
+        "vol", "vols", "pp", "ch", "sec", "ed", "eds", "est", "jan", "feb", "mar",
+        "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec", "mon", "tue",
+        "wed", "thu", "fri", "sat", "sun",
+    ]
+)
+# Sentence terminators, with closing quotes and brackets, followed by whitespace.
+# CJK terminators do not need the whitespace.
+_SENTENCE_END = re.compile(r"[.!?]+[\"'\u201d\u2019)\]]*\s+|[\u3002\uff01\uff1f]+\s*")
 
 
 def num_tokens_from_string(
     string: str, model: str = "gpt-3.5-turbo"
 ) -> int:
     """Returns the number of tokens in a text string."""
-    encoding = tiktoken.get_encoding(model)
-    num_tokens = len(encoding.encode(string))
-    return num_tokens
+    return count_tokens(string, model)
+
+
+def word_offsets(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Character offsets of the words of a text, as split by str.split().
+
+    Args:
+        text (str): Input text
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Start and end offset of every word
+    """
+    if text.isascii():
+        is_space = _ASCII_WHITESPACE[np.frombuffer(text.encode("ascii"), dtype=np.uint8)]
+    else:
+        code_points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        is_space = np.isin(code_points, WHITESPACE_CODE_POINTS)
+
+    # Words start and end wherever the text switches between whitespace and the rest
+    edges = np.flatnonzero(np.diff(is_space.astype(np.int8), prepend=1, append=1))
+    return edges[0::2], edges[1::2]
+
+
+def sentence_offsets(
+    text: str, abbreviations: FrozenSet[str] = DEFAULT_ABBREVIATIONS
+) -> List[Tuple[int, int]]:
+    """Character offsets of the sentences of a text, using punctuation rules.
+
+    A period does not end a sentence after a known abbreviation, an initial or a
+    dotted acronym (e.g. "U.S."), and no terminator ends a sentence when the next
+    word starts in lowercase. Only the candidate boundaries found by a single
+    regex scan are inspected, so no model is needed and large texts are fast.
+
+    Args:
+        text (str): Input text
+        abbreviations (FrozenSet[str]): Lowercased abbreviations, without the period
+
+    Returns:
+        List[Tuple[int, int]]: Start and end offset of every sentence, without
+            surrounding whitespace
+    """
+    spans = []
+    start = len(text) - len(text.lstrip())
+    for match in _SENTENCE_END.finditer(text, start):
+        end = match.end()
+        if end == len(text):
+            break
+        if text[end].islower():
+            continue
+        if text[match.start()] == "." and text[match.start() + 1 : match.start() + 2] != ".":
+            word_start = max(
+                start,
+                text.rfind(" ", start, match.start()) + 1,
+                text.rfind("\n", start, match.start()) + 1,
+            )
+            word = text[word_start : match.start()].lstrip("([\"'").lower()
+            if word in abbreviations or "." in word or (len(word) == 1 and word.isalpha()):
+                continue
+        sentence = text[start:end].rstrip()
+        if sentence:
+            spans.append((start, start + len(sentence)))
+        start = end
+
+    sentence = text[start:].rstrip()
+    if sentence:
+        spans.append((start, start + len(sentence)))
+    return spans
+
+
+def non_whitespace_prefix_sums(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Prefix sums of the non-whitespace characters and of the newlines of UTF-8 data.
+
+    The number of non-whitespace characters in data[start:end] is
+    `non_whitespace[end] - non_whitespace[start]`, and likewise for newlines.
+    Whitespace is every character for which str.isspace() is true, as matched by
+    `\\s`; continuation bytes are not counted, so a multi-byte character counts once.
+
+    Args:
+        data (bytes): UTF-8 encoded text
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Prefix sums of non-whitespace characters and
+            of newlines, both of length len(data) + 1
+    """
+    codes = np.frombuffer(data, dtype=np.uint8)
+    is_char_start = (codes & 0xC0) != 0x80
+    is_space = (codes < 128) & _ASCII_WHITESPACE[codes & 0x7F]
+    if not data.isascii():
+        # Flag the first byte of every non-ASCII whitespace character
+        code_points = np.frombuffer(
+            data.decode("utf-8", errors="surrogateescape").encode("utf-32-le", errors="surrogatepass"),
+            dtype=np.uint32,
+        )
+        char_starts = np.flatnonzero(is_char_start)
+        # Invalid UTF-8 does not decode to one code point per character start
+        if len(code_points) == len(char_starts):
+            is_space[char_starts] |= np.isin(code_points, WHITESPACE_CODE_POINTS[WHITESPACE_CODE_POINTS >= 128])
+    non_whitespace = np.zeros(len(codes) + 1, dtype=np.int64)
+    np.cumsum(is_char_start & ~is_space, out=non_whitespace[1:])
+    newlines = np.zeros(len(codes) + 1, dtype=np.int64)
+    np.cumsum(codes == 10, out=newlines[1:])
+    return non_whitespace, newlines
+
+
+def char_to_byte_offsets(
+    text: str, spans: List[Tuple[int, int]], encoding: str = "utf-8"
+) -> List[Tuple[int, int]]:
+    """Convert character offset spans of a text into byte offsets of its encoding.
+
+    Every character is encoded only once, whatever the number of spans.
+
+    Args:
+        text (str): Text the spans refer to
+        spans (List[Tuple[int, int]]): (start, end) character offsets
+        encoding (str): Encoding of the byte buffer
+
+    Returns:
+        List[Tuple[int, int]]: (start, end) byte offsets
+    """
+    byte_offsets = {0: 0}
+    previous = 0
+    for offset in sorted({offset for span in spans for offset in span}):
+        byte_offsets[offset] = byte_offsets[previous] + len(text[previous:offset].encode(encoding))
+        previous = offset
+    return [(byte_offsets[start], byte_offsets[end]) for start, end in spans]
 
 
 # def is_valid_url(input_string: str) -> bool:
@@ -4,11 +4,26 @@
 #### TextChunker
 DEFAULT_CHUNK_SIZE = 1600
 DEFAULT_CHUNK_OVERLAP_SIZE = 160
-DEFAULT_SUBDIVIDE_STRATEGY = "words" #[character, words]
+DEFAULT_SUBDIVIDE_STRATEGY = "words" #[character, words, tokens]
+# Characters of text sent to a worker per task by TextChunker.chunk_many
+CHUNK_MANY_TASK_SIZE = 1_000_000
 
 ### SentanceChunker
 DEFAULT_NUM_SENTANCES = 5
 DEFAULT_SENTENCE_OVERLAP_SIZE = 1
+DEFAULT_SENTENCE_SEGMENTER = "rule" #[rule, spacy]
+# Used by the "spacy" sentence segmenter
+DEFAULT_SPACY_LANGUAGE = "en"
+DEFAULT_SPACY_BATCH_SIZE = 256
+
+### ContextAwareTextChunker
+# Chunks are cut where the cosine similarity of adjacent sentences is a local
+# minimum below this threshold
+DEFAULT_SEMANTIC_BREAKPOINT_THRESHOLD = 0.75
+# Sentences sent to the embedding model per call
+DEFAULT_SEMANTIC_EMBED_BATCH_SIZE = 256
+# Sentence embeddings kept by a ContextAwareTextChunker, least recently used first out
+DEFAULT_SEMANTIC_EMBEDDING_CACHE_SIZE = 10_000
 
 #### TokenChunker
 DEFAULT_TOKEN_CHUNK_SIZE = 512
@@ -16,9 +31,19 @@ DEFAULT_TOKEN_CHUNK_OVERLAP_SIZE = 50
 MAX_TOKEN_CHUNK_SIZE = 512
 
 MAX_CHUNK_SIZE_TOKENS = 512
+# "strict" re-tokenizes every TextChunk on construction, "lazy" trusts the
+# num_tokens computed by the chunker
+DEFAULT_CHUNK_VALIDATION_MODE = "lazy"
 
 DEFAULT_PARAGRAPH_SEP = "\n\n\n"
 
+#### ChunkDeduplicator
+# Estimated Jaccard similarity above which a chunk is a near-duplicate
+DEFAULT_DEDUP_THRESHOLD = 0.85
+DEFAULT_MINHASH_PERMUTATIONS = 128
+# Number of words per shingle
+DEFAULT_SHINGLE_SIZE = 5
+
 
 EMBEDDING_SIZES =  {
     "DEFAULT": 1024,
@@ -0,0 +1,258 @@
+"""Exact and near-duplicate chunk detection.
+
+Chunks are first matched on an exact content hash, then on MinHash signatures
+of their word shingles. Signatures are split into bands and every band is
+bucketed (LSH), so a chunk is only compared with the few chunks sharing one of
+its buckets, whatever the size of the corpus.
+
+The index is kept compact for corpora of tens of millions of chunks: signatures
+are rows of one uint32 matrix, buckets map a 64-bit band hash to the last chunk
+added and chain the others through an array of next indices, and exact hashes
+are raw sha1 digests.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from docarray import DocList
+
+from fastchain.constants import (
+    DEFAULT_DEDUP_THRESHOLD,
+    DEFAULT_MINHASH_PERMUTATIONS,
+    DEFAULT_SHINGLE_SIZE,
+)
+from fastchain.datacleaners import BaseCleaner
+from fastchain.document.base import Document
+from fastchain.document.chunk.base import Chunk
+from fastchain.utils import shingle_hashes
+
+logger = logging.getLogger(__name__)
+
+DEDUP_MODES = ("drop", "link")
+INITIAL_INDEX_CAPACITY = 1024
+
+
+def _lsh_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Number of bands and rows per band that best separate chunks around `threshold`.
+
+    Two signatures share a bucket with probability 1 - (1 - s^rows)^bands for a
+    Jaccard similarity s. The split minimizing the sum of the false positive area
+    below the threshold and the false negative area above it is chosen.
+    """
+    similarities = np.linspace(0, 1, 1001)
+    below = similarities <= threshold
+
+    def error(band: Tuple[int, int]) -> float:
+        bands, rows = band
+        probability = 1 - (1 - similarities**rows) ** bands
+        return float(np.mean(np.where(below, probability, 1 - probability)))
+
+    return min(
+        ((bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0),
+        key=error,
+    )
+
+
+class ChunkDeduplicator(BaseCleaner):
+    """Drop or link exact and near-duplicate chunks before they are embedded.
+
+    The deduplicator remembers every chunk it has seen, so successive calls
+    deduplicate across documents.
+
+    Args:
+        threshold (float): Estimated Jaccard similarity of the word shingles above
+            which a chunk is a near-duplicate of an earlier one
+        num_perm (int): Number of MinHash permutations
+        ngram_size (int): Number of words per shingle
+        mode (str): "drop" removes duplicates, "link" keeps them with
+            `duplicate_of` set to the id of the first chunk seen
+        seed (int): Seed of the MinHash permutations, signatures are only
+            comparable between deduplicators with the same seed
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_DEDUP_THRESHOLD,
+        num_perm: int = DEFAULT_MINHASH_PERMUTATIONS,
+        ngram_size: int = DEFAULT_SHINGLE_SIZE,
+        mode: str = "drop",
+        seed: int = 1,
+    ) -> None:
+        if not 0 < threshold <= 1:
+            raise ValueError(f"Invalid dedup threshold: {threshold}, expected a value in (0, 1]")
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Invalid dedup mode: {mode}, expected one of {DEDUP_MODES}")
+        super().__init__()
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.ngram_size = ngram_size
+        self.mode = mode
+        self.bands, self.rows = _lsh_bands(threshold, num_perm)
+
+        # Multiply-shift hash family: h(x) = (a * x + b) >> 32 with odd a
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+        self._exact: Dict[bytes, str] = {}
+        # Last signature added to the bucket of a band hash, earlier ones are
+        # chained through _next_in_bucket, -1 ends a chain
+        self._buckets: List[Dict[int, int]] = [{} for _ in range(self.bands)]
+        self._signatures = np.empty((INITIAL_INDEX_CAPACITY, num_perm), dtype=np.uint32)
+        self._next_in_bucket = np.empty((INITIAL_INDEX_CAPACITY, self.bands), dtype=np.int64)
+        self._num_signatures = 0
+        self._signature_ids: List[str] = []
+        self.num_seen = 0
+        self.num_exact_duplicates = 0
+        self.num_near_duplicates = 0
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Fraction of the chunks seen that were duplicates."""
+        if not self.num_seen:
+            return 0.0
+        return (self.num_exact_duplicates + self.num_near_duplicates) / self.num_seen
+
+    def report(self) -> Dict[str, float]:
+        return {
+            "seen": self.num_seen,
+            "exact_duplicates": self.num_exact_duplicates,
+            "near_duplicates": self.num_near_duplicates,
+            "dedup_ratio": self.dedup_ratio,
+        }
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of the word shingles of a text, None for blank text."""
+        shingles = shingle_hashes(text, self.ngram_size)
+        if not len(shingles):
+            return None
+        hashes = (self._a[:, None] * shingles[None, :] + self._b[:, None]) >> np.uint64(32)
+        return hashes.min(axis=1).astype(np.uint32)
+
+    def clean(self, chunks: Iterable[Chunk]) -> DocList[Chunk]:
+        """Deduplicate chunks against each other and every chunk seen before.
+
+        Only chunks with text content are compared, other chunks are kept as is.
+
+        Returns:
+            DocList[Chunk]: Chunks to keep, in input order
+        """
+        kept = DocList[Chunk]()
+        for chunk in chunks:
+            if not self._verify_data(chunk):
+                kept.append(chunk)
+                continue
+
+            self.num_seen += 1
+            original_id = self._find_duplicate(chunk)
+            if original_id is None:
+                kept.append(chunk)
+            elif self.mode == "link":
+                chunk.duplicate_of = original_id
+                kept.append(chunk)
+        return kept
+
+    def clean_document(self, document: Document) -> Document:
+        """Deduplicate the chunks of a document and set the hash of its pages.
+
+        The hash of a page is computed from the content hashes of all its chunks,
+        before deduplication.
+        """
+        if not document.pages:
+            if document.chunks:
+                document.chunks = self.clean(document.chunks)
+            return document
+
+        kept_ids = set()
+        for page in document.pages:
+            if not page.chunks:
+                continue
+            page.hash_value = hashlib.sha1(
+                b"".join(self._content_hash(chunk) for chunk in page.chunks)
+            ).hexdigest()
+            page.chunks = self.clean(page.chunks)
+            kept_ids.update(chunk.id for chunk in page.chunks)
+
+        if document.chunks:
+            document.chunks = DocList[Chunk](
+                [chunk for chunk in document.chunks if chunk.id in kept_ids]
+            )
+        logger.info(f"Deduplicated document chunks: {self.report()}")
+        return document
+
+    def _verify_data(self, chunk: Chunk) -> bool:
+        return isinstance(chunk.content, str)
+
+    @staticmethod
+    def _content_hash(chunk: Chunk) -> bytes:
+        content = chunk.content if isinstance(chunk.content, str) else str(chunk.content)
+        return hashlib.sha1(content.encode("utf-8")).digest()
+
+    def _find_duplicate(self, chunk: Chunk) -> Optional[str]:
+        """Id of the chunk `chunk` duplicates, registering it if it is new."""
+        content_hash = self._content_hash(chunk)
+        if content_hash in self._exact:
+            self.num_exact_duplicates += 1
+            return self._exact[content_hash]
+
+        chunk_id = str(chunk.id)
+        original_id = self._find_near_duplicate(chunk_id, chunk.content)
+        # Exact copies of a near-duplicate point to its original, not to it
+        self._exact[content_hash] = original_id or chunk_id
+        return original_id
+
+    def _band_hashes(self, signature: np.ndarray) -> List[int]:
+        """64-bit hash of every band of a signature, combined like `shingle_hashes`."""
+        bands = signature[: self.bands * self.rows].reshape(self.bands, self.rows).astype(np.uint64)
+        hashes = np.zeros(self.bands, dtype=np.uint64)
+        # uint64 arithmetic wraps around, which is what the hash relies on
+        for row in range(self.rows):
+            hashes = hashes * np.uint64(0x100000001B3) + bands[:, row]
+        hashes ^= hashes >> np.uint64(33)
+        hashes *= np.uint64(0xFF51AFD7ED558CCD)
+        hashes ^= hashes >> np.uint64(33)
+        return hashes.tolist()
+
+    def _find_near_duplicate(self, chunk_id: str, content: str) -> Optional[str]:
+        """Id of the chunk `content` is a near-duplicate of, indexing it if it is new."""
+        signature = self.signature(content)
+        if signature is None:
+            return None
+
+        band_hashes = self._band_hashes(signature)
+        candidates = set()
+        for band, (buckets, key) in enumerate(zip(self._buckets, band_hashes)):
+            index = buckets.get(key, -1)
+            while index >= 0:
+                candidates.add(index)
+                index = int(self._next_in_bucket[index, band])
+        if candidates:
+            candidates = np.array(sorted(candidates))
+            similarities = np.count_nonzero(self._signatures[candidates] == signature, axis=1) / self.num_perm
+            matches = np.flatnonzero(similarities >= self.threshold)
+            if len(matches):
+                self.num_near_duplicates += 1
+                return self._signature_ids[candidates[matches[0]]]
+
+        index = self._num_signatures
+        if index == len(self._signatures):
+            self._grow()
+        self._signatures[index] = signature
+        self._signature_ids.append(chunk_id)
+        for band, (buckets, key) in enumerate(zip(self._buckets, band_hashes)):
+            self._next_in_bucket[index, band] = buckets.get(key, -1)
+            buckets[key] = index
+        self._num_signatures += 1
+        return None
+
+    def _grow(self) -> None:
+        """Double the capacity of the signature index, so appends are amortized O(1)."""
+        capacity = 2 * len(self._signatures)
+        signatures = np.empty((capacity, self.num_perm), dtype=np.uint32)
+        signatures[: self._num_signatures] = self._signatures[: self._num_signatures]
+        next_in_bucket = np.empty((capacity, self.bands), dtype=np.int64)
+        next_in_bucket[: self._num_signatures] = self._next_in_bucket[: self._num_signatures]
+        self._signatures, self._next_in_bucket = signatures, next_in_bucket
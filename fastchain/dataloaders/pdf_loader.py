@@ -19,7 +19,8 @@ from fastchain.document.chunk.schema import (
     ImageChunk,
     FigureCaptionChunk,
 )
-from utils import num_tokens_from_string, is_valid_url
+from fastchain.dataloaders.utils import is_valid_url
+from fastchain.tokenizer import count_tokens_batch
 
 logger = logging.getLogger(__name__)
 
@@ -70,9 +71,8 @@ class PyPDFLoader(BaseDataloader):
         self.pdf_metadata = self.doc.metadata
 
         for page_number, page in enumerate(self.doc):
-            page_content = []
             output = page.get_text("blocks")
-            previous_block_id = 0
+            text_blocks = []
             for block in output:
                 # The first four entries are the block’s bbox coordinates, block_type is 1 for an image block, 0 for text.
                 # block_no is the block sequence number. Multiple text lines are joined via line breaks.
@@ -81,10 +81,16 @@ class PyPDFLoader(BaseDataloader):
                 if block_type != 0:  # Not text
                     continue
 
-                text_block = unidecode(block_data)
+                text_blocks.append(unidecode(block_data))
+
+            # Count tokens for all the blocks of the page in a single batch
+            block_num_tokens = count_tokens_batch(text_blocks)
+
+            for text_block, num_tokens in zip(text_blocks, block_num_tokens):
+                if num_tokens <= self.token_limit:
+                    self.sections.append(TextChunk(content=text_block))
+                    continue
 
-                # Get number of tokens in the content
-                num_tokens = num_tokens_from_string(text_block)
                 text_chunks = chunk_text_by_token_limit(
                     text_block, self.token_limit
                 )
@@ -1,15 +1,13 @@
 import urllib.parse
 
-import tiktoken
+from fastchain.tokenizer import count_tokens
 
 
 def num_tokens_from_string(
     string: str, encoding_name: str = "gpt-3.5-turbo"
 ) -> int:
     """Returns the number of tokens in a text string."""
-    encoding = tiktoken.get_encoding(encoding_name)
-    num_tokens = len(encoding.encode(string))
-    return num_tokens
+    return count_tokens(string, encoding_name)
 
 
 def is_valid_url(input_string: str) -> bool:
@@ -7,6 +7,7 @@ from .chunk.schema import (
     AudioChunk,
     VideoChunk,
 )
+from .chunk.view import ChunkSource, ChunkView
 
 # List the names you want to export when someone imports the package.
 __all__ = [
@@ -19,4 +20,6 @@ __all__ = [
     FigureCaptionChunk,
     AudioChunk,
     VideoChunk,
+    ChunkSource,
+    ChunkView,
 ]
@@ -38,13 +38,15 @@ class Chunk(BaseDoc):
     document_id: Optional[UUID]
     page_id: Optional[UUID]
     EMBEDDING_SIZE: Optional[int]
-    embedding: Optional[NdArrayEmbedding[EMBEDDING_SIZE]] = Field(
-        is_embedding=True
-    )
+    # Not parametrized by EMBEDDING_SIZE, a field has no value at class creation
+    # and the annotation would stay an unresolvable forward reference
+    embedding: Optional[NdArrayEmbedding] = Field(default=None, is_embedding=True)
     content_type: str = "text"
     # Refer this to know why this is set to any https://docs.docarray.org/user_guide/storing/index_weaviate/#notes
     content: Any = ""
     coordinates: Optional[tuple]
+    # Id of the chunk this one duplicates, set by ChunkDeduplicator
+    duplicate_of: Optional[str] = None
     _previous: Union[Type[Chunk], None] = None
     _next: Union[Type[Chunk], None] = None
 
@@ -22,9 +22,44 @@ from docarray.typing import (
     VideoBytes,
     AudioBytes,
 )
-from pydantic import Field, ValidationError, validator
-from fastchain.utils import num_tokens_from_string
-from fastchain.constants import MAX_CHUNK_SIZE_TOKENS
+from typing import Optional
+from pydantic import Field, ValidationError, root_validator, validator
+from fastchain.tokenizer import count_tokens
+from fastchain.constants import DEFAULT_CHUNK_VALIDATION_MODE, MAX_CHUNK_SIZE_TOKENS
+
+CHUNK_VALIDATION_MODES = ("strict", "lazy")
+_chunk_validation_mode = DEFAULT_CHUNK_VALIDATION_MODE
+
+
+def set_chunk_validation_mode(mode: str) -> None:
+    """Set how the length of text chunks is validated, for the whole process.
+
+    Args:
+        mode (str): "strict" re-tokenizes every chunk on construction, "lazy" trusts
+            the `num_tokens` given by the chunker and only tokenizes chunks without it.
+    """
+    global _chunk_validation_mode
+    if mode not in CHUNK_VALIDATION_MODES:
+        raise ValueError(f"Invalid chunk validation mode: {mode}, expected one of {CHUNK_VALIDATION_MODES}")
+    _chunk_validation_mode = mode
+
+
+def get_chunk_validation_mode() -> str:
+    return _chunk_validation_mode
+
+
+def validate_num_tokens(text: str, num_tokens: Optional[int] = None) -> int:
+    """Check that a text fits in MAX_CHUNK_SIZE_TOKENS and return its token count.
+
+    The text is only tokenized when `num_tokens` is unknown or validation is strict.
+    """
+    if num_tokens is None or _chunk_validation_mode == "strict":
+        num_tokens = count_tokens(text)
+    if num_tokens > MAX_CHUNK_SIZE_TOKENS:
+        raise ValueError(
+            f"Chunk size cannot be greater than MAX_CHUNK_SIZE_TOKENS: {MAX_CHUNK_SIZE_TOKENS}, NUM_TOKENS: {num_tokens}"
+        )
+    return num_tokens
 
 
 class TextChunk(Chunk):
@@ -32,16 +67,17 @@ class TextChunk(Chunk):
 
     content_type: str = "plaintext"
     content: str = Field(default_factory=str)
-
-    @validator("content")
-    def validate_text_length(cls, text):
-        NUM_TOKENS = num_tokens_from_string(text)
-        if NUM_TOKENS > MAX_CHUNK_SIZE_TOKENS:
-            raise ValidationError(
-                f"Chunk size cannot be greater than MAX_CHUNK_SIZE_TOKENS: {MAX_CHUNK_SIZE_TOKENS}, NUM_TOKENS: {NUM_TOKENS}",
-                loc="text",
-            )
-        return text
+    # Character offsets of the chunk in the text it was created from
+    start_index: Optional[int] = None
+    end_index: Optional[int] = None
+    # Number of tokens in the content, chunkers that already counted them set it
+    # so that validation does not tokenize the content again
+    num_tokens: Optional[int] = None
+
+    @root_validator(skip_on_failure=True)
+    def validate_text_length(cls, values):
+        values["num_tokens"] = validate_num_tokens(values["content"], values.get("num_tokens"))
+        return values
 
     # def __str__(self):
     #     return self.content
@@ -55,6 +91,14 @@ class CodeChunk(Chunk):
 
     content_type: str = "code"
     content: str = Field(default_factory=str)
+    # Path of the file the chunk was created from
+    file_path: Optional[str] = None
+    # Byte offsets of the chunk in the UTF-8 encoded file
+    start_byte: Optional[int] = None
+    end_byte: Optional[int] = None
+    # Lines of the chunk in the file, 0-based, the end line is excluded
+    start_line: Optional[int] = None
+    end_line: Optional[int] = None
 
 
 class ImageChunk(Chunk):
@@ -0,0 +1,132 @@
+"""Zero-copy chunk views.
+
+A ChunkView only holds the offsets of a chunk into a shared ChunkSource, the
+text of the chunk is materialized when `content` is accessed. Pipelines that
+only need lengths, offsets or hashes never allocate the chunk text.
+"""
+from __future__ import annotations
+
+import hashlib
+import mmap
+import uuid
+from typing import Optional, Tuple, Union
+
+from fastchain.document.chunk.schema import TextChunk
+
+SourceBuffer = Union[str, bytes, bytearray, memoryview, mmap.mmap]
+
+
+class ChunkSource:
+    """Source text shared by many chunk views.
+
+    Args:
+        buffer (SourceBuffer): A string, or an encoded buffer (bytes, memoryview, mmap).
+            Offsets of views are character offsets for strings and byte offsets
+            for encoded buffers.
+        source_id (Optional[str]): Id of the source, generated if not given
+        encoding (str): Encoding of binary buffers
+    """
+
+    __slots__ = ("source_id", "buffer", "encoding")
+
+    def __init__(
+        self,
+        buffer: SourceBuffer,
+        source_id: Optional[str] = None,
+        encoding: str = "utf-8",
+    ) -> None:
+        self.source_id = source_id or str(uuid.uuid4())
+        self.buffer = buffer
+        self.encoding = encoding
+
+    @classmethod
+    def from_file(cls, path: str, source_id: Optional[str] = None, encoding: str = "utf-8") -> ChunkSource:
+        """Memory map a file as a chunk source.
+
+        Views only read their own bytes of the mapping, but chunking the source with
+        `create_chunk_views` decodes the whole file once to find the boundaries.
+        """
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, source_id=source_id or str(path), encoding=encoding)
+
+    @property
+    def is_binary(self) -> bool:
+        return not isinstance(self.buffer, str)
+
+    def text(self) -> str:
+        """The whole source as a string."""
+        if self.is_binary:
+            return str(memoryview(self.buffer), self.encoding)
+        return self.buffer
+
+    def raw(self, start: int, end: int) -> Union[str, memoryview]:
+        """Slice of the source, without copying for binary buffers."""
+        if self.is_binary:
+            return memoryview(self.buffer)[start:end]
+        return self.buffer[start:end]
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+
+class ChunkView:
+    """A chunk defined by (source_id, start, end) against a shared ChunkSource.
+
+    `start` and `end` are offsets into the source buffer, i.e. byte offsets for
+    binary sources. `char_start` is the character offset of the chunk in the
+    decoded source, computed from the source when not given.
+    """
+
+    __slots__ = ("source", "start", "end", "_char_start")
+
+    def __init__(
+        self, source: ChunkSource, start: int, end: int, char_start: Optional[int] = None
+    ) -> None:
+        self.source = source
+        self.start = start
+        self.end = end
+        self._char_start = char_start
+
+    @property
+    def source_id(self) -> str:
+        return self.source.source_id
+
+    @property
+    def raw(self) -> Union[str, memoryview]:
+        """The chunk as a slice of the source, a memoryview for binary sources."""
+        return self.source.raw(self.start, self.end)
+
+    @property
+    def content(self) -> str:
+        """The chunk text, materialized on every access."""
+        raw = self.raw
+        if isinstance(raw, memoryview):
+            return str(raw, self.source.encoding)
+        return raw
+
+    def digest(self, algorithm: str = "sha1") -> str:
+        """Hex digest of the chunk, hashed in place for binary sources."""
+        raw = self.raw
+        if isinstance(raw, str):
+            raw = raw.encode(self.source.encoding)
+        return hashlib.new(algorithm, raw).hexdigest()
+
+    def char_offsets(self) -> Tuple[int, int]:
+        """(start, end) character offsets of the chunk in the decoded source."""
+        if not self.source.is_binary:
+            return self.start, self.end
+        if self._char_start is None:
+            self._char_start = len(str(self.source.raw(0, self.start), self.source.encoding))
+        return self._char_start, self._char_start + len(self.content)
+
+    def to_chunk(self, **kwargs) -> TextChunk:
+        """Materialize the view as a TextChunk, with character offsets like other chunks."""
+        start, end = self.char_offsets()
+        return TextChunk(content=self.content, start_index=start, end_index=end, **kwargs)
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __repr__(self) -> str:
+        return f"ChunkView(source_id={self.source_id!r}, start={self.start}, end={self.end})"
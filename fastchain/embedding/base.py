@@ -1,20 +1,87 @@
 import asyncio
+import time
 from abc import ABC, abstractmethod
-from typing import Callable, Optional, Dict, List
+from typing import Callable, Optional, Dict, List, Tuple, Union
 import numpy as np
 from fastchain.document.base import Document
 from fastchain.document.chunk.base import Chunk
+from fastchain.embedding.cache import EmbeddingCache
+from fastchain.embedding.metrics import EmbeddingMetrics
+from fastchain.embedding.rate_limit import RateLimiter, retry_after_seconds
+from fastchain.embedding.result import (
+    EmbeddingBatchResult,
+    PartialEmbeddingError,
+    as_embedding_matrix,
+)
+from fastchain.tokenizer import count_tokens_batch
 
 EMB_TYPE = np.ndarray
 DEFAULT_EMBED_BATCH_SIZE = 10
+# Batches in flight at once on the async path
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_RETRIES = 3
+# Rate limiter acquisitions longer than this, in seconds, are counted as waits
+RATE_LIMIT_WAIT_THRESHOLD = 0.001
 
 # Assuming Document, Chunk, etc. are imported or defined
 
 class BaseEmbedding(ABC):
-    def __init__(self, tokenizer: Optional[Callable] = None) -> None:
-        self._total_tokens_used = 0
+    """Base class of the embedding models.
+
+    Args:
+        tokenizer (Optional[Callable]): Tokenizer of the model, used to count the
+            tokens sent to the model. Without it, tokens are only counted, with the
+            shared tiktoken tokenizer, when `max_batch_tokens` or `rate_limiter`
+            need them.
+        embed_batch_size (int): Maximum number of texts per call to the model
+        max_batch_tokens (Optional[int]): Maximum number of tokens per call to the
+            model, unbounded if None
+        max_concurrency (int): Maximum number of batches in flight at once on the
+            async path
+        rate_limiter (Optional[RateLimiter]): Requests and tokens per minute limiter,
+            share one between models using the same provider account
+        max_retries (int): Number of retries of a failed batch
+        cache (Optional[EmbeddingCache]): Cache of the embeddings by model id and
+            content, cached texts are never sent to the model again
+
+    Attributes:
+        max_request_size (Optional[int]): Maximum number of texts the provider
+            accepts in one request, unbounded if None. Batches never exceed it,
+            whatever the `batch_size` asked for.
+        metrics (EmbeddingMetrics): Requests, latencies, tokens, retries, rate
+            limit waits and cache hits of the model
+    """
+
+    max_request_size: Optional[int] = None
+
+    def __init__(
+        self,
+        tokenizer: Optional[Callable] = None,
+        embed_batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
+        max_batch_tokens: Optional[int] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        cache: Optional[EmbeddingCache] = None,
+    ) -> None:
+        if self.max_request_size is not None and embed_batch_size > self.max_request_size:
+            raise ValueError(
+                f"embed_batch_size cannot be greater than {self.max_request_size}, got {embed_batch_size}")
+        self._total_tokens_used: Optional[int] = None
         self._tokenizer = tokenizer
         self._document_queue: List[Document] = []
+        self.embed_batch_size = embed_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.cache = cache
+        self.metrics = EmbeddingMetrics()
+
+    @property
+    def model_id(self) -> str:
+        """Id of the model, embeddings are only cached and reused for the same id."""
+        return type(self).__name__
 
     @abstractmethod
     def _get_embedding(self, content: str) -> EMB_TYPE:
@@ -24,48 +91,339 @@ class BaseEmbedding(ABC):
         """Asynchronous version of _get_embedding."""
         return self._get_embedding(content)
 
+    def _get_embeddings(self, contents: List[str]) -> List[EMB_TYPE]:
+        """Retrieve the embeddings of a batch of contents.
+
+        Embeds one content at a time by default, models that can embed a whole
+        batch in one call should override it.
+        """
+        return [self._get_embedding(content) for content in contents]
+
+    def get_text_embeddings(
+        self, texts: List[str], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """Embed many texts, at most `batch_size` texts per call to the model.
+
+        `batch_size` defaults to `embed_batch_size` and is capped at
+        `max_request_size`. Cached texts are not sent to the model.
+
+        Returns:
+            np.ndarray: float32 matrix with the embedding of the i-th text in row i
+
+        Raises:
+            PartialEmbeddingError: Some batches still failed after their retries,
+                it holds the embeddings of the others
+        """
+        return self._embed_texts(texts, batch_size)
+
+    async def aget_text_embeddings(
+        self, texts: List[str], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """Asynchronous version of get_text_embeddings."""
+        return await self._aembed_texts(texts, batch_size)
+
     def get_chunk_embedding(self, chunk: Chunk) -> EMB_TYPE:
-        if self._tokenizer:
-            self._total_tokens_used += len(self._tokenizer(chunk.content))
-        return self._get_embedding(chunk.content)
+        return self._embed_texts([chunk.content])[0]
 
     async def aget_chunk_embedding(self, chunk: Chunk) -> EMB_TYPE:
-        self._total_tokens_used += len(self._tokenizer(chunk.content))
-        return await self._aget_embedding(chunk.content)
+        return (await self._aembed_texts([chunk.content]))[0]
+
+    async def _aget_embeddings(self, contents: List[str]) -> List[EMB_TYPE]:
+        """Asynchronous version of _get_embeddings.
+
+        Embeds the whole batch with _get_embeddings by default, models with an
+        async client should override it.
+        """
+        return self._get_embeddings(contents)
 
     def queue_document_for_embedding(self, document: Document) -> None:
         """Queue entire document for embedding."""
         self._document_queue.append(document)
 
-    def get_queued_document_embeddings(self) -> Dict[str, Dict[str, EMB_TYPE]]:
-        """Retrieve embeddings for all chunks within queued documents."""
-        result = {}
-        for document in self._document_queue:
-            doc_embeddings = {}
-            for page in document.pages or []:
-                for chunk in page.chunks or []:
-                    doc_embeddings[chunk._id] = self.get_chunk_embedding(chunk)
-            for chunk in document.chunks or []:
-                doc_embeddings[chunk._id] = self.get_chunk_embedding(chunk)
-            result[document._id] = doc_embeddings
-        self._document_queue.clear()
-        return result
+    def get_queued_document_embeddings(self) -> EmbeddingBatchResult:
+        """Retrieve embeddings for all chunks within queued documents.
+
+        The chunks of all the queued documents are embedded together, in batches
+        of at most `embed_batch_size` distinct texts and `max_batch_tokens` tokens.
+
+        Returns:
+            EmbeddingBatchResult: Embedding of every chunk with its document and
+                chunk ids, use `to_dict` for embeddings by chunk id by document id
+
+        Raises:
+            PartialEmbeddingError: Some batches still failed after their retries,
+                its `result` holds the embeddings of the other chunks
+        """
+        chunk_keys, texts = self._flatten_queue()
+        try:
+            return self._batch_result(chunk_keys, self._embed_texts(texts))
+        except PartialEmbeddingError as error:
+            error.result = self._batch_result(chunk_keys, error.embeddings)
+            raise
 
-    async def aget_queued_document_embeddings(self) -> Dict[str, Dict[str, EMB_TYPE]]:
-        """Asynchronous version of get_queued_document_embeddings."""
-        result = {}
+    async def aget_queued_document_embeddings(self) -> EmbeddingBatchResult:
+        """Asynchronous version of get_queued_document_embeddings.
+
+        Up to `max_concurrency` batches are in flight at once, each waiting for
+        the rate limiter first. A failed batch is retried on its own, after the
+        provider's Retry-After when it sent one, which also pauses the limiter.
+        """
+        chunk_keys, texts = self._flatten_queue()
+        try:
+            return self._batch_result(chunk_keys, await self._aembed_texts(texts))
+        except PartialEmbeddingError as error:
+            error.result = self._batch_result(chunk_keys, error.embeddings)
+            raise
+
+    def _embed_texts(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Embed texts in batches, only sending the ones missing from the cache."""
+        cached, missing = self._lookup_cache(texts)
+        batches = self._pack_batches(list(missing), batch_size)
+        fresh: List[Union[np.ndarray, BaseException]] = []
+        for batch, num_tokens in batches:
+            # A failed batch does not stop the others, see _assemble_embeddings
+            try:
+                fresh.append(self._request_embeddings(batch, num_tokens))
+            except Exception as error:
+                fresh.append(error)
+        return self._assemble_embeddings(cached, missing, batches, fresh)
+
+    async def _aembed_texts(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Asynchronous version of _embed_texts, batches are embedded concurrently."""
+        cached, missing = self._lookup_cache(texts)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        batches = self._pack_batches(list(missing), batch_size)
+        results = await asyncio.gather(
+            *(self._aembed_batch(batch, num_tokens, semaphore) for batch, num_tokens in batches),
+            return_exceptions=True,
+        )
+        for result in results:
+            # Only failed batches are reported as partial results, not cancellations
+            if isinstance(result, BaseException) and not isinstance(result, Exception):
+                raise result
+        return self._assemble_embeddings(cached, missing, batches, results)
+
+    def _request_embeddings(self, batch: List[str], num_tokens: int = 0) -> np.ndarray:
+        """Embed and cache one batch with the model after waiting for the rate limiter,
+        retrying it on failure and recording the requests in `metrics`."""
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                start = time.perf_counter()
+                self.rate_limiter.acquire_sync(num_tokens)
+                waited = time.perf_counter() - start
+                if waited > RATE_LIMIT_WAIT_THRESHOLD:
+                    self.metrics.record_rate_limit_wait(waited)
+            start = time.perf_counter()
+            try:
+                embeddings = self._get_embeddings(batch)
+                self.metrics.record_request(len(batch), time.perf_counter() - start)
+                return self._cache_batch(batch, embeddings)
+            except Exception as error:
+                self.metrics.record_request(len(batch), time.perf_counter() - start, error=True)
+                if attempt == self.max_retries:
+                    raise
+                self.metrics.record_retry()
+                retry_after = retry_after_seconds(error)
+                if retry_after is not None and self.rate_limiter is not None:
+                    self.rate_limiter.pause(retry_after)
+            time.sleep(retry_after if retry_after is not None else min(2**attempt, 30))
+
+    async def _aembed_batch(
+        self, batch: List[str], num_tokens: int, semaphore: asyncio.Semaphore
+    ) -> np.ndarray:
+        """Embed and cache one batch under the semaphore and rate limiter, retrying it on failure."""
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                if self.rate_limiter is not None:
+                    start = time.perf_counter()
+                    await self.rate_limiter.acquire(num_tokens)
+                    waited = time.perf_counter() - start
+                    if waited > RATE_LIMIT_WAIT_THRESHOLD:
+                        self.metrics.record_rate_limit_wait(waited)
+                start = time.perf_counter()
+                try:
+                    embeddings = await self._aget_embeddings(batch)
+                    self.metrics.record_request(len(batch), time.perf_counter() - start)
+                    return self._cache_batch(batch, embeddings)
+                except Exception as error:
+                    self.metrics.record_request(len(batch), time.perf_counter() - start, error=True)
+                    if attempt == self.max_retries:
+                        raise
+                    self.metrics.record_retry()
+                    retry_after = retry_after_seconds(error)
+                    if retry_after is not None and self.rate_limiter is not None:
+                        self.rate_limiter.pause(retry_after)
+            # Wait outside of the semaphore so other batches can go on
+            await asyncio.sleep(retry_after if retry_after is not None else min(2**attempt, 30))
+
+    def _cache_batch(self, batch: List[str], embeddings: List[EMB_TYPE]) -> np.ndarray:
+        """Cache the embeddings of a batch as soon as it returns, so the batches that went
+        through are not sent again when a later one fails."""
+        matrix = as_embedding_matrix(embeddings)
+        if self.cache is not None:
+            self.cache.put_many(self.model_id, batch, matrix)
+        return matrix
+
+    def _lookup_cache(
+        self, texts: List[str]
+    ) -> Tuple[List[Optional[EMB_TYPE]], Dict[str, List[int]]]:
+        """Cached embedding of every text, and the indices of each distinct uncached text."""
+        if self.cache is None:
+            embeddings: List[Optional[EMB_TYPE]] = [None] * len(texts)
+        else:
+            embeddings = self.cache.get_many(self.model_id, texts)
+        missing: Dict[str, List[int]] = {}
+        for i, (text, embedding) in enumerate(zip(texts, embeddings)):
+            if embedding is None:
+                missing.setdefault(text, []).append(i)
+        if self.cache is not None:
+            num_misses = sum(len(indices) for indices in missing.values())
+            self.metrics.record_cache_lookup(len(texts) - num_misses, num_misses)
+        return embeddings, missing
+
+    def _assemble_embeddings(
+        self,
+        cached: List[Optional[EMB_TYPE]],
+        missing: Dict[str, List[int]],
+        batches: List[Tuple[List[str], int]],
+        fresh: List[Union[np.ndarray, BaseException]],
+    ) -> np.ndarray:
+        """Matrix of the embeddings of all the texts.
+
+        Args:
+            cached (List[Optional[EMB_TYPE]]): Cached embedding of every text
+            missing (Dict[str, List[int]]): Indices of each distinct uncached text
+            batches (List[Tuple[List[str], int]]): Batches of uncached texts, in
+                `missing` order
+            fresh (List[Union[np.ndarray, BaseException]]): Embedding matrix of
+                every batch, or the error it failed with
+
+        Raises:
+            PartialEmbeddingError: Some batches failed, the rows of their texts are NaN
+        """
+        succeeded = [result for result in fresh if not isinstance(result, BaseException)]
+        num_fresh = sum(len(result) for result in succeeded)
+        num_failed = sum(
+            len(batch)
+            for (batch, _), result in zip(batches, fresh)
+            if isinstance(result, BaseException)
+        )
+        if num_fresh + num_failed != len(missing):
+            raise ValueError(f"Got {num_fresh} embeddings for {len(missing) - num_failed} texts")
+
+        if succeeded:
+            dim = succeeded[0].shape[1]
+        else:
+            dim = next((len(embedding) for embedding in cached if embedding is not None), 0)
+        matrix = np.empty((len(cached), dim), dtype=np.float32)
+        for i, embedding in enumerate(cached):
+            if embedding is not None:
+                matrix[i] = embedding
+
+        indices = list(missing.values())
+        first_rows = np.array([text_indices[0] for text_indices in indices], dtype=np.intp)
+        errors, failed, offset = [], [], 0
+        for (batch, _), result in zip(batches, fresh):
+            rows = first_rows[offset : offset + len(batch)]
+            if isinstance(result, BaseException):
+                errors.append(result)
+                for text_indices in indices[offset : offset + len(batch)]:
+                    failed.extend(text_indices)
+                matrix[rows] = np.nan
+            else:
+                matrix[rows] = result
+            offset += len(batch)
+        for text_indices in indices:
+            if len(text_indices) > 1:
+                matrix[text_indices[1:]] = matrix[text_indices[0]]
+
+        if errors:
+            failed_indices = np.array(sorted(failed), dtype=np.intp)
+            raise PartialEmbeddingError(matrix, failed_indices, errors) from errors[0]
+        return matrix
+
+    def _flatten_queue(self) -> Tuple[List[Tuple[str, str, int]], List[str]]:
+        """Flatten the chunks of the queued documents and empty the queue.
+
+        Returns:
+            Tuple: (document id, chunk id, text index) of every chunk, and the
+                distinct texts
+        """
+        text_indices: Dict[str, int] = {}
+        chunk_keys, seen = [], set()
         for document in self._document_queue:
-            doc_embeddings = {}
-            for page in document.pages or []:
-                for chunk in page.chunks or []:
-                    doc_embeddings[chunk._id] = await self.aget_chunk_embedding(chunk)
-            for chunk in document.chunks or []:
-                doc_embeddings[chunk._id] = await self.aget_chunk_embedding(chunk)
-            result[document._id] = doc_embeddings
+            chunks = [chunk for page in document.pages or [] for chunk in page.chunks or []]
+            chunks.extend(document.chunks or [])
+            for chunk in chunks:
+                # Chunks can be listed both in a page and in the document
+                key = (str(document.id), str(chunk.id))
+                if key in seen:
+                    continue
+                seen.add(key)
+                index = text_indices.setdefault(chunk.content, len(text_indices))
+                chunk_keys.append((*key, index))
         self._document_queue.clear()
-        return result
+        return chunk_keys, list(text_indices)
+
+    def _pack_batches(
+        self, texts: List[str], batch_size: Optional[int] = None
+    ) -> List[Tuple[List[str], int]]:
+        """Pack texts in order into batches bounded in texts and tokens.
+
+        The tokens of the texts are added to `total_tokens_used`. They are left
+        uncounted when the model has no tokenizer and neither `max_batch_tokens`
+        nor `rate_limiter` needs them, every batch then has 0 tokens and the
+        totals stay unknown.
+
+        Returns:
+            List[Tuple[List[str], int]]: Every batch with its number of tokens
+        """
+        if not texts:
+            return []
+        batch_size = batch_size or self.embed_batch_size
+        if self.max_request_size is not None:
+            batch_size = min(batch_size, self.max_request_size)
+        if self._tokenizer:
+            num_tokens = [len(self._tokenizer(text)) for text in texts]
+        elif self.max_batch_tokens is not None or self.rate_limiter is not None:
+            num_tokens = count_tokens_batch(texts)
+        else:
+            num_tokens = None
+        if num_tokens is None:
+            num_tokens = [0] * len(texts)
+        else:
+            self._total_tokens_used = (self._total_tokens_used or 0) + sum(num_tokens)
+            self.metrics.record_tokens(sum(num_tokens))
+
+        batches, batch, batch_tokens = [], [], 0
+        for text, text_tokens in zip(texts, num_tokens):
+            if batch and (
+                len(batch) >= batch_size
+                or (
+                    self.max_batch_tokens is not None
+                    and batch_tokens + text_tokens > self.max_batch_tokens
+                )
+            ):
+                batches.append((batch, batch_tokens))
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += text_tokens
+        if batch:
+            batches.append((batch, batch_tokens))
+        return batches
+
+    @staticmethod
+    def _batch_result(
+        chunk_keys: List[Tuple[str, str, int]], embeddings: np.ndarray
+    ) -> EmbeddingBatchResult:
+        if not chunk_keys:
+            return EmbeddingBatchResult.empty(embeddings.shape[1])
+        document_ids, chunk_ids, indices = zip(*chunk_keys)
+        return EmbeddingBatchResult(
+            embeddings[np.asarray(indices, dtype=np.intp)], document_ids, chunk_ids
+        )
 
     @property
-    def total_tokens_used(self) -> int:
-        """get total tokens."""
+    def total_tokens_used(self) -> Optional[int]:
+        """get total tokens, None while no tokens were counted."""
         return self._total_tokens_used
@@ -0,0 +1,114 @@
+"""Micro-batching of concurrent embedding requests.
+
+At query time every request embeds a single text. The micro-batcher holds
+concurrent requests for at most `max_wait_ms`, or until `max_batch_size` of
+them are waiting, and embeds them with one call to the model.
+"""
+import asyncio
+import time
+from typing import List, Optional, Set, Tuple
+
+from fastchain.embedding.base import EMB_TYPE, BaseEmbedding
+from fastchain.embedding.metrics import Histogram, exponential_buckets
+from fastchain.embedding.result import PartialEmbeddingError
+
+DEFAULT_MICRO_BATCH_SIZE = 32
+DEFAULT_MICRO_BATCH_WAIT_MS = 5.0
+
+
+class EmbeddingMicroBatcher:
+    """Embed the texts of concurrent requests together, in one call to the model.
+
+    Every waiting request is flushed at most `max_wait_ms` after the first of
+    its batch arrived, or as soon as `max_batch_size` requests are waiting.
+    Batches go through the model's cache, rate limiter and retries.
+
+    Args:
+        embed_model (BaseEmbedding): Model embedding the batches
+        max_batch_size (int): Number of waiting requests that triggers a flush
+        max_wait_ms (float): Longest time a request waits for others, 0 flushes
+            the requests arrived during the same event loop iteration
+
+    Attributes:
+        batch_sizes (Histogram): Number of texts of every flushed batch
+        latencies (Histogram): Seconds from every request to its embedding
+    """
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        max_batch_size: int = DEFAULT_MICRO_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MICRO_BATCH_WAIT_MS,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be at least 1, got {max_batch_size}")
+        self.embed_model = embed_model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batch_sizes = Histogram(exponential_buckets(1, 2, max_batch_size.bit_length() + 1))
+        self.latencies = Histogram()
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> EMB_TYPE:
+        """Embedding of a text, computed in a batch with the concurrent requests."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        return await future
+
+    async def flush(self) -> None:
+        """Embed the waiting requests now and wait for every batch in flight."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._embed_batch(batch))
+        # The loop only keeps weak references to its tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _embed_batch(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        self.batch_sizes.observe(len(batch))
+        failed: Set[int] = set()
+        try:
+            embeddings = await self.embed_model.aget_text_embeddings([text for text, _, _ in batch])
+        except PartialEmbeddingError as error:
+            # The requests of the model batches that went through still get their embedding
+            embeddings, cause = error.embeddings, error.errors[0]
+            failed = set(error.failed_indices.tolist())
+        except Exception as error:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        now = time.perf_counter()
+        for i, ((_, future, start), embedding) in enumerate(zip(batch, embeddings)):
+            # Cancelled requests have no one to resolve
+            if not future.done():
+                if i in failed:
+                    future.set_exception(cause)
+                else:
+                    future.set_result(embedding)
+            self.latencies.observe(now - start)
+
+    def stats(self) -> dict:
+        return {
+            "batch_size": self.batch_sizes.snapshot(),
+            "latency_seconds": self.latencies.snapshot(),
+            "pending": len(self._pending),
+            "in_flight": len(self._tasks),
+        }
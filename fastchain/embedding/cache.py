@@ -0,0 +1,197 @@
+"""Content-addressed cache of embeddings.
+
+Embeddings are keyed by the id of the model that produced them and the hash of
+the normalized content, so unchanged chunks are never sent to the model twice.
+The cache has an in-memory LRU tier in front of an optional SQLite tier, which
+stores float32 blobs and survives restarts.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_MEMORY_CACHE_SIZE = 100_000
+
+
+def normalize_content(content: str) -> str:
+    """Content as it is hashed: NFC normalized, whitespace collapsed and stripped."""
+    return " ".join(unicodedata.normalize("NFC", content).split())
+
+
+def cache_key(model_id: str, content: str) -> str:
+    """Cache key of a content embedded by a model."""
+    return hashlib.sha256(
+        f"{model_id}\0{normalize_content(content)}".encode("utf-8")
+    ).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: a memory LRU in front of an optional SQLite file.
+
+    Args:
+        path (Optional[str]): SQLite file of the disk tier, memory only if None
+        max_memory_items (int): Number of embeddings kept in memory
+        max_disk_bytes (Optional[int]): Size of the embeddings stored on disk above
+            which the least recently used ones are evicted, unbounded if None
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_items: int = DEFAULT_MEMORY_CACHE_SIZE,
+        max_disk_bytes: Optional[int] = None,
+    ) -> None:
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)"
+            )
+            self._disk_bytes = self._db.execute(
+                "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()[0]
+
+    def get_many(self, model_id: str, contents: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached embeddings of contents, None for the ones that are not cached."""
+        keys = [cache_key(model_id, content) for content in contents]
+        with self._lock:
+            results: List[Optional[np.ndarray]] = []
+            missing: Dict[str, List[int]] = {}
+            for i, key in enumerate(keys):
+                embedding = self._memory.get(key)
+                if embedding is not None:
+                    self._memory.move_to_end(key)
+                else:
+                    missing.setdefault(key, []).append(i)
+                results.append(embedding)
+
+            if missing and self._db is not None:
+                for key, embedding in self._load(list(missing)).items():
+                    self._remember(key, embedding)
+                    for i in missing.pop(key):
+                        results[i] = embedding
+
+            num_misses = sum(len(indices) for indices in missing.values())
+            self.misses += num_misses
+            self.hits += len(keys) - num_misses
+            return results
+
+    def put_many(
+        self, model_id: str, contents: Sequence[str], embeddings: Sequence[np.ndarray]
+    ) -> None:
+        """Cache the embeddings of contents, as float32."""
+        entries = {
+            cache_key(model_id, content): np.asarray(embedding, dtype=np.float32)
+            for content, embedding in zip(contents, embeddings)
+        }
+        with self._lock:
+            for key, embedding in entries.items():
+                self._remember(key, embedding)
+            if self._db is not None:
+                self._store(entries)
+
+    def get(self, model_id: str, content: str) -> Optional[np.ndarray]:
+        return self.get_many(model_id, [content])[0]
+
+    def put(self, model_id: str, content: str, embedding: np.ndarray) -> None:
+        self.put_many(model_id, [content], [embedding])
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM embeddings")
+                self._disk_bytes = 0
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, key: str, embedding: np.ndarray) -> None:
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _load(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        # Stay under SQLite's limit on the number of query parameters
+        for i in range(0, len(keys), 500):
+            batch = keys[i : i + 500]
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+        if found:
+            now = time.time()
+            with self._db:
+                self._db.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+        return found
+
+    def _store(self, entries: Dict[str, np.ndarray]) -> None:
+        now = time.time()
+        keys = list(entries)
+        existing = 0
+        for i in range(0, len(keys), 500):
+            batch = keys[i : i + 500]
+            existing += self._db.execute(
+                f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings "
+                f"WHERE key IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchone()[0]
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                [(key, embedding.tobytes(), now) for key, embedding in entries.items()],
+            )
+        self._disk_bytes += sum(embedding.nbytes for embedding in entries.values()) - existing
+        if self.max_disk_bytes is not None and self._disk_bytes > self.max_disk_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Delete the least recently used embeddings until the disk tier fits."""
+        with self._db:
+            rows = self._db.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_access"
+            )
+            evicted = []
+            for key, size in rows:
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+                evicted.append((key,))
+                self._disk_bytes -= size
+            self._db.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
@@ -1,15 +1,20 @@
+import asyncio
+import os
+import threading
+from enum import Enum
+from typing import Any, Callable, List, Optional
+
 import cohere
-from fastchain.embedding.base import BaseEmbedding
 import numpy as np
-from enum import Enum
-from typing import Any, Dict, List
-from fastchain.document.base import Document
-import os
 
-EMB_TYPE = np.ndarray
-DEFAULT_EMBED_BATCH_SIZE = 10
-apikey = os.environ.get("COHERE_API_KEY")   
-co = cohere.Client(apikey)
+from fastchain.embedding.base import DEFAULT_MAX_CONCURRENCY, EMB_TYPE, BaseEmbedding
+from fastchain.embedding.cache import EmbeddingCache
+from fastchain.embedding.rate_limit import RateLimiter
+from fastchain.embedding.result import as_embedding_matrix
+
+# Maximum number of texts of a single embed request
+COHERE_MAX_BATCH_SIZE = 96
+
 
 class CohereEmbeddingModels(Enum):
     """Cohere embedding models."""
@@ -24,40 +29,74 @@ def get_cohere_engine(model: str) -> CohereEmbeddingModels:
     return CohereEmbeddingModels(model)
 
 class CohereEmbedding(BaseEmbedding):
-    """Cohere class for embeddings."""
-    
-    def __init__(self, model: str = CohereEmbeddingModels.EMBED_ENGLISH.value, **kwargs: Any) -> None:
-        super().__init__()
+    """Cohere class for embeddings.
+
+    Texts are embedded up to `embed_batch_size`, and never more than 96, per
+    request. The client has no async API, so on the async path requests run in
+    threads, `max_concurrency` of them at once.
+
+    Args:
+        model (str): Cohere embedding model
+        api_key (Optional[str]): Cohere API key, read from COHERE_API_KEY if None
+        embed_batch_size (int): Number of texts per request, at most 96
+        tokenizer (Optional[Callable]): Tokenizer used to count the tokens sent
+        max_concurrency (int): Number of requests in flight at once on the async path
+        rate_limiter (Optional[RateLimiter]): Requests and tokens per minute limiter
+        cache (Optional[EmbeddingCache]): Cache of the embeddings
+        **kwargs: Extra arguments of `cohere.Client.embed`
+    """
+
+    max_request_size = COHERE_MAX_BATCH_SIZE
+
+    def __init__(
+        self,
+        model: str = CohereEmbeddingModels.EMBED_ENGLISH.value,
+        api_key: Optional[str] = None,
+        embed_batch_size: int = COHERE_MAX_BATCH_SIZE,
+        tokenizer: Optional[Callable] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[EmbeddingCache] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(
+            tokenizer,
+            embed_batch_size=embed_batch_size,
+            max_concurrency=max_concurrency,
+            rate_limiter=rate_limiter,
+            cache=cache,
+        )
         self.cohere_model = get_cohere_engine(model)
-        
-    def _get_embedding(self, content: str) -> List[float]:
-        response = co.embed(texts=[content], model=self.cohere_model.value)
-        return response
-
-    async def _aget_embedding(self, content: str) -> List[float]:
-        # Cohere's client doesn't have an async method, so we can reuse the synchronous one
-        return await self._get_embedding(content)
-
-    def queue_document_for_embedding(self, document: Document) -> None:
-        self._document_queue.append(document)
-
-    def _process_documents(self, async_mode: bool = False) -> Dict[str, Dict[str, EMB_TYPE]]:
-        result = {}
-        for document in self._document_queue:
-            doc_embeddings = {}
-            for page in document.pages or []:
-                for chunk in page.chunks or []:
-                    emb_func = self.aget_chunk_embedding if async_mode else self.get_chunk_embedding
-                    doc_embeddings[chunk._id] = emb_func(chunk)
-            for chunk in document.chunks or []:
-                emb_func = self.aget_chunk_embedding if async_mode else self.get_chunk_embedding
-                doc_embeddings[chunk._id] = emb_func(chunk)
-            result[document._id] = doc_embeddings
-        self._document_queue.clear()
-        return result
-
-    def get_queued_document_embeddings(self) -> Dict[str, Dict[str, EMB_TYPE]]:
-        return self._process_documents()
-
-    async def aget_queued_document_embeddings(self) -> Dict[str, Dict[str, EMB_TYPE]]:
-        return await self._process_documents(async_mode=True)
\ No newline at end of file
+        self.cohere_kwargs = kwargs
+        self._api_key = api_key
+        self._client: Optional[cohere.Client] = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        return f"cohere:{self.cohere_model.value}"
+
+    @property
+    def client(self) -> cohere.Client:
+        """Cohere client, created on first use and shared by every request."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = cohere.Client(self._api_key or os.environ.get("COHERE_API_KEY"))
+        return self._client
+
+    def _get_embedding(self, content: str) -> EMB_TYPE:
+        return self._get_embeddings([content])[0]
+
+    async def _aget_embedding(self, content: str) -> EMB_TYPE:
+        return (await self._aget_embeddings([content]))[0]
+
+    def _get_embeddings(self, contents: List[str]) -> np.ndarray:
+        response = self.client.embed(
+            texts=contents, model=self.cohere_model.value, **self.cohere_kwargs
+        )
+        return as_embedding_matrix(response.embeddings)
+
+    async def _aget_embeddings(self, contents: List[str]) -> np.ndarray:
+        # The client is synchronous, run the request in a thread of the default executor
+        return await asyncio.to_thread(self._get_embeddings, contents)
@@ -0,0 +1,172 @@
+"""Local embeddings from hashed n-gram features, optionally TF-IDF weighted.
+
+Word or character n-grams are hashed into `dim` signed buckets (the hashing
+trick), so no vocabulary is kept and embeddings are deterministic across runs
+and machines. Hashes are computed with vectorized NumPy arithmetic over a whole
+batch at once, and the sparse counts are projected to a dense matrix with a
+single bincount.
+"""
+import hashlib
+import re
+import zlib
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from fastchain.embedding.base import EMB_TYPE, BaseEmbedding
+from fastchain.embedding.cache import EmbeddingCache
+
+HASHING_ANALYZERS = ("word", "char")
+DEFAULT_HASHING_DIM = 1024
+DEFAULT_HASHING_BATCH_SIZE = 1024
+
+_WORD = re.compile(r"\w+")
+_PRIME = np.uint64(0x100000001B3)
+
+
+def _finalize(hashes: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, so that similar n-grams land in unrelated buckets."""
+    hashes ^= hashes >> np.uint64(33)
+    hashes *= np.uint64(0xFF51AFD7ED558CCD)
+    hashes ^= hashes >> np.uint64(33)
+    return hashes
+
+
+class HashingEmbedding(BaseEmbedding):
+    """Embed texts as L2-normalized, feature-hashed n-gram counts.
+
+    With `use_idf`, the counts are weighted by the smoothed inverse document
+    frequency of their bucket, fitted on a corpus with `fit` / `partial_fit`.
+
+    Args:
+        dim (int): Dimension of the embeddings
+        analyzer (str): "word" for word n-grams or "char" for character n-grams
+        ngram_range (Optional[Tuple[int, int]]): Smallest and largest n-gram sizes,
+            (1, 2) for words and (3, 5) for characters by default
+        lowercase (bool): Lowercase texts before extracting n-grams
+        use_idf (bool): Weight counts by inverse document frequency
+        embed_batch_size (int): Number of texts vectorized together
+        tokenizer (Optional[Callable]): Tokenizer used to count tokens, splits on
+            whitespace by default
+        cache (Optional[EmbeddingCache]): Cache of the embeddings
+    """
+
+    def __init__(
+        self,
+        dim: int = DEFAULT_HASHING_DIM,
+        analyzer: str = "word",
+        ngram_range: Optional[Tuple[int, int]] = None,
+        lowercase: bool = True,
+        use_idf: bool = False,
+        embed_batch_size: int = DEFAULT_HASHING_BATCH_SIZE,
+        tokenizer: Optional[Callable] = None,
+        cache: Optional[EmbeddingCache] = None,
+    ) -> None:
+        if analyzer not in HASHING_ANALYZERS:
+            raise ValueError(f"Invalid analyzer: {analyzer}, expected one of {HASHING_ANALYZERS}")
+        if ngram_range is None:
+            ngram_range = (1, 2) if analyzer == "word" else (3, 5)
+        if not 1 <= ngram_range[0] <= ngram_range[1]:
+            raise ValueError(f"Invalid ngram_range: {ngram_range}")
+        super().__init__(tokenizer or str.split, embed_batch_size=embed_batch_size, cache=cache)
+        self.dim = dim
+        self.analyzer = analyzer
+        self.ngram_range = ngram_range
+        self.lowercase = lowercase
+        self.use_idf = use_idf
+        self._num_documents = 0
+        self._document_frequencies = np.zeros(dim, dtype=np.int64)
+
+    @property
+    def model_id(self) -> str:
+        model_id = f"hashing:{self.analyzer}:{self.ngram_range[0]}-{self.ngram_range[1]}:{self.dim}"
+        if not self.lowercase:
+            model_id += ":cased"
+        if self.use_idf:
+            # Fitting on another corpus changes the embeddings
+            digest = hashlib.sha1(self._document_frequencies.tobytes())
+            digest.update(str(self._num_documents).encode("utf-8"))
+            model_id += f":idf-{digest.hexdigest()[:16]}"
+        return model_id
+
+    @property
+    def idf(self) -> np.ndarray:
+        """Smoothed inverse document frequency of every bucket."""
+        return (
+            np.log((1 + self._num_documents) / (1 + self._document_frequencies)) + 1
+        ).astype(np.float32)
+
+    def fit(self, texts: List[str]) -> "HashingEmbedding":
+        """Fit the document frequencies on a corpus, forgetting earlier fits."""
+        self._num_documents = 0
+        self._document_frequencies[:] = 0
+        return self.partial_fit(texts)
+
+    def partial_fit(self, texts: List[str]) -> "HashingEmbedding":
+        """Add a part of the corpus to the document frequencies."""
+        for i in range(0, len(texts), self.embed_batch_size):
+            batch = texts[i : i + self.embed_batch_size]
+            rows, buckets, _ = self._features(batch)
+            present = np.unique(rows.astype(np.int64) * self.dim + buckets) % self.dim
+            self._document_frequencies += np.bincount(present, minlength=self.dim)
+            self._num_documents += len(batch)
+        return self
+
+    def _get_embedding(self, content: str) -> EMB_TYPE:
+        return self._get_embeddings([content])[0]
+
+    def _get_embeddings(self, contents: List[str]) -> np.ndarray:
+        rows, buckets, signs = self._features(contents)
+        embeddings = np.bincount(
+            rows.astype(np.int64) * self.dim + buckets,
+            weights=signs,
+            minlength=len(contents) * self.dim,
+        ).reshape(len(contents), self.dim).astype(np.float32)
+        if self.use_idf:
+            embeddings *= self.idf
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.where(norms == 0, 1, norms)
+        return embeddings
+
+    def _features(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Text index, bucket and sign of every n-gram of a batch of texts."""
+        units, owners = self._units(texts)
+        rows, hashes = [], []
+        low, high = self.ngram_range
+        for n in range(low, min(high, len(units)) + 1):
+            num_ngrams = len(units) - n + 1
+            # Seeding with n keeps n-grams of different sizes apart
+            ngram_hashes = np.full(num_ngrams, n, dtype=np.uint64)
+            # uint64 arithmetic wraps around, which is what the hash relies on
+            for k in range(n):
+                ngram_hashes = ngram_hashes * _PRIME + units[k : k + num_ngrams]
+            # N-grams spanning two texts are dropped
+            within = owners[:num_ngrams] == owners[n - 1 :]
+            rows.append(owners[:num_ngrams][within])
+            hashes.append(ngram_hashes[within])
+        if not rows:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        hashes = _finalize(np.concatenate(hashes))
+        buckets = (hashes % np.uint64(self.dim)).astype(np.int64)
+        # Signed hashing makes colliding features cancel out on average
+        signs = np.where(hashes >> np.uint64(63), -1.0, 1.0)
+        return np.concatenate(rows), buckets, signs
+
+    def _units(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Hashes of the words or characters of all texts, and the text index of each."""
+        if self.lowercase:
+            texts = [text.lower() for text in texts]
+
+        if self.analyzer == "char":
+            lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+            units = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+            units = units.astype(np.uint64)
+        else:
+            words = [_WORD.findall(text) for text in texts]
+            lengths = np.fromiter((len(w) for w in words), dtype=np.int64, count=len(texts))
+            flat = [word for text_words in words for word in text_words]
+            word_hashes = {word: zlib.crc32(word.encode("utf-8")) for word in set(flat)}
+            units = np.fromiter(map(word_hashes.__getitem__, flat), dtype=np.uint64, count=len(flat))
+        owners = np.repeat(np.arange(len(texts), dtype=np.int32), lengths)
+        return units, owners
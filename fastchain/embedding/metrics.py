@@ -0,0 +1,187 @@
+"""Metrics of the embedding models."""
+import bisect
+import math
+import threading
+from typing import Dict, Iterable, List, Optional
+
+# Upper bounds of the latency buckets, in seconds
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def exponential_buckets(start: float, factor: float, count: int) -> List[float]:
+    """`count` bucket upper bounds, from `start` each `factor` times the previous one."""
+    return [start * factor**i for i in range(count)]
+
+
+class Histogram:
+    """Counts of observed values in buckets with fixed upper bounds, like a Prometheus histogram.
+
+    Args:
+        buckets (Iterable[float]): Upper bounds of the buckets, values above the
+            largest one are counted in an implicit +Inf bucket
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile, +Inf past the last bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return math.inf
+
+    def snapshot(self) -> Dict[str, object]:
+        """Cumulative count of every bucket by upper bound, with the total count and sum."""
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"buckets": buckets, "count": self.count, "sum": self.sum}
+
+
+class EmbeddingMetrics:
+    """Requests, batches, latencies, tokens, retries, rate limit waits and cache hits of a model.
+
+    Every BaseEmbedding records into its own `metrics`. Recording and exporting
+    are thread safe, exports are plain snapshots that later requests do not
+    change. `tokens` is None while no tokens were counted, models that count
+    nothing export it as unknown instead of 0.
+    """
+
+    _COUNTERS = (
+        ("requests", "Requests sent to the model"),
+        ("errors", "Failed requests"),
+        ("retries", "Retried requests"),
+        ("texts", "Texts sent to the model"),
+        ("tokens", "Tokens sent to the model"),
+        ("cache_hits", "Texts found in the cache"),
+        ("cache_misses", "Texts missing from the cache"),
+    )
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.batch_sizes = Histogram(exponential_buckets(1, 2, 12))
+        self.latencies = Histogram()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            for name, _ in self._COUNTERS:
+                setattr(self, name, 0)
+            self.tokens: Optional[int] = None
+            self.rate_limit_waits = 0
+            self.rate_limit_wait_seconds = 0.0
+            self.batch_sizes.reset()
+            self.latencies.reset()
+
+    def record_request(self, num_texts: int, latency: float, error: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            self.texts += num_texts
+            self.errors += error
+            self.batch_sizes.observe(num_texts)
+            self.latencies.observe(latency)
+
+    def record_tokens(self, num_tokens: int) -> None:
+        with self._lock:
+            self.tokens = (self.tokens or 0) + num_tokens
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def record_rate_limit_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.rate_limit_waits += 1
+            self.rate_limit_wait_seconds += seconds
+
+    def record_cache_lookup(self, hits: int, misses: int) -> None:
+        with self._lock:
+            self.cache_hits += hits
+            self.cache_misses += misses
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict[str, object]:
+        """Snapshot of the metrics, with the latency percentiles as bucket upper bounds."""
+        with self._lock:
+            metrics: Dict[str, object] = {name: getattr(self, name) for name, _ in self._COUNTERS}
+            metrics.update(
+                cache_hit_ratio=self.cache_hit_ratio,
+                rate_limit_waits=self.rate_limit_waits,
+                rate_limit_wait_seconds=self.rate_limit_wait_seconds,
+                mean_batch_size=self.batch_sizes.mean,
+                latency_seconds_mean=self.latencies.mean,
+                latency_seconds_p50=self.latencies.quantile(0.5),
+                latency_seconds_p90=self.latencies.quantile(0.9),
+                latency_seconds_p99=self.latencies.quantile(0.99),
+                batch_size=self.batch_sizes.snapshot(),
+                latency_seconds=self.latencies.snapshot(),
+            )
+        return metrics
+
+    snapshot = to_dict
+
+    def to_prometheus(
+        self, prefix: str = "fastchain_embedding", labels: Optional[Dict[str, str]] = None
+    ) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        metrics = self.to_dict()
+        label_pairs = [f'{key}="{value}"' for key, value in (labels or {}).items()]
+
+        def series(name: str, value: float, extra: Optional[str] = None) -> str:
+            pairs = label_pairs + ([extra] if extra else [])
+            return f"{name}{{{','.join(pairs)}}} {value}" if pairs else f"{name} {value}"
+
+        lines = []
+        for name, help_text in self._COUNTERS + (("rate_limit_waits", "Waits for the rate limiter"),):
+            if metrics[name] is None:
+                continue
+            lines += [
+                f"# HELP {prefix}_{name}_total {help_text}.",
+                f"# TYPE {prefix}_{name}_total counter",
+                series(f"{prefix}_{name}_total", metrics[name]),
+            ]
+        lines += [
+            f"# HELP {prefix}_rate_limit_wait_seconds_total Seconds spent waiting for the rate limiter.",
+            f"# TYPE {prefix}_rate_limit_wait_seconds_total counter",
+            series(f"{prefix}_rate_limit_wait_seconds_total", metrics["rate_limit_wait_seconds"]),
+        ]
+        for name, help_text in (
+            ("batch_size", "Texts per request"),
+            ("latency_seconds", "Seconds per request"),
+        ):
+            histogram = metrics[name]
+            lines += [f"# HELP {prefix}_{name} {help_text}.", f"# TYPE {prefix}_{name} histogram"]
+            for bound, count in histogram["buckets"].items():
+                le = "+Inf" if bound == math.inf else f"{bound:g}"
+                lines.append(series(f"{prefix}_{name}_bucket", count, f'le="{le}"'))
+            lines += [
+                series(f"{prefix}_{name}_sum", histogram["sum"]),
+                series(f"{prefix}_{name}_count", histogram["count"]),
+            ]
+        return "\n".join(lines) + "\n"
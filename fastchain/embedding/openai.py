@@ -2,14 +2,10 @@
 from enum import Enum
 from typing import Any, Callable, Dict, List, Optional, Tuple
 import openai
-from tenacity import (
-    retry,
-    stop_all,
-    stop_after_delay,
-    stop_after_attempt,
-    wait_random_exponential,
-)
-from fastchain.embedding.base import DEFAULT_EMBED_BATCH_SIZE, BaseEmbedding
+from fastchain.embedding.base import DEFAULT_EMBED_BATCH_SIZE, DEFAULT_MAX_CONCURRENCY, BaseEmbedding
+from fastchain.embedding.cache import EmbeddingCache
+from fastchain.embedding.rate_limit import RateLimiter
+from fastchain.embedding.result import decode_embeddings
 from fastchain.llms.openai_utils import validate_openai_api_key
 from fastchain.document.base import Document
 import numpy as np
@@ -64,6 +60,8 @@ OAEMT = OpenAIEmbeddingModelType
 OAEMM = OpenAIEmbeddingModeModel
 
 EMBED_MAX_TOKEN_LIMIT = 2048
+# Maximum number of inputs of a single embeddings request
+EMBED_MAX_BATCH_SIZE = 2048
 
 
 _QUERY_MODE_MODEL_DICT = {
@@ -93,13 +91,18 @@ _TEXT_MODE_MODEL_DICT = {
 }
 
 
-@retry(
-    wait=wait_random_exponential(min=1, max=20),
-    stop=stop_all(stop_after_attempt(6), stop_after_delay(60)),
-)
+# The helpers below do not retry, BaseEmbedding retries failed batches itself,
+# waiting for the Retry-After of rate limited requests.
+
+
+def _embedding_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Request base64 embeddings unless told otherwise, they are decoded straight into float32."""
+    return {"encoding_format": "base64", **kwargs}
+
+
 def get_embedding(
     text: str, engine: Optional[str] = None, **kwargs: Any
-) -> List[float]:
+) -> np.ndarray:
     """Get embedding.
 
     NOTE: Copied from OpenAI's embedding utils:
@@ -110,18 +113,13 @@ def get_embedding(
 
     """
     text = text.replace("\n", " ")
-    return openai.Embedding.create(input=[text], model=engine, **kwargs)["data"][0][
-        "embedding"
-    ]
+    data = openai.Embedding.create(input=[text], model=engine, **_embedding_kwargs(kwargs))["data"]
+    return decode_embeddings(data)[0]
 
 
-@retry(
-    wait=wait_random_exponential(min=1, max=20),
-    stop=stop_all(stop_after_attempt(6), stop_after_delay(60)),
-)
 async def aget_embedding(
     text: str, engine: Optional[str] = None, **kwargs: Any
-) -> List[float]:
+) -> np.ndarray:
     """Asynchronously get embedding.
 
     NOTE: Copied from OpenAI's embedding utils:
@@ -134,18 +132,15 @@ async def aget_embedding(
     # replace newlines, which can negatively affect performance.
     text = text.replace("\n", " ")
 
-    return (await openai.Embedding.acreate(input=[text], model=engine, **kwargs))[
-        "data"
-    ][0]["embedding"]
+    data = (
+        await openai.Embedding.acreate(input=[text], model=engine, **_embedding_kwargs(kwargs))
+    )["data"]
+    return decode_embeddings(data)[0]
 
 
-@retry(
-    wait=wait_random_exponential(min=1, max=20),
-    stop=stop_all(stop_after_attempt(6), stop_after_delay(60)),
-)
 def get_embeddings(
     list_of_text: List[str], engine: Optional[str] = None, **kwargs: Any
-) -> List[List[float]]:
+) -> np.ndarray:
     """Get embeddings.
 
     NOTE: Copied from OpenAI's embedding utils:
@@ -155,22 +150,20 @@ def get_embeddings(
     like matplotlib, plotly, scipy, sklearn.
 
     """
-    assert len(list_of_text) <= 2048, "The batch size should not be larger than 2048."
+    assert len(list_of_text) <= EMBED_MAX_BATCH_SIZE, "The batch size should not be larger than 2048."
 
     # replace newlines, which can negatively affect performance.
     list_of_text = [text.replace("\n", " ") for text in list_of_text]
 
-    data = openai.Embedding.create(input=list_of_text, model=engine, **kwargs).data
-    return [d["embedding"] for d in data]
+    data = openai.Embedding.create(
+        input=list_of_text, model=engine, **_embedding_kwargs(kwargs)
+    ).data
+    return decode_embeddings(data)
 
 
-@retry(
-    wait=wait_random_exponential(min=1, max=20),
-    stop=stop_all(stop_after_attempt(6), stop_after_delay(60)),
-)
 async def aget_embeddings(
     list_of_text: List[str], engine: Optional[str] = None, **kwargs: Any
-) -> List[List[float]]:
+) -> np.ndarray:
     """Asynchronously get embeddings.
 
     NOTE: Copied from OpenAI's embedding utils:
@@ -180,15 +173,17 @@ async def aget_embeddings(
     like matplotlib, plotly, scipy, sklearn.
 
     """
-    assert len(list_of_text) <= 2048, "The batch size should not be larger than 2048."
+    assert len(list_of_text) <= EMBED_MAX_BATCH_SIZE, "The batch size should not be larger than 2048."
 
     # replace newlines, which can negatively affect performance.
     list_of_text = [text.replace("\n", " ") for text in list_of_text]
 
     data = (
-        await openai.Embedding.acreate(input=list_of_text, model=engine, **kwargs)
+        await openai.Embedding.acreate(
+            input=list_of_text, model=engine, **_embedding_kwargs(kwargs)
+        )
     ).data
-    return [d["embedding"] for d in data]
+    return decode_embeddings(data)
 
 
 def get_engine(
@@ -228,15 +223,29 @@ class OpenAIEmbedding(BaseEmbedding):
             If this value is not None, mode and model will be ignored.
             Only available for using AzureOpenAI.
     """
+
+    max_request_size = EMBED_MAX_BATCH_SIZE
+
     def __init__(self,
                  mode: str = OpenAIEmbeddingMode.TEXT_SEARCH_MODE,
                  model: str = OpenAIEmbeddingModelType.TEXT_EMBED_ADA_002,
                  deployment_name: Optional[str] = None,
                  embed_batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
                  tokenizer: Optional[Callable] = None,
+                 max_batch_tokens: Optional[int] = EMBED_MAX_TOKEN_LIMIT,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 cache: Optional[EmbeddingCache] = None,
                  **kwargs: Any
                  ) -> None:
-        super().__init__(tokenizer)
+        super().__init__(
+            tokenizer,
+            embed_batch_size=embed_batch_size,
+            max_batch_tokens=max_batch_tokens,
+            max_concurrency=max_concurrency,
+            rate_limiter=rate_limiter,
+            cache=cache,
+        )
         validate_openai_api_key(kwargs.get("api_key", None), kwargs.get("api_type", None))
         
         self.deployment_name = deployment_name
@@ -244,37 +253,23 @@ class OpenAIEmbedding(BaseEmbedding):
         self.text_engine = get_engine(mode, model, _TEXT_MODE_MODEL_DICT)
         self.openai_kwargs = kwargs
 
-    def _get_embedding(self, content: str) -> List[float]:
+    @property
+    def model_id(self) -> str:
+        return f"openai:{self.deployment_name or self.text_engine.value}"
+
+    def _get_embedding(self, content: str) -> np.ndarray:
         return self._get_text_embedding(content)
 
-    async def _aget_embedding(self, content: str) -> List[float]:
+    async def _aget_embedding(self, content: str) -> np.ndarray:
         return await self._aget_text_embedding(content)
 
-    def queue_document_for_embedding(self, document: Document) -> None:
-        self._document_queue.append(document)
-
-    def _process_documents(self, async_mode: bool = False) -> Dict[str, Dict[str, EMB_TYPE]]:
-        result = {}
-        for document in self._document_queue:
-            doc_embeddings = {}
-            for page in document.pages or []:
-                for chunk in page.chunks or []:
-                    emb_func = self.aget_chunk_embedding if async_mode else self.get_chunk_embedding
-                    doc_embeddings[chunk._id] = emb_func(chunk)
-            for chunk in document.chunks or []:
-                emb_func = self.aget_chunk_embedding if async_mode else self.get_chunk_embedding
-                doc_embeddings[chunk._id] = emb_func(chunk)
-            result[document._id] = doc_embeddings
-        self._document_queue.clear()
-        return result
-
-    def get_queued_document_embeddings(self) -> Dict[str, Dict[str, EMB_TYPE]]:
-        return self._process_documents()
-
-    async def aget_queued_document_embeddings(self) -> Dict[str, Dict[str, EMB_TYPE]]:
-        return await self._process_documents(async_mode=True)
-
-    def _get_text_embedding(self, text: str) -> List[float]:
+    def _get_embeddings(self, contents: List[str]) -> np.ndarray:
+        return self._get_text_embeddings(contents)
+
+    async def _aget_embeddings(self, contents: List[str]) -> np.ndarray:
+        return await self._aget_text_embeddings(contents)
+
+    def _get_text_embedding(self, text: str) -> np.ndarray:
         """Get text embedding."""
         return get_embedding(
             text,
@@ -283,7 +278,7 @@ class OpenAIEmbedding(BaseEmbedding):
             **self.openai_kwargs
         )
 
-    async def _aget_text_embedding(self, text: str) -> List[float]:
+    async def _aget_text_embedding(self, text: str) -> np.ndarray:
         """Asynchronously get text embedding."""
         return await aget_embedding(
             text,
@@ -292,7 +287,7 @@ class OpenAIEmbedding(BaseEmbedding):
             **self.openai_kwargs
         )
 
-    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def _get_text_embeddings(self, texts: List[str]) -> np.ndarray:
         """Get text embeddings."""
         return get_embeddings(
             texts,
@@ -301,7 +296,7 @@ class OpenAIEmbedding(BaseEmbedding):
             **self.openai_kwargs
         )
 
-    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+    async def _aget_text_embeddings(self, texts: List[str]) -> np.ndarray:
         """Asynchronously get text embeddings."""
         return await aget_embeddings(
             texts,
@@ -0,0 +1,167 @@
+"""Client-side rate limiting of embedding requests.
+
+A RateLimiter holds a requests-per-minute and a tokens-per-minute token
+bucket. Every request acquires one request and its tokens before it is sent,
+so concurrent requests together stay under the provider limits. When the
+provider still answers with a `Retry-After`, `pause` stops every request
+sharing the limiter for that long.
+"""
+import asyncio
+import email.utils
+import threading
+import time
+from typing import Callable, Optional
+
+
+class RateLimitError(Exception):
+    """A request was rejected by the provider because of rate limits.
+
+    Args:
+        message (str): Error message
+        retry_after (Optional[float]): Seconds to wait before retrying, if known
+    """
+
+    def __init__(self, message: str = "", retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(value) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, given in seconds or as an HTTP date."""
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(str(value))
+    except (TypeError, ValueError):
+        return None
+    return max(date.timestamp() - time.time(), 0.0)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked to wait before retrying, None if it did not say.
+
+    Looks at a `retry_after` attribute, then at the `Retry-After` header of the
+    error or of its HTTP response, which covers the errors of the openai and
+    cohere clients.
+    """
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        return _parse_retry_after(retry_after)
+
+    response = getattr(error, "response", None)
+    for headers in (
+        getattr(error, "headers", None),
+        getattr(error, "http_headers", None),
+        getattr(response, "headers", None),
+    ):
+        if headers:
+            value = headers.get("Retry-After") or headers.get("retry-after")
+            if value is not None:
+                return _parse_retry_after(value)
+    return None
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute token buckets shared by requests.
+
+    Both buckets start full and refill continuously. A request needing more
+    tokens than a full bucket holds waits for a full bucket instead of forever.
+
+    Args:
+        requests_per_minute (Optional[float]): Request limit, unlimited if None
+        tokens_per_minute (Optional[float]): Token limit, unlimited if None
+        clock (Callable[[], float]): Monotonic clock in seconds
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._available_requests = requests_per_minute or 0.0
+        self._available_tokens = tokens_per_minute or 0.0
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_lock = threading.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Hold every request for `seconds`, e.g. after a Retry-After from the provider.
+
+        The buckets are emptied too, so requests resume at the sustained rate
+        instead of bursting.
+        """
+        self._refill()
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+        self._available_requests = min(self._available_requests, 0.0)
+        self._available_tokens = min(self._available_tokens, 0.0)
+
+    async def acquire(self, num_tokens: int = 0) -> None:
+        """Wait until a request with `num_tokens` tokens can be sent, and account for it."""
+        async with self._get_lock():
+            while True:
+                wait = self._wait_time(num_tokens)
+                if wait <= 0:
+                    self._take(num_tokens)
+                    return
+                await asyncio.sleep(wait)
+
+    def acquire_sync(self, num_tokens: int = 0) -> None:
+        """Blocking version of acquire, for requests sent from synchronous code."""
+        with self._thread_lock:
+            while True:
+                wait = self._wait_time(num_tokens)
+                if wait <= 0:
+                    self._take(num_tokens)
+                    return
+                time.sleep(wait)
+
+    def _take(self, num_tokens: int) -> None:
+        if self.requests_per_minute:
+            self._available_requests -= 1
+        if self.tokens_per_minute:
+            self._available_tokens -= min(num_tokens, self.tokens_per_minute)
+
+    def _wait_time(self, num_tokens: int) -> float:
+        """Seconds until both buckets hold enough for the request, 0 if they do now."""
+        self._refill()
+        wait = self._paused_until - self._clock()
+        if self.requests_per_minute:
+            missing = 1 - self._available_requests
+            wait = max(wait, missing * 60 / self.requests_per_minute)
+        if self.tokens_per_minute:
+            missing = min(num_tokens, self.tokens_per_minute) - self._available_tokens
+            wait = max(wait, missing * 60 / self.tokens_per_minute)
+        return wait
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        if self.requests_per_minute:
+            self._available_requests = min(
+                self.requests_per_minute,
+                self._available_requests + elapsed * self.requests_per_minute / 60,
+            )
+        if self.tokens_per_minute:
+            self._available_tokens = min(
+                self.tokens_per_minute,
+                self._available_tokens + elapsed * self.tokens_per_minute / 60,
+            )
+
+    def _get_lock(self) -> asyncio.Lock:
+        # asyncio locks belong to one event loop, a limiter can outlive its loop
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
@@ -0,0 +1,136 @@
+"""Embeddings of many chunks held in one float32 matrix."""
+import base64
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fastchain.document.chunk.base import Chunk
+
+
+def decode_embeddings(
+    data: Sequence[Mapping[str, Any]], out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Write the embeddings of an embeddings API response into a float32 matrix.
+
+    Every item holds its `embedding` either as a list of floats or as the
+    base64 encoding of little-endian float32s, and optionally its `index` in
+    the request. Base64 payloads are decoded straight into the matrix rows.
+
+    Args:
+        data (Sequence[Mapping[str, Any]]): `data` items of the response
+        out (Optional[np.ndarray]): Matrix to write into, allocated if None
+
+    Returns:
+        np.ndarray: Embedding of the i-th input in row i
+    """
+    for row, item in enumerate(data):
+        embedding = item["embedding"]
+        if isinstance(embedding, str):
+            embedding = np.frombuffer(base64.b64decode(embedding), dtype="<f4")
+        if out is None:
+            out = np.empty((len(data), len(embedding)), dtype=np.float32)
+        out[item.get("index", row)] = embedding
+    if out is None:
+        out = np.empty((0, 0), dtype=np.float32)
+    return out
+
+
+def as_embedding_matrix(embeddings: Any) -> np.ndarray:
+    """Embeddings returned by a model as a C-contiguous float32 matrix, without copy when it already is one."""
+    matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(matrix), -1)
+    return matrix
+
+
+class PartialEmbeddingError(Exception):
+    """Some batches still failed after their retries, the others went through.
+
+    Args:
+        embeddings (np.ndarray): float32 matrix with the embedding of the i-th
+            text in row i, the rows of the texts whose batch failed are NaN
+        failed_indices (np.ndarray): Indices of the texts whose batch failed
+        errors (List[BaseException]): Error of every failed batch
+
+    Attributes:
+        result (Optional[EmbeddingBatchResult]): Embeddings of the chunks, set when
+            embedding queued documents, the rows of the failed chunks are NaN
+    """
+
+    def __init__(
+        self, embeddings: np.ndarray, failed_indices: np.ndarray, errors: List[BaseException]
+    ) -> None:
+        super().__init__(
+            f"{len(failed_indices)} of {len(embeddings)} texts failed to embed: {errors[0]!r}"
+        )
+        self.embeddings = embeddings
+        self.failed_indices = failed_indices
+        self.errors = errors
+        self.result: Optional["EmbeddingBatchResult"] = None
+
+
+@dataclass
+class EmbeddingBatchResult:
+    """Embeddings of many chunks as one float32 matrix with parallel id arrays.
+
+    Row i of `embeddings` is the embedding of the chunk `chunk_ids[i]` of the
+    document `document_ids[i]`. The matrix is C-contiguous, so it can be handed
+    to vector stores and numerical libraries as is.
+    """
+
+    embeddings: np.ndarray
+    document_ids: np.ndarray
+    chunk_ids: np.ndarray
+    _rows: Optional[Dict[Tuple[str, str], int]] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.embeddings = as_embedding_matrix(self.embeddings)
+        self.document_ids = np.asarray(self.document_ids, dtype=str)
+        self.chunk_ids = np.asarray(self.chunk_ids, dtype=str)
+        if not len(self.embeddings) == len(self.document_ids) == len(self.chunk_ids):
+            raise ValueError(
+                f"Got {len(self.embeddings)} embeddings for {len(self.document_ids)} document ids "
+                f"and {len(self.chunk_ids)} chunk ids"
+            )
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    @property
+    def dim(self) -> int:
+        return self.embeddings.shape[1]
+
+    def get(self, document_id: str, chunk_id: str) -> np.ndarray:
+        """Embedding of a chunk, as a view of the matrix row."""
+        if self._rows is None:
+            keys = zip(self.document_ids.tolist(), self.chunk_ids.tolist())
+            self._rows = {key: row for row, key in enumerate(keys)}
+        return self.embeddings[self._rows[(str(document_id), str(chunk_id))]]
+
+    def document(self, document_id: str) -> np.ndarray:
+        """Embeddings of the chunks of a document, in chunk order."""
+        return self.embeddings[self.document_ids == str(document_id)]
+
+    def __iter__(self) -> Iterator[Tuple[str, str, np.ndarray]]:
+        return zip(self.document_ids.tolist(), self.chunk_ids.tolist(), self.embeddings)
+
+    def attach(self, chunks: Iterable[Chunk]) -> None:
+        """Set the embedding of chunks to views of their matrix rows, looked up by chunk id."""
+        rows = {chunk_id: row for row, chunk_id in enumerate(self.chunk_ids.tolist())}
+        for chunk in chunks:
+            row = rows.get(str(chunk.id))
+            if row is not None:
+                chunk.embedding = self.embeddings[row]
+
+    def to_dict(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """Embeddings by chunk id, by document id, as views of the matrix rows."""
+        result: Dict[str, Dict[str, np.ndarray]] = {}
+        for document_id, chunk_id, embedding in self:
+            result.setdefault(document_id, {})[chunk_id] = embedding
+        return result
+
+    @classmethod
+    def empty(cls, dim: int = 0) -> "EmbeddingBatchResult":
+        return cls(np.empty((0, dim), dtype=np.float32), np.array([], dtype=str), np.array([], dtype=str))
+
@@ -1,13 +1,151 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from fastchain.embedding.base import EMB_TYPE, BaseEmbedding
+from fastchain.embedding.cache import EmbeddingCache
+
+# Texts per forward pass of the model
+DEFAULT_ENCODE_BATCH_SIZE = 32
+# Texts per call to _get_embeddings, sorted by length together before being split
+# into forward passes, so the larger the less padding
+DEFAULT_SORT_WINDOW = 4096
+
+
 class SentanceTransformerEmbedding(BaseEmbedding):
+    """Embeddings of a local sentence-transformers model.
+
+    Texts are sorted by token length and encoded `batch_size` at a time, so the
+    texts of a forward pass have similar lengths and little padding. Embeddings
+    are returned in the order of the texts.
+
+    Args:
+        model_name (str): Name or path of the sentence-transformers model
+        tokenizer (Optional[Callable]): Tokenizer used to count the tokens sent
+            to the model
+        device (Optional[str]): Device of the model, chosen by sentence-transformers
+            if None, and CPU if `num_processes` is set
+        batch_size (int): Number of texts per forward pass
+        embed_batch_size (int): Number of texts sorted by length together
+        num_processes (int): Number of worker processes encoding batches in
+            parallel on CPU, every worker loads the model once when the pool
+            starts. Batches are encoded in this process if 0.
+        cache (Optional[EmbeddingCache]): Cache of the embeddings
+    """
+
     def __init__(
         self,
         model_name: str,
         tokenizer: Optional[Callable] = None,
         device: Optional[str] = None,
+        batch_size: int = DEFAULT_ENCODE_BATCH_SIZE,
+        embed_batch_size: int = DEFAULT_SORT_WINDOW,
+        num_processes: int = 0,
+        cache: Optional[EmbeddingCache] = None,
     ) -> None:
-        super().__init__(tokenizer)
+        if num_processes > 0:
+            device = device or "cpu"
+            if device != "cpu":
+                raise ValueError(f"num_processes only runs on CPU, got device {device}")
+        super().__init__(tokenizer, embed_batch_size=embed_batch_size, cache=cache)
         self._model_name = model_name
+        self._device = device
         self._model = SentenceTransformer(model_name, device=device)
+        self.batch_size = batch_size
+        self.num_processes = num_processes
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def model_id(self) -> str:
+        return f"sentence-transformers:{self._model_name}"
 
     def _get_embedding(self, text: str) -> EMB_TYPE:
-        return self._model.encode([text])[0]
+        return self._get_embeddings([text])[0]
+
+    def _get_embeddings(self, contents: List[str]) -> np.ndarray:
+        if not contents:
+            dim = self._model.get_sentence_embedding_dimension() or 0
+            return np.empty((0, dim), dtype=np.float32)
+
+        order = np.argsort(self._token_lengths(contents), kind="stable")
+        buckets = [
+            order[i : i + self.batch_size] for i in range(0, len(order), self.batch_size)
+        ]
+        texts = [[contents[i] for i in bucket] for bucket in buckets]
+        if self.num_processes > 0:
+            encoded = self._get_pool().map(_encode_texts, texts)
+        else:
+            encoded = (_encode(self._model, bucket_texts) for bucket_texts in texts)
+
+        embeddings = None
+        for bucket, bucket_embeddings in zip(buckets, encoded):
+            if embeddings is None:
+                embeddings = np.empty((len(contents), bucket_embeddings.shape[1]), dtype=np.float32)
+            embeddings[bucket] = bucket_embeddings
+        return embeddings
+
+    async def _aget_embeddings(self, contents: List[str]) -> np.ndarray:
+        # Encoding is CPU or GPU bound, keep the event loop free meanwhile
+        return await asyncio.to_thread(self._get_embeddings, contents)
+
+    def _token_lengths(self, contents: List[str]) -> List[int]:
+        tokenizer = getattr(self._model, "tokenizer", None)
+        if tokenizer is None:
+            return [len(content) for content in contents]
+        input_ids = tokenizer(
+            contents,
+            add_special_tokens=False,
+            truncation=True,
+            max_length=self._model.max_seq_length,
+            return_attention_mask=False,
+        )["input_ids"]
+        return [len(ids) for ids in input_ids]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Forking a process that already runs torch threads can deadlock
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.num_processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_sentence_transformer_worker,
+                initargs=(
+                    self._model_name,
+                    self._device,
+                    max(1, (os.cpu_count() or 1) // self.num_processes),
+                ),
+            )
+        return self._pool
+
+    def close(self) -> None:
+        """Stop the worker processes, they are started again when needed."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def _encode(model: SentenceTransformer, texts: List[str]) -> np.ndarray:
+    return model.encode(
+        texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False
+    ).astype(np.float32, copy=False)
+
+
+# Model of the current process, used by SentanceTransformerEmbedding with num_processes
+_worker_model: Optional[SentenceTransformer] = None
+
+
+def _init_sentence_transformer_worker(model_name: str, device: str, num_threads: int) -> None:
+    import torch
+
+    global _worker_model
+    # Workers share the CPU cores instead of each using all of them
+    torch.set_num_threads(num_threads)
+    _worker_model = SentenceTransformer(model_name, device=device)
+
+
+def _encode_texts(texts: List[str]) -> np.ndarray:
+    return _encode(_worker_model, texts)
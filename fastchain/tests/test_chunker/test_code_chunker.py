@@ -1,4 +1,44 @@
-from fastchain.chunker.code_chunker import CodeChunker
+import os
+
+import pytest
+
+from fastchain.chunker.base import LineIndex, Span
+from fastchain.chunker.code_chunker import CodeChunker, _edit_range, count_length_without_whitespace
+from fastchain.chunker.grammars import get_grammar_registry
+from fastchain.chunker.utils import non_whitespace_prefix_sums
+
+SOURCE = "".join(f"def f{i}(x):\n    y = x * {i}\n    return y + {i}\n\n\n" for i in range(8))
+
+
+@pytest.fixture
+def grammar_cache_dir():
+    registry = get_grammar_registry()
+    if not os.path.exists(registry.library_path("python")):
+        pytest.skip("The python grammar is not built, see GrammarRegistry.build")
+    return registry.cache_dir
+
+
+def chunk_contents(content_dict, grammar_cache_dir, workers=None):
+    chunker = CodeChunker(content_dict, max_chunk_size=60, coalesce=5, grammar_cache_dir=grammar_cache_dir)
+    return chunker, chunker.create_chunks(workers=workers)
+
+
+def lines_of(source, chunk):
+    """Content of a chunk from its byte offsets, the lines joined like Span.extract."""
+    return "\n".join(source.encode("utf8")[chunk.start_byte : chunk.end_byte].decode("utf8").splitlines())
+
+
+def assert_update_matches_fresh_chunks(chunks, update, content, grammar_cache_dir):
+    """Applying the update to the previous chunks gives the chunks of the new content."""
+    chunks = {str(chunk.id): chunk for chunk in chunks}
+    for chunk_id, start_byte, end_byte in update.removed:
+        assert (chunks[chunk_id].start_byte, chunks[chunk_id].end_byte) == (start_byte, end_byte)
+        del chunks[chunk_id]
+    for chunk in update.chunks:
+        assert lines_of(content, chunk) == chunk.content
+    _, fresh = chunk_contents({update.chunks[0].file_path: content}, grammar_cache_dir)
+    updated = [chunk.content for chunk in chunks.values()] + [chunk.content for chunk in update.chunks]
+    assert sorted(updated) == sorted(chunk.content for chunk in fresh.chunks)
 
 
 def test_code_chunker():
@@ -15,3 +55,84 @@ def test_code_chunker():
         print(chunk.content)
         print(chunk.doc_id)
         print("**************")
+
+
+def test_line_index():
+    source = "import os\r\n\ndef f():\n    return \"é\"\n"
+    line_index = LineIndex(source)
+    code_bytes = source.encode("utf8")
+
+    assert line_index.num_lines == len(code_bytes.splitlines())
+    assert line_index.line_number(0) == 0
+    assert line_index.line_number(code_bytes.index(b"def")) == 2
+    assert line_index.line_number(len(code_bytes)) == line_index.num_lines
+    for start in range(line_index.num_lines + 1):
+        for end in range(start, line_index.num_lines + 2):
+            span = Span(start=start, end=end)
+            assert span.extract(source, line_index=line_index) == span.extract(source)
+
+
+def test_edit_range():
+    old = b"def f():\n    return 1\n"
+    new = b"def f():\n    x = 2\n    return x\n"
+    start, old_end, new_end = _edit_range(old, new)
+    assert new[:start] + new[start:new_end] + old[old_end:] == new
+    assert old[:start] == new[:start] and old[old_end:] == new[new_end:]
+    assert _edit_range(old, old) == (len(old), len(old), len(old))
+
+
+def test_non_whitespace_prefix_sums():
+    source = "def f():\n\t return 'é ü'  \n\n"
+    code_bytes = source.encode("utf8")
+    non_whitespace, newlines = non_whitespace_prefix_sums(code_bytes)
+    for start in range(len(code_bytes) + 1):
+        for end in range(start, len(code_bytes) + 1):
+            try:
+                text = code_bytes[start:end].decode("utf8")
+            except UnicodeDecodeError:
+                continue
+            assert non_whitespace[end] - non_whitespace[start] == count_length_without_whitespace(text)
+            assert newlines[end] - newlines[start] == text.count("\n")
+
+
+def test_non_whitespace_prefix_sums_unicode_whitespace():
+    # No-break, ideographic and em spaces are whitespace like for \s
+    source = "x =\u3000'日本'\u00a0#\u2003ok\n"
+    non_whitespace, newlines = non_whitespace_prefix_sums(source.encode("utf8"))
+
+    assert non_whitespace[-1] == count_length_without_whitespace(source) == 9
+    assert newlines[-1] == 1
+
+
+def test_update_chunks(grammar_cache_dir):
+    chunker, document = chunk_contents({"main.py": SOURCE}, grammar_cache_dir)
+    lines = SOURCE.splitlines()
+    for chunk in document.chunks:
+        assert chunk.file_path == "main.py"
+        assert lines_of(SOURCE, chunk) == "\n".join(lines[chunk.start_line : chunk.end_line]) == chunk.content
+
+    edited = SOURCE.replace("return y + 3", "y = y - 1\n    return y + 3")
+    assert chunker.update_chunks({"main.py": SOURCE}) == {}
+    update = chunker.update_chunks({"main.py": edited})["main.py"]
+
+    # Only the chunks around f3 are replaced, the others keep their id
+    assert 0 < len(update.removed) <= len(update.chunks) < len(document.chunks)
+    assert any("y = y - 1" in chunk.content for chunk in update.chunks)
+    assert_update_matches_fresh_chunks(document.chunks, update, edited, grammar_cache_dir)
+
+
+def test_create_chunks_with_workers(grammar_cache_dir):
+    content_dict = {f"module_{i}.py": SOURCE.replace("def f", f"def g{i}_") for i in range(4)}
+
+    _, expected = chunk_contents(content_dict, grammar_cache_dir)
+    chunker, document = chunk_contents(content_dict, grammar_cache_dir, workers=2)
+
+    def positions(document):
+        return [(chunk.file_path, chunk.start_byte, chunk.end_byte, chunk.content) for chunk in document.chunks]
+
+    assert positions(document) == positions(expected)
+    # Files chunked in workers are re-chunked without their previous tree
+    edited = content_dict["module_0.py"].replace("\n\n\ndef g0_4", "\n\n\nx = 1\n\n\ndef g0_4")
+    update = chunker.update_chunks({"module_0.py": edited})["module_0.py"]
+    chunks = [chunk for chunk in document.chunks if chunk.file_path == "module_0.py"]
+    assert_update_matches_fresh_chunks(chunks, update, edited, grammar_cache_dir)
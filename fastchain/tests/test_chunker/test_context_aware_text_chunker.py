@@ -0,0 +1,87 @@
+import numpy as np
+
+from fastchain.chunker.text_chunker import ContextAwareTextChunker
+from fastchain.embedding.base import BaseEmbedding
+
+TOPICS = ["cat", "rocket", "bread"]
+
+TEXT = (
+    "The cat sleeps on the sofa. The cat chases a mouse. "
+    "The rocket leaves the launch pad. The rocket reaches orbit. The rocket docks. "
+    "Bread needs flour and water. Bread is baked in an oven."
+)
+
+
+class TopicEmbedding(BaseEmbedding):
+    """Embeds a text as a one-hot vector of the topic it mentions."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.num_calls = 0
+
+    def _get_embedding(self, content: str) -> np.ndarray:
+        return np.array([float(topic in content.lower()) for topic in TOPICS])
+
+    def _get_embeddings(self, contents):
+        self.num_calls += 1
+        return [self._get_embedding(content) for content in contents]
+
+
+def test_context_aware_text_chunker():
+    embed_model = TopicEmbedding()
+    chunker = ContextAwareTextChunker(embed_model=embed_model)
+    chunks = chunker.create_chunks(TEXT)
+
+    assert [chunk.content for chunk in chunks] == [
+        "The cat sleeps on the sofa. The cat chases a mouse.",
+        "The rocket leaves the launch pad. The rocket reaches orbit. The rocket docks.",
+        "Bread needs flour and water. Bread is baked in an oven.",
+    ]
+    assert embed_model.num_calls == 1
+
+    # Re-chunking with another threshold only uses the cached sentence embeddings
+    chunker.breakpoint_threshold = -1.0
+    assert [chunk.content for chunk in chunker.create_chunks(TEXT)] == [TEXT]
+    assert embed_model.num_calls == 1
+
+
+def test_context_aware_text_chunker_splits_sentences_over_the_token_limit(monkeypatch):
+    from fastchain.chunker import text_chunker
+    from fastchain.document.chunk import schema
+    from fastchain.tokenizer import count_tokens
+
+    monkeypatch.setattr(text_chunker, "MAX_CHUNK_SIZE_TOKENS", 40)
+    monkeypatch.setattr(schema, "MAX_CHUNK_SIZE_TOKENS", 40)
+    long_sentence = "The rocket carries " + ", ".join(f"part {i}" for i in range(200)) + "."
+    text = TEXT + " " + long_sentence
+    chunks = ContextAwareTextChunker(embed_model=TopicEmbedding()).create_chunks(text)
+
+    assert [chunk.content for chunk in chunks[:3]] == [
+        "The cat sleeps on the sofa. The cat chases a mouse.",
+        "The rocket leaves the launch pad. The rocket reaches orbit. The rocket docks.",
+        "Bread needs flour and water. Bread is baked in an oven.",
+    ]
+    assert len(chunks) > 4
+    assert "".join(chunk.content for chunk in chunks[3:]) == long_sentence
+    for chunk in chunks:
+        assert text[chunk.start_index:chunk.end_index] == chunk.content
+        assert chunk.num_tokens == count_tokens(chunk.content) <= 40
+
+
+def test_context_aware_text_chunker_caches_embeddings_per_model(monkeypatch):
+    from fastchain.chunker import text_chunker
+
+    monkeypatch.setattr(text_chunker, "DEFAULT_SEMANTIC_EMBEDDING_CACHE_SIZE", 4)
+
+    class ConstantEmbedding(TopicEmbedding):
+        def _get_embedding(self, content: str) -> np.ndarray:
+            return np.ones(len(TOPICS))
+
+    chunker = ContextAwareTextChunker(embed_model=TopicEmbedding())
+    assert len(chunker.create_chunks(TEXT)) == 3
+    assert len(chunker._embedding_cache) == 4
+
+    # The sentences are embedded again by the new model, not served from the cache
+    chunker.embed_model = ConstantEmbedding()
+    assert [chunk.content for chunk in chunker.create_chunks(TEXT)] == [TEXT]
+    assert chunker.embed_model.num_calls == 1
@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+from fastchain.chunker import grammars
+from fastchain.chunker.grammars import GrammarRegistry, get_grammar_registry
+
+
+class FakeParser:
+    def set_language(self, language):
+        self.language = language
+
+
+def test_language_for_file():
+    assert GrammarRegistry.language_for_file("src/index.mjs") == "javascript"
+    assert GrammarRegistry.language_for_file("main.py") == "python"
+    assert GrammarRegistry.language_for_file("README.md") is None
+
+
+def test_missing_grammar_raises(tmp_path):
+    registry = GrammarRegistry(str(tmp_path))
+
+    with pytest.raises(FileNotFoundError, match="GrammarRegistry.build"):
+        registry.get_parser("python")
+
+
+def test_parsers_are_reused_per_thread(tmp_path, monkeypatch):
+    monkeypatch.setattr(grammars, "Parser", FakeParser)
+    registry = GrammarRegistry(str(tmp_path))
+    monkeypatch.setattr(registry, "get_language", lambda language: f"<{language}>")
+
+    parser = registry.get_parser("python")
+    assert parser.language == "<python>"
+    assert registry.get_parser("python") is parser
+    assert registry.get_parser("go") is not parser
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(registry.get_parser("python")))
+    thread.start()
+    thread.join()
+    assert other[0] is not parser and other[0].language == "<python>"
+
+
+def test_registry_is_shared_per_cache_dir(tmp_path):
+    assert get_grammar_registry(str(tmp_path)) is get_grammar_registry(str(tmp_path))
+    assert get_grammar_registry(str(tmp_path)) is not get_grammar_registry(str(tmp_path / "other"))
@@ -0,0 +1,67 @@
+from fastchain.chunker.text_chunker import RecursiveTextChunker
+
+
+TEXT = """Steve Jobs knew from an early age that he was adopted. “My parents were very open with me
+about that,” he recalled. He had a vivid memory of sitting on the lawn of his house, when he was
+six or seven years old, telling the girl who lived across the street.
+
+
+Abandoned. Chosen. Special. Those concepts became part of who Jobs was and how he
+regarded himself; his closest friends think that the knowledge that he was given up at birth left
+some scars. “I think his desire for complete control of whatever he makes derives directly from his
+personality and the fact that he was abandoned at birth,” said one longtime colleague, Del Yocam.
+
+
+Fifty years later the fence still surrounds the back and side yards of the house in Mountain
+View. Averyveryveryveryveryveryveryveryveryveryveryveryveryveryveryverylongword ends it.
+"""
+
+
+def reference_merge(splits, chunk_size, chunk_overlap):
+    """Merge splits the way the original design did, popping from the front."""
+    splits = list(splits)
+    chunks = []
+    cur_chunk = []
+    cur_chunk_len = 0
+    while len(splits) > 0:
+        cur_split = splits[0]
+        cur_split_len = len(cur_split.text)
+        if cur_chunk_len + cur_split_len > chunk_size and len(cur_chunk) > 0:
+            chunks.append("".join(cur_chunk).strip())
+            cur_chunk = []
+            cur_chunk_len = 0
+        else:
+            if (
+                cur_split.is_sentence
+                or cur_chunk_len + cur_split_len < chunk_size - chunk_overlap
+                or len(cur_chunk) == 0
+            ):
+                cur_chunk_len += cur_split_len
+                cur_chunk.append(cur_split.text)
+                splits.pop(0)
+            else:
+                chunks.append("".join(cur_chunk).strip())
+                cur_chunk = []
+                cur_chunk_len = 0
+
+    chunk = "".join(cur_chunk).strip()
+    if chunk:
+        chunks.append(chunk)
+    return [chunk for chunk in chunks if chunk.replace(" ", "") != ""]
+
+
+def test_recursive_text_chunker_matches_reference():
+    for chunk_size, chunk_overlap in [(40, 5), (120, 20), (300, 0)]:
+        chunker = RecursiveTextChunker(
+            text_chunk_size=chunk_size, text_chunk_overlap=chunk_overlap
+        )
+        splits = chunker._split(TEXT, start=0, length=len(TEXT))
+
+        assert "".join(split.text for split in splits) == TEXT
+        assert all(split.length <= chunk_size for split in splits)
+
+        spans = chunker._merge(splits, TEXT)
+        assert [TEXT[start:end] for start, end in spans] == reference_merge(
+            splits, chunk_size, chunk_overlap
+        )
+        assert all(end - start <= chunk_size for start, end in spans)
@@ -0,0 +1,59 @@
+from fastchain.chunker.text_chunker import SentenceChunker
+from fastchain.chunker.utils import sentence_offsets
+
+
+TEXT = (
+    "Dr. Smith went to Washington. He met J. Doe at the U.S. Senate! "
+    "Was it fun? \"Yes.\" Then he left, e.g. by train... And that was all."
+)
+
+
+def test_sentence_offsets():
+    sentences = [TEXT[start:end] for start, end in sentence_offsets(TEXT)]
+    assert sentences == [
+        "Dr. Smith went to Washington.",
+        "He met J. Doe at the U.S. Senate!",
+        "Was it fun?",
+        "\"Yes.\"",
+        "Then he left, e.g. by train...",
+        "And that was all.",
+    ]
+
+
+def test_sentence_chunker():
+    chunker = SentenceChunker(num_sentences=3, overlap_size=1)
+    chunks = chunker.create_chunks(TEXT)
+    assert [chunk.content for chunk in chunks] == [
+        "Dr. Smith went to Washington. He met J. Doe at the U.S. Senate! Was it fun?",
+        "Was it fun? \"Yes.\" Then he left, e.g. by train...",
+        "Then he left, e.g. by train... And that was all.",
+    ]
+    for chunk in chunks:
+        assert TEXT[chunk.start_index:chunk.end_index] == chunk.content
+
+
+def test_sentence_chunker_splits_sentences_over_the_token_limit(monkeypatch):
+    from fastchain.chunker import text_chunker
+    from fastchain.document.chunk import schema
+    from fastchain.tokenizer import count_tokens
+
+    monkeypatch.setattr(text_chunker, "MAX_CHUNK_SIZE_TOKENS", 40)
+    monkeypatch.setattr(schema, "MAX_CHUNK_SIZE_TOKENS", 40)
+    long_sentence = "The list went on " + ", ".join(f"item {i}" for i in range(200)) + "."
+    text = TEXT + " " + long_sentence + " " + TEXT
+
+    for chunker in (SentenceChunker(num_sentences=3, overlap_size=1), SentenceChunker(num_sentences=1, overlap_size=0)):
+        chunks = chunker.create_chunks(text)
+
+        assert [(c.start_index, c.end_index) for c in chunks] == [
+            (start, end) for start, end, _ in chunker._chunk_spans(text)
+        ]
+        covered = set()
+        for chunk in chunks:
+            assert text[chunk.start_index:chunk.end_index] == chunk.content
+            assert chunk.num_tokens == count_tokens(chunk.content) <= 40
+            covered.update(range(chunk.start_index, chunk.end_index))
+        start = text.index(long_sentence)
+        assert covered.issuperset(range(start, start + len(long_sentence)))
+    # Short groups are left as they are
+    assert chunks[0].content == "Dr. Smith went to Washington."
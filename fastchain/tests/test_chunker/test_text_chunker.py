@@ -1,5 +1,11 @@
+import io
+from uuid import uuid4
+
+import pytest
+
 from fastchain.chunker.text_chunker import TextChunker
 from fastchain.constants import *
+from fastchain.utils import num_tokens_from_string
 
 
 def test_text_chunker():
@@ -213,3 +219,120 @@ def test_text_chunker():
         assert (
             len(ch) <= DEFAULT_CHUNK_SIZE +2
         ), f"Chunk size is invalid, {len(ch)} : DEFAULT: {DEFAULT_CHUNK_SIZE}"
+
+
+def test_text_chunker_tokens():
+    text = "Jobs remembered being impressed by his father’s focus on craftsmanship. " * 200
+    chunker = TextChunker(subdivide_strategy="tokens")
+    chunks = chunker.create_chunks(text)
+
+    assert len(chunks) > 1
+    assert chunks[0].start_index == 0 and chunks[-1].end_index == len(text)
+    for ch in chunks:
+        assert text[ch.start_index : ch.end_index] == ch.content
+        assert num_tokens_from_string(ch.content) <= MAX_CHUNK_SIZE_TOKENS
+
+
+def test_text_chunker_words_chunks_are_slices_of_the_text():
+    text = "Paul  Jobs\twas mustered out\n\nof the   Coast Guard after World War II. " * 50
+    for length_function in (len, num_tokens_from_string):
+        chunker = TextChunker(
+            subdivide_strategy="words",
+            text_chunk_size=60,
+            text_chunk_overlap=10,
+            text_length_function=length_function,
+        )
+        chunks = chunker.create_chunks(text)
+
+        assert len(chunks) > 1
+        for ch in chunks:
+            assert text[ch.start_index : ch.end_index] == ch.content
+            if length_function is len:
+                assert len(ch.content) <= 60
+
+
+def test_text_chunker_iter_matches_create_chunks():
+    text = "\n".join(
+        f"line {i}: the finance company where Paul worked transferred him down to Palo Alto."
+        for i in range(2000)
+    )
+    chunks = TextChunker().create_chunks(text)
+    streamed = list(TextChunker().create_chunks_iter(io.StringIO(text)))
+
+    assert [(ch.start_index, ch.end_index, ch.content) for ch in streamed] == [
+        (ch.start_index, ch.end_index, ch.content) for ch in chunks
+    ]
+
+
+def test_text_chunker_iter_with_words_longer_than_chunk_size():
+    # Log-like text whose URLs and ids are longer than a whole chunk
+    text = "\n".join(
+        f"GET https://example.com/{'x' * (i % 90)} id={'y' * 30} status {i}"
+        for i in range(500)
+    )
+    for chunk_size, chunk_overlap in [(20, 0), (45, 7), (100, 10)]:
+        settings = dict(
+            subdivide_strategy="words", text_chunk_size=chunk_size, text_chunk_overlap=chunk_overlap
+        )
+        chunks = TextChunker(**settings).create_chunks(text)
+        streamed = list(TextChunker(**settings).create_chunks_iter(io.StringIO(text)))
+
+        assert [(ch.start_index, ch.end_index, ch.content) for ch in streamed] == [
+            (ch.start_index, ch.end_index, ch.content) for ch in chunks
+        ]
+
+
+def test_text_chunker_iter_without_whitespace_holds_a_bounded_window():
+    # 10 MiB without a single whitespace, e.g. a minified or base64 blob
+    chunk_size, piece = 500, "x" * 65536
+    total = 160 * len(piece)
+    read = 0
+
+    def pieces():
+        nonlocal read
+        for _ in range(160):
+            read += len(piece)
+            yield piece
+
+    chunker = TextChunker(subdivide_strategy="words", text_chunk_size=chunk_size, text_chunk_overlap=50)
+    num_chunks = 0
+    for chunk in chunker.create_chunks_iter(pieces()):
+        # The word is hard-split at chunk_size, chunks are closed a piece behind the reader
+        start = num_chunks * chunk_size
+        assert (chunk.start_index, chunk.end_index) == (start, min(start + chunk_size, total))
+        assert read - chunk.end_index <= len(piece) + chunk_size
+        num_chunks += 1
+
+    assert chunk.end_index == read == total
+
+
+def test_chunk_many_matches_create_chunks():
+    texts = [
+        " ".join(f"word{i}_{j}" for j in range(1 + i * 37 % 400)) for i in range(12)
+    ]
+    settings = dict(subdivide_strategy="words", text_chunk_size=120, text_chunk_overlap=20)
+    expected = [
+        [(ch.start_index, ch.end_index, ch.content) for ch in TextChunker(**settings).create_chunks(text)]
+        for text in texts
+    ]
+
+    for workers in (1, 3):
+        document_ids = [uuid4() for _ in texts]
+        results = TextChunker(**settings).chunk_many(texts, document_ids, workers=workers)
+
+        assert [
+            [(ch.start_index, ch.end_index, ch.content) for ch in chunks] for chunks in results
+        ] == expected
+        assert all(
+            ch.document_id == document_id
+            for chunks, document_id in zip(results, document_ids)
+            for ch in chunks
+        )
+
+
+def test_chunk_many_rejects_unpicklable_settings():
+    chunker = TextChunker(text_length_function=lambda text: len(text.split()))
+
+    assert len(chunker.chunk_many(["a b c"], workers=1)) == 1
+    with pytest.raises(ValueError, match="length_function"):
+        chunker.chunk_many(["a b c", "d e f"], workers=2)
@@ -0,0 +1,79 @@
+import numpy as np
+
+from fastchain.datacleaners.dedup import ChunkDeduplicator
+from fastchain.document import TextChunk
+from fastchain.utils import shingle_hashes
+
+TEXT = (
+    "Licensed under the Apache License, Version 2.0 (the License); you may not use "
+    "this file except in compliance with the License. You may obtain a copy of the "
+    "License at http://www.apache.org/licenses/LICENSE-2.0 Unless required by "
+    "applicable law or agreed to in writing, software distributed under the License "
+    "is distributed on an AS IS BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND."
+)
+# One word changed, so a few shingles differ
+NEAR_DUPLICATE = TEXT.replace("software distributed", "code distributed")
+
+
+def jaccard(a: str, b: str) -> float:
+    a, b = shingle_hashes(a), shingle_hashes(b)
+    return len(np.intersect1d(a, b)) / len(np.union1d(a, b))
+
+
+def test_chunk_deduplicator():
+    other = "Fifty years later the fence still surrounds the back and side yards of the house."
+    chunks = [TextChunk(content=text) for text in (TEXT, TEXT, NEAR_DUPLICATE, other)]
+
+    deduplicator = ChunkDeduplicator(threshold=0.6)
+    kept = deduplicator.clean(chunks)
+
+    assert [chunk.content for chunk in kept] == [TEXT, other]
+    assert deduplicator.report() == {
+        "seen": 4,
+        "exact_duplicates": 1,
+        "near_duplicates": 1,
+        "dedup_ratio": 0.5,
+    }
+
+
+def test_chunk_deduplicator_link():
+    chunks = [TextChunk(content=TEXT), TextChunk(content=TEXT)]
+    kept = ChunkDeduplicator(mode="link").clean(chunks)
+
+    assert len(kept) == 2
+    assert kept[0].duplicate_of is None
+    assert kept[1].duplicate_of == str(chunks[0].id)
+
+
+def test_chunk_deduplicator_threshold():
+    similarity = jaccard(TEXT, NEAR_DUPLICATE)
+    assert 0.75 < similarity < 0.9
+
+    for threshold, expected in [(similarity - 0.15, [TEXT]), (min(similarity + 0.15, 1.0), [TEXT, NEAR_DUPLICATE])]:
+        deduplicator = ChunkDeduplicator(threshold=threshold)
+        kept = deduplicator.clean([TextChunk(content=TEXT), TextChunk(content=NEAR_DUPLICATE)])
+
+        assert [chunk.content for chunk in kept] == expected
+        assert deduplicator.num_exact_duplicates == 0
+
+
+def test_chunk_deduplicator_links_copies_of_near_duplicates_to_the_original():
+    chunks = [TextChunk(content=text) for text in (TEXT, NEAR_DUPLICATE, NEAR_DUPLICATE)]
+    kept = ChunkDeduplicator(threshold=0.6, mode="link").clean(chunks)
+
+    assert [chunk.duplicate_of for chunk in kept] == [None, str(chunks[0].id), str(chunks[0].id)]
+
+
+def test_chunk_deduplicator_grows_its_index(monkeypatch):
+    from fastchain.datacleaners import dedup
+
+    monkeypatch.setattr(dedup, "INITIAL_INDEX_CAPACITY", 2)
+    others = [f"Chunk number {i} talks about topic {i * 7} in its own words." for i in range(20)]
+    chunks = [TextChunk(content=text) for text in [TEXT, *others, NEAR_DUPLICATE, others[3]]]
+
+    deduplicator = ChunkDeduplicator(threshold=0.6)
+    kept = deduplicator.clean(chunks)
+
+    assert [chunk.content for chunk in kept] == [TEXT, *others]
+    assert len(deduplicator._signatures) == 32
+    assert deduplicator.num_near_duplicates == deduplicator.num_exact_duplicates == 1
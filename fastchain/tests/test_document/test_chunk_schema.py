@@ -0,0 +1,58 @@
+import pytest
+
+from fastchain.document import TextChunk
+from fastchain.document.chunk import schema
+from fastchain.tokenizer import count_tokens
+
+TEXT = "Jobs remembered being impressed by his father's focus on craftsmanship."
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    """Texts tokenized by chunk validation."""
+    texts = []
+
+    def spy(text):
+        texts.append(text)
+        return count_tokens(text)
+
+    monkeypatch.setattr(schema, "count_tokens", spy)
+    yield texts
+    schema.set_chunk_validation_mode(schema.DEFAULT_CHUNK_VALIDATION_MODE)
+
+
+def test_lazy_validation_trusts_num_tokens(counted):
+    schema.set_chunk_validation_mode("lazy")
+
+    assert TextChunk(content=TEXT, num_tokens=3).num_tokens == 3
+    assert counted == []
+    assert TextChunk(content=TEXT).num_tokens == count_tokens(TEXT)
+    assert counted == [TEXT]
+
+
+def test_strict_validation_recounts_wrong_num_tokens(counted):
+    schema.set_chunk_validation_mode("strict")
+
+    assert TextChunk(content=TEXT, num_tokens=3).num_tokens == count_tokens(TEXT)
+    assert counted == [TEXT]
+
+
+@pytest.mark.parametrize("mode", schema.CHUNK_VALIDATION_MODES)
+def test_validation_rejects_chunks_over_max_tokens(counted, monkeypatch, mode):
+    schema.set_chunk_validation_mode(mode)
+    monkeypatch.setattr(schema, "MAX_CHUNK_SIZE_TOKENS", count_tokens(TEXT) - 1)
+
+    with pytest.raises(ValueError, match="MAX_CHUNK_SIZE_TOKENS"):
+        TextChunk(content=TEXT)
+    # An understated count only passes when it is trusted
+    if mode == "lazy":
+        assert TextChunk(content=TEXT, num_tokens=1).num_tokens == 1
+    else:
+        with pytest.raises(ValueError, match="MAX_CHUNK_SIZE_TOKENS"):
+            TextChunk(content=TEXT, num_tokens=1)
+
+
+def test_set_chunk_validation_mode_rejects_unknown_modes():
+    with pytest.raises(ValueError, match="Invalid chunk validation mode"):
+        schema.set_chunk_validation_mode("eager")
+    assert schema.get_chunk_validation_mode() == schema.DEFAULT_CHUNK_VALIDATION_MODE
@@ -0,0 +1,40 @@
+from fastchain.chunker.text_chunker import TextChunker
+from fastchain.document import ChunkSource, ChunkView
+
+TEXT = "Café au lait — “naïve” résumé. " * 40 + "Zoë ate crème brûlée in São Paulo. " * 40
+
+
+def test_chunk_view_content_and_offsets():
+    data = TEXT.encode("utf-8")
+    source = ChunkSource(data, source_id="source")
+    start = data.index("naïve".encode("utf-8"))
+    end = start + len("naïve".encode("utf-8"))
+    view = ChunkView(source, start, end)
+
+    assert view.content == "naïve"
+    assert isinstance(view.raw, memoryview)
+    assert len(view) == end - start
+    assert view.char_offsets() == (TEXT.index("naïve"), TEXT.index("naïve") + len("naïve"))
+
+    chunk = view.to_chunk()
+    assert chunk.content == "naïve"
+    assert TEXT[chunk.start_index : chunk.end_index] == chunk.content
+
+
+def test_create_chunk_views_from_file(tmp_path):
+    path = tmp_path / "source.txt"
+    path.write_bytes(TEXT.encode("utf-8"))
+    chunker = TextChunker(subdivide_strategy="words", text_chunk_size=30, text_chunk_overlap=5)
+
+    views = chunker.create_chunk_views(ChunkSource.from_file(str(path)))
+    chunks = chunker.create_chunks(TEXT)
+
+    assert len(views) == len(chunks) > 1
+    assert all(view.source_id == str(path) for view in views)
+    for view in views:
+        chunk = view.to_chunk()
+        assert TEXT[chunk.start_index : chunk.end_index] == view.content == chunk.content
+        assert view.digest() == ChunkView(ChunkSource(TEXT), *view.char_offsets()).digest()
+    # Views of a string source use character offsets
+    string_views = chunker.create_chunk_views(TEXT)
+    assert [(view.start, view.end) for view in string_views] == [view.char_offsets() for view in views]
@@ -0,0 +1,41 @@
+import importlib
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture
+def fake_module(monkeypatch):
+    """Factory of fake modules, imported instead of the real ones until the end of the test.
+
+    `fake_module(name, **attrs)` returns the module `name` with the attributes `attrs`.
+    """
+
+    def install(name, **attrs):
+        module = types.ModuleType(name)
+        for attr, value in attrs.items():
+            setattr(module, attr, value)
+        monkeypatch.setitem(sys.modules, name, module)
+        return module
+
+    return install
+
+
+@pytest.fixture
+def import_fresh(monkeypatch):
+    """Factory importing modules again, against the fake modules installed before.
+
+    `import_fresh(*names)` imports every module of `names` again, in order, and
+    returns the last one. The modules imported before are restored at the end of
+    the test.
+    """
+
+    def import_modules(*names):
+        for name in names:
+            # Recorded by monkeypatch, so the previous module comes back, or none
+            monkeypatch.setitem(sys.modules, name, None)
+            del sys.modules[name]
+        return [importlib.import_module(name) for name in names][-1]
+
+    return import_modules
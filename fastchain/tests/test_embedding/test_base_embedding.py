@@ -0,0 +1,238 @@
+import asyncio
+import base64
+import time
+
+import numpy as np
+import pytest
+from docarray import DocList
+
+from fastchain.document import Document, Metadata, Page, TextChunk
+from fastchain.embedding.base import BaseEmbedding
+from fastchain.embedding.cache import EmbeddingCache
+from fastchain.embedding.rate_limit import RateLimitError
+from fastchain.embedding.result import PartialEmbeddingError, decode_embeddings
+
+
+class LengthEmbedding(BaseEmbedding):
+    """Embeds a text as its length, and records the batches it is called with."""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(tokenizer=str.split, **kwargs)
+        self.batches = []
+
+    def _get_embedding(self, content: str) -> np.ndarray:
+        return np.array([len(content)])
+
+    def _get_embeddings(self, contents):
+        self.batches.append(list(contents))
+        return [self._get_embedding(content) for content in contents]
+
+
+def make_document(texts):
+    chunks = [TextChunk(content=text) for text in texts]
+    page = Page(chunks=DocList[TextChunk](chunks))
+    return Document(metadata=Metadata(), pages=DocList[Page]([page]), chunks=DocList[TextChunk](chunks))
+
+
+def test_queued_document_embeddings_are_batched():
+    embedding = LengthEmbedding(embed_batch_size=3, max_batch_tokens=4)
+    documents = [make_document(["a b", "c", "a b"]), make_document(["d e f", "g", "h", "i"])]
+    for document in documents:
+        embedding.queue_document_for_embedding(document)
+
+    result = embedding.get_queued_document_embeddings()
+
+    # Distinct texts only, at most 3 texts and 4 tokens per batch
+    assert embedding.batches == [["a b", "c"], ["d e f", "g"], ["h", "i"]]
+    assert result.embeddings.dtype == np.float32 and len(result) == 7
+    result = result.to_dict()
+    for document in documents:
+        assert set(result[str(document.id)]) == {str(chunk.id) for chunk in document.chunks}
+        for chunk in document.chunks:
+            assert result[str(document.id)][str(chunk.id)][0] == len(chunk.content)
+
+
+def test_aget_queued_document_embeddings():
+    embedding = LengthEmbedding()
+    document = make_document(["a b", "c"])
+    embedding.queue_document_for_embedding(document)
+
+    result = asyncio.run(embedding.aget_queued_document_embeddings())
+
+    assert result.document(document.id)[:, 0].tolist() == [3, 1]
+
+
+def test_aget_queued_document_embeddings_retries_failed_batches(monkeypatch):
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+
+    class FlakyEmbedding(LengthEmbedding):
+        async def _aget_embeddings(self, contents):
+            self.batches.append(list(contents))
+            if len(self.batches) == 1:
+                raise RateLimitError("Too many requests", retry_after=1)
+            return [self._get_embedding(content) for content in contents]
+
+    embedding = FlakyEmbedding(embed_batch_size=1)
+    document = make_document(["a", "bb", "ccc"])
+    embedding.queue_document_for_embedding(document)
+
+    result = asyncio.run(embedding.aget_queued_document_embeddings())
+
+    # Only the batch that failed is sent again
+    assert sorted(map(tuple, embedding.batches)) == [("a",), ("a",), ("bb",), ("ccc",)]
+    assert result.document(document.id)[:, 0].tolist() == [1, 2, 3]
+
+
+def test_failed_aget_text_embeddings_caches_the_batches_that_went_through(monkeypatch):
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+
+    class FailingEmbedding(LengthEmbedding):
+        async def _aget_embeddings(self, contents):
+            self.batches.append(list(contents))
+            if contents == ["bb"]:
+                raise ValueError("bad batch")
+            return [self._get_embedding(content) for content in contents]
+
+    embedding = FailingEmbedding(embed_batch_size=1, max_retries=1, cache=EmbeddingCache())
+    with pytest.raises(PartialEmbeddingError, match="bad batch"):
+        asyncio.run(embedding.aget_text_embeddings(["a", "bb", "ccc"]))
+
+    embedding.batches.clear()
+    with pytest.raises(PartialEmbeddingError, match="bad batch"):
+        asyncio.run(embedding.aget_text_embeddings(["a", "bb", "ccc"]))
+    assert embedding.batches == [["bb"], ["bb"]]
+
+
+def test_failed_get_text_embeddings_caches_the_batches_that_went_through(monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+
+    class FailingEmbedding(LengthEmbedding):
+        def _get_embeddings(self, contents):
+            if contents == ["bb"]:
+                self.batches.append(list(contents))
+                raise ValueError("bad batch")
+            return super()._get_embeddings(contents)
+
+    embedding = FailingEmbedding(embed_batch_size=1, max_retries=1, cache=EmbeddingCache())
+    with pytest.raises(PartialEmbeddingError, match="bad batch"):
+        embedding.get_text_embeddings(["a", "bb", "ccc"])
+
+    embedding.batches.clear()
+    with pytest.raises(PartialEmbeddingError, match="bad batch"):
+        embedding.get_text_embeddings(["a", "bb", "ccc"])
+    assert embedding.batches == [["bb"], ["bb"]]
+
+
+def test_failed_batches_keep_the_embeddings_of_the_others(monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+
+    class FailingEmbedding(LengthEmbedding):
+        def _get_embeddings(self, contents):
+            if "bb" in contents:
+                raise ValueError("bad batch")
+            return super()._get_embeddings(contents)
+
+    embedding = FailingEmbedding(embed_batch_size=2, max_retries=0)
+    document = make_document(["a", "ccc", "bb", "dddd", "bb"])
+    embedding.queue_document_for_embedding(document)
+
+    with pytest.raises(PartialEmbeddingError) as info:
+        embedding.get_queued_document_embeddings()
+
+    error = info.value
+    # Distinct texts "a", "ccc" | "bb", "dddd", the second batch failed
+    assert error.failed_indices.tolist() == [2, 3]
+    assert error.embeddings[:2, 0].tolist() == [1, 3] and np.isnan(error.embeddings[2:]).all()
+    embeddings = error.result.document(document.id)[:, 0]
+    assert embeddings[:2].tolist() == [1, 3] and np.isnan(embeddings[2:]).all()
+
+
+def test_embeddings_are_attached_to_chunks_as_views():
+    from fastchain.vector_stores.base import VectorStore
+
+    class ListStore(VectorStore):
+        def __init__(self):
+            self.indexed = []
+
+        def _connect_to_store(self, connection_params):
+            pass
+
+        def index(self, data):
+            self.indexed.extend(data)
+            return data
+
+        def query_db(self):
+            pass
+
+        def update(self):
+            pass
+
+        def delete(self):
+            pass
+
+    embedding = LengthEmbedding()
+    document = make_document(["a b", "c", "d e f"])
+    embedding.queue_document_for_embedding(document)
+    result = embedding.get_queued_document_embeddings()
+
+    store = ListStore()
+    store.index_embeddings(result, document.chunks)
+
+    assert len(store.indexed) == 3
+    for chunk in document.chunks:
+        assert chunk.embedding.tolist() == [len(chunk.content)]
+        assert np.shares_memory(chunk.embedding, result.embeddings)
+
+
+def test_decode_embeddings_from_lists_and_base64():
+    vectors = np.array([[1.5, -2.0], [0.25, 4.0]], dtype="<f4")
+    data = [
+        {"index": 1, "embedding": base64.b64encode(vectors[1].tobytes()).decode()},
+        {"index": 0, "embedding": vectors[0].tolist()},
+    ]
+
+    matrix = decode_embeddings(data)
+
+    assert matrix.dtype == np.float32 and matrix.flags.c_contiguous
+    assert matrix.tolist() == vectors.tolist()
+
+
+def test_metrics_record_requests_tokens_and_cache_hits():
+    embedding = LengthEmbedding(embed_batch_size=2, cache=EmbeddingCache())
+    embedding.get_text_embeddings(["a b", "c", "d"])
+    embedding.get_text_embeddings(["a b", "e"])
+
+    metrics = embedding.metrics.snapshot()
+    assert metrics["requests"] == 3 and metrics["texts"] == 4 and metrics["tokens"] == 5
+    assert metrics["batch_size"]["buckets"][2] == 3
+    assert (metrics["cache_hits"], metrics["cache_misses"]) == (1, 4)
+    assert 'fastchain_embedding_requests_total{model="length"} 3' in embedding.metrics.to_prometheus(
+        labels={"model": "length"}
+    )
+
+    embedding.metrics.reset()
+    assert embedding.metrics.snapshot()["requests"] == 0
+
+
+def test_aget_chunk_embedding_without_tokenizer():
+    class UntokenizedEmbedding(BaseEmbedding):
+        def _get_embedding(self, content):
+            return np.array([len(content)])
+
+    embedding = UntokenizedEmbedding()
+
+    assert asyncio.run(embedding.aget_chunk_embedding(TextChunk(content="abc")))[0] == 3
+    # Nothing needs the tokens, they are not counted and exported as unknown
+    assert embedding.total_tokens_used is None and embedding.metrics.requests == 1
+    assert embedding.metrics.to_dict()["tokens"] is None
+    assert "tokens_total" not in embedding.metrics.to_prometheus()
+
+    embedding = UntokenizedEmbedding(max_batch_tokens=100)
+    assert embedding.get_text_embeddings(["abc"])[0, 0] == 3
+    assert embedding.total_tokens_used > 0
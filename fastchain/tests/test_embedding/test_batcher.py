@@ -0,0 +1,59 @@
+import asyncio
+
+from fastchain.embedding.batcher import EmbeddingMicroBatcher
+from fastchain.embedding.metrics import Histogram
+from fastchain.tests.test_embedding.test_base_embedding import LengthEmbedding
+
+
+def test_concurrent_requests_are_embedded_together():
+    embedding = LengthEmbedding(embed_batch_size=100)
+    batcher = EmbeddingMicroBatcher(embedding, max_batch_size=4, max_wait_ms=50)
+    texts = ["a" * length for length in range(1, 11)]
+
+    async def main():
+        return await asyncio.gather(*(batcher.embed(text) for text in texts))
+
+    results = asyncio.run(main())
+
+    assert [result[0] for result in results] == list(range(1, 11))
+    assert [len(batch) for batch in embedding.batches] == [4, 4, 2]
+    assert batcher.batch_sizes.count == 3 and batcher.latencies.count == 10
+
+
+def test_errors_reach_every_waiting_request():
+    class FailingEmbedding(LengthEmbedding):
+        async def _aget_embeddings(self, contents):
+            raise ValueError("model is down")
+
+    batcher = EmbeddingMicroBatcher(FailingEmbedding(max_retries=0), max_wait_ms=0)
+
+    async def main():
+        return await asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True)
+
+    assert [str(result) for result in asyncio.run(main())] == ["model is down"] * 2
+
+
+def test_only_the_requests_of_failed_model_batches_fail():
+    class FailingEmbedding(LengthEmbedding):
+        async def _aget_embeddings(self, contents):
+            if "bb" in contents:
+                raise ValueError("bad batch")
+            return await super()._aget_embeddings(contents)
+
+    batcher = EmbeddingMicroBatcher(FailingEmbedding(embed_batch_size=1, max_retries=0), max_wait_ms=50)
+
+    async def main():
+        return await asyncio.gather(*(batcher.embed(text) for text in ["a", "bb", "ccc"]), return_exceptions=True)
+
+    a, bb, ccc = asyncio.run(main())
+
+    assert (a[0], str(bb), ccc[0]) == (1, "bad batch", 3)
+
+
+def test_histogram_snapshot_is_cumulative():
+    histogram = Histogram([1, 2, 4])
+    for value in [0.5, 1, 3, 10]:
+        histogram.observe(value)
+
+    assert histogram.snapshot()["buckets"] == {1: 2, 2: 2, 4: 3, float("inf"): 4}
+    assert histogram.quantile(0.5) == 1 and histogram.sum == 14.5
@@ -0,0 +1,48 @@
+import numpy as np
+
+from fastchain.embedding.cache import EmbeddingCache
+from fastchain.tests.test_embedding.test_base_embedding import LengthEmbedding, make_document
+
+
+def test_cache_is_keyed_by_model_and_normalized_content(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), max_memory_items=1)
+    cache.put_many("model-a", ["a  b", "c"], [np.array([1.0, 2.0]), np.array([3.0, 4.0])])
+
+    hits = cache.get_many("model-a", ["a b\n", "c", "d"])
+    assert hits[0].dtype == np.float32
+    assert hits[0].tolist() == [1.0, 2.0] and hits[1].tolist() == [3.0, 4.0]
+    assert hits[2] is None
+    assert cache.get("model-b", "c") is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    # The disk tier survives the process
+    cache.close()
+    assert EmbeddingCache(str(tmp_path / "embeddings.sqlite")).get("model-a", "c").tolist() == [3.0, 4.0]
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), max_memory_items=0, max_disk_bytes=16)
+    cache.put("model", "a", np.zeros(2))
+    cache.put("model", "b", np.zeros(2))
+    cache.get("model", "a")
+    cache.put("model", "c", np.zeros(2))
+
+    assert cache.get("model", "a") is not None
+    assert cache.get("model", "b") is None
+    assert cache.stats()["disk_bytes"] == 16
+
+
+def test_cached_texts_are_not_embedded_again():
+    cache = EmbeddingCache()
+    embedding = LengthEmbedding(cache=cache)
+    embedding.queue_document_for_embedding(make_document(["a b", "c"]))
+    embedding.get_queued_document_embeddings()
+
+    embedding.batches.clear()
+    document = make_document(["a b", "c", "d e"])
+    embedding.queue_document_for_embedding(document)
+    result = embedding.get_queued_document_embeddings()
+
+    assert embedding.batches == [["d e"]]
+    assert embedding.total_tokens_used == 5
+    assert result.document(document.id)[:, 0].tolist() == [3, 1, 3]
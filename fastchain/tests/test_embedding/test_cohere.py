@@ -0,0 +1,61 @@
+import asyncio
+import types
+
+import numpy as np
+import pytest
+
+
+class FakeClient:
+    """Embeds a text as its length, recording the clients created and their requests."""
+
+    instances = []
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.requests = []
+        FakeClient.instances.append(self)
+
+    def embed(self, texts, model):
+        self.requests.append(list(texts))
+        return types.SimpleNamespace(embeddings=[[len(text) + 0.5, -1.0] for text in texts])
+
+
+@pytest.fixture
+def cohere_embedding(fake_module, import_fresh):
+    FakeClient.instances = []
+    fake_module("cohere", Client=FakeClient)
+    return import_fresh("fastchain.embedding.cohere")
+
+
+def test_client_is_created_once_on_first_use(cohere_embedding):
+    embedding = cohere_embedding.CohereEmbedding(api_key="key", tokenizer=str.split)
+    assert FakeClient.instances == []
+
+    embedding.get_text_embeddings(["a"])
+    asyncio.run(embedding.aget_text_embeddings(["b", "c"], batch_size=1))
+
+    assert len(FakeClient.instances) == 1 and FakeClient.instances[0].api_key == "key"
+    assert sorted(FakeClient.instances[0].requests) == [["a"], ["b"], ["c"]]
+
+
+def test_batches_are_capped_and_parsed_as_float32(cohere_embedding):
+    with pytest.raises(ValueError, match="96"):
+        cohere_embedding.CohereEmbedding(embed_batch_size=97)
+
+    embedding = cohere_embedding.CohereEmbedding(api_key="key", tokenizer=str.split)
+    texts = [f"text {i}" for i in range(200)]
+    embeddings = embedding.get_text_embeddings(texts)
+
+    assert [len(batch) for batch in FakeClient.instances[0].requests] == [96, 96, 8]
+    assert embeddings.dtype == np.float32 and embeddings.shape == (200, 2)
+    assert embeddings[:, 0].tolist() == [len(text) + 0.5 for text in texts]
+
+
+def test_batch_size_is_capped_at_the_request_limit(cohere_embedding):
+    embedding = cohere_embedding.CohereEmbedding(api_key="key", tokenizer=str.split)
+    texts = [f"text {i}" for i in range(200)]
+
+    embedding.get_text_embeddings(texts, batch_size=200)
+    asyncio.run(embedding.aget_text_embeddings(texts[::-1], batch_size=200))
+
+    assert max(len(batch) for batch in FakeClient.instances[0].requests) == 96
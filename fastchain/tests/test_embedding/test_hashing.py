@@ -0,0 +1,37 @@
+import numpy as np
+
+from fastchain.embedding.hashing import HashingEmbedding
+
+
+def test_hashing_embeddings_are_deterministic_and_normalized():
+    texts = ["the quick brown fox", "the quick brown dog", "lorem ipsum dolor", ""]
+    embedding = HashingEmbedding(dim=256)
+
+    embeddings = embedding.get_text_embeddings(texts)
+
+    assert embeddings.shape == (4, 256) and embeddings.dtype == np.float32
+    assert np.allclose(np.linalg.norm(embeddings[:3], axis=1), 1)
+    assert not embeddings[3].any()
+    # Batched and single embeddings match, as do embeddings of a fresh instance
+    assert np.allclose(embeddings[1], HashingEmbedding(dim=256)._get_embedding(texts[1]))
+    assert embeddings[0] @ embeddings[1] > 0.5 > abs(embeddings[0] @ embeddings[2])
+
+
+def test_char_ngrams_do_not_span_texts():
+    embedding = HashingEmbedding(dim=512, analyzer="char")
+
+    batched = embedding._get_embeddings(["abcd", "efgh"])
+
+    assert np.allclose(batched[1], embedding._get_embedding("efgh"))
+
+
+def test_idf_downweights_common_words():
+    corpus = ["common alpha", "common beta", "common gamma", "common delta"]
+    embedding = HashingEmbedding(dim=4096, ngram_range=(1, 1), use_idf=True).fit(corpus)
+
+    vector = embedding._get_embedding("common alpha")
+
+    unweighted = HashingEmbedding(dim=4096, ngram_range=(1, 1))
+    common, alpha = unweighted._get_embedding("common"), unweighted._get_embedding("alpha")
+    assert abs(vector @ common) < abs(vector @ alpha)
+    assert embedding.model_id != HashingEmbedding(dim=4096, ngram_range=(1, 1), use_idf=True).model_id
@@ -0,0 +1,70 @@
+import asyncio
+import base64
+import types
+
+import numpy as np
+import pytest
+
+from fastchain.embedding.rate_limit import RateLimiter
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RateLimitedError(Exception):
+    """Like openai.error.RateLimitError, with the headers of the response."""
+
+    def __init__(self, retry_after: str) -> None:
+        super().__init__("Rate limit reached")
+        self.headers = {"Retry-After": retry_after}
+
+
+@pytest.fixture
+def fake_openai(fake_module, import_fresh):
+    """The openai module, answering with a 429 first and with embeddings after."""
+    calls = []
+
+    async def acreate(input, model, **kwargs):
+        calls.append(list(input))
+        if len(calls) == 1:
+            raise RateLimitedError("5")
+        data = [
+            {"index": i, "embedding": base64.b64encode(np.full(2, len(text), dtype="<f4").tobytes()).decode()}
+            for i, text in enumerate(input)
+        ]
+        return types.SimpleNamespace(data=data)
+
+    fake_module(
+        "openai", api_key="EMPTY", api_type="open_ai", Embedding=types.SimpleNamespace(acreate=acreate)
+    )
+    # Import the modules using openai again, against the fake one
+    return import_fresh("fastchain.llms.openai_utils", "fastchain.embedding.openai"), calls
+
+
+def test_rate_limited_requests_wait_for_retry_after(fake_openai, monkeypatch):
+    openai_embedding, calls = fake_openai
+    clock = FakeClock()
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter(requests_per_minute=6, clock=clock)
+    embedding = openai_embedding.OpenAIEmbedding(tokenizer=str.split, rate_limiter=limiter)
+
+    embeddings = asyncio.run(embedding.aget_text_embeddings(["a", "bb"]))
+
+    assert embeddings[:, 0].tolist() == [1, 2]
+    # The 429 is seen by the retry loop itself, not hidden behind another retry
+    assert calls == [["a", "bb"], ["a", "bb"]]
+    assert embedding.metrics.retries == 1
+    # The retry waits for the Retry-After, then for the bucket the pause emptied
+    # to refill one request, at one request every 10 seconds
+    assert sleeps == [5, pytest.approx(5)]
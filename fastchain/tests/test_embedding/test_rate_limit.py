@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import numpy as np
+
+from fastchain.embedding.base import BaseEmbedding
+from fastchain.embedding.rate_limit import RateLimiter, RateLimitError, retry_after_seconds
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_rate_limiter_waits_for_tokens(monkeypatch):
+    clock = FakeClock()
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600, clock=clock)
+
+    async def run():
+        await limiter.acquire(500)
+        await limiter.acquire(200)
+        limiter.pause(10)
+        await limiter.acquire(0)
+
+    asyncio.run(run())
+
+    # 100 tokens were left, 100 more refill in 10 seconds; then the pause holds 10 seconds
+    assert sleeps == [10.0, 10.0]
+
+
+def test_get_text_embeddings_waits_for_the_rate_limiter(monkeypatch):
+    clock = FakeClock()
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(time, "sleep", fake_sleep)
+
+    class LengthEmbedding(BaseEmbedding):
+        def _get_embedding(self, content):
+            return np.array([len(content)])
+
+    embedding = LengthEmbedding(
+        tokenizer=str.split,
+        embed_batch_size=2,
+        rate_limiter=RateLimiter(tokens_per_minute=6, clock=clock),
+    )
+
+    embedding.get_text_embeddings(["a b c", "d e", "f g h", "i"])
+
+    # 5 tokens in the first batch, the 4 of the second refill in 30 seconds
+    assert sleeps == [30.0]
+
+
+def test_retry_after_seconds():
+    class HTTPError(Exception):
+        headers = {"Retry-After": "7"}
+
+    assert retry_after_seconds(RateLimitError(retry_after=3)) == 3
+    assert retry_after_seconds(HTTPError()) == 7
+    assert retry_after_seconds(ValueError()) is None
@@ -0,0 +1,107 @@
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+
+class FakeTokenizer:
+    def __call__(self, texts, **kwargs):
+        return {"input_ids": [text.split() for text in texts]}
+
+
+class FakeSentenceTransformer:
+    """Embeds a text as its number of words and its length, recording the forward passes."""
+
+    max_seq_length = 128
+
+    def __init__(self, model_name, device=None):
+        self.tokenizer = FakeTokenizer()
+        self.batches = []
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+    def encode(self, texts, batch_size, convert_to_numpy, show_progress_bar):
+        self.batches.append(list(texts))
+        return np.array([[len(text.split()), len(text)] for text in texts], dtype=np.float64)
+
+
+@pytest.fixture
+def sentence_transformer(fake_module, import_fresh):
+    fake_module("sentence_transformers", SentenceTransformer=FakeSentenceTransformer)
+    return import_fresh("fastchain.embedding.sentance_transformer")
+
+
+class WorkerSentenceTransformer(FakeSentenceTransformer):
+    """Embeds a text as its number of words, with the process, threads and device encoding it."""
+
+    def __init__(self, model_name, device=None):
+        super().__init__(model_name, device)
+        self.device = device
+
+    def encode(self, texts, batch_size, convert_to_numpy, show_progress_bar):
+        num_threads = sys.modules["torch"].num_threads
+        return np.array([[len(text.split()), os.getpid(), num_threads, self.device == "cpu"] for text in texts])
+
+
+def init_fake_worker(model_name, device, num_threads):
+    """Initializer of the spawned workers, which do not inherit the fake modules."""
+    sys.modules["sentence_transformers"] = types.ModuleType("sentence_transformers")
+    sys.modules["sentence_transformers"].SentenceTransformer = WorkerSentenceTransformer
+    from fastchain.embedding import sentance_transformer
+
+    # Installed after docarray is imported, which would take it for the real torch
+    torch = types.ModuleType("torch")
+    torch.set_num_threads = lambda n: setattr(torch, "num_threads", n)
+    sys.modules["torch"] = torch
+    sentance_transformer._init_sentence_transformer_worker(model_name, device, num_threads)
+
+
+def test_embeddings_are_in_input_order(sentence_transformer):
+    embedding = sentence_transformer.SentanceTransformerEmbedding("fake", batch_size=2)
+    texts = ["one two three four", "one", "one two three four five six", "one two", "one two three"]
+
+    embeddings = embedding.get_text_embeddings(texts)
+
+    assert embeddings.dtype == np.float32
+    assert embeddings.tolist() == [[len(text.split()), len(text)] for text in texts]
+    # Forward passes hold texts of similar lengths
+    assert embedding._model.batches == [
+        ["one", "one two"],
+        ["one two three", "one two three four"],
+        ["one two three four five six"],
+    ]
+
+
+def test_empty_input_shape(sentence_transformer):
+    embedding = sentence_transformer.SentanceTransformerEmbedding("fake")
+
+    assert embedding._get_embeddings([]).shape == (0, 2)
+    assert embedding.get_text_embeddings([]).shape[0] == 0
+
+
+def test_embeddings_are_encoded_by_worker_processes(sentence_transformer, monkeypatch):
+    monkeypatch.setattr(sentence_transformer, "_init_sentence_transformer_worker", init_fake_worker)
+    embedding = sentence_transformer.SentanceTransformerEmbedding("fake", batch_size=2, num_processes=2)
+    texts = ["one two three four", "one", "one two three four five six", "one two", "one two three"]
+
+    try:
+        embeddings = embedding.get_text_embeddings(texts)
+    finally:
+        embedding.close()
+
+    assert embeddings[:, 0].tolist() == [len(text.split()) for text in texts]
+    assert os.getpid() not in embeddings[:, 1]
+    # Every worker loaded the model on CPU and uses its share of the cores
+    assert embeddings[:, 2].tolist() == [max(1, os.cpu_count() // 2)] * len(texts)
+    assert embeddings[:, 3].all()
+
+
+def test_worker_processes_only_run_on_cpu(sentence_transformer):
+    with pytest.raises(ValueError, match="cuda"):
+        sentence_transformer.SentanceTransformerEmbedding("fake", device="cuda", num_processes=2)
+
+    embedding = sentence_transformer.SentanceTransformerEmbedding("fake", num_processes=2)
+    assert embedding._device == "cpu"
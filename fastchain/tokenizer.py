@@ -0,0 +1,68 @@
+"""Process-wide tokenizer registry.
+
+Looking up a tiktoken encoding is comparatively expensive, so every encoder is
+resolved once per model (or encoding name) and shared by the whole process.
+All token counting in fastchain should go through this module.
+"""
+import os
+from functools import lru_cache
+from typing import List, Sequence
+
+import tiktoken
+
+DEFAULT_TOKENIZER_MODEL = "gpt-3.5-turbo"
+
+# Number of threads tiktoken uses for batch encoding
+DEFAULT_NUM_THREADS = os.cpu_count() or 1
+
+
+@lru_cache(maxsize=None)
+def get_encoder(model: str = DEFAULT_TOKENIZER_MODEL) -> tiktoken.Encoding:
+    """Return the cached tiktoken encoder for a model or an encoding name.
+
+    Args:
+        model (str): Model name (e.g. "gpt-3.5-turbo") or encoding name
+            (e.g. "cl100k_base").
+
+    Returns:
+        tiktoken.Encoding: Encoder shared across the process.
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(model)
+
+
+def encode(text: str, model: str = DEFAULT_TOKENIZER_MODEL) -> List[int]:
+    """Encode a single string into token ids."""
+    return get_encoder(model).encode_ordinary(text)
+
+
+def encode_batch(
+    texts: Sequence[str],
+    model: str = DEFAULT_TOKENIZER_MODEL,
+    num_threads: int = DEFAULT_NUM_THREADS,
+) -> List[List[int]]:
+    """Encode many strings at once using tiktoken's multithreaded batch encoder."""
+    return get_encoder(model).encode_ordinary_batch(
+        list(texts), num_threads=num_threads
+    )
+
+
+def decode(tokens: Sequence[int], model: str = DEFAULT_TOKENIZER_MODEL) -> str:
+    """Decode token ids back into a string."""
+    return get_encoder(model).decode(list(tokens))
+
+
+def count_tokens(text: str, model: str = DEFAULT_TOKENIZER_MODEL) -> int:
+    """Return the number of tokens in a text string."""
+    return len(encode(text, model))
+
+
+def count_tokens_batch(
+    texts: Sequence[str],
+    model: str = DEFAULT_TOKENIZER_MODEL,
+    num_threads: int = DEFAULT_NUM_THREADS,
+) -> List[int]:
+    """Return the number of tokens of every string in `texts`."""
+    return [len(tokens) for tokens in encode_batch(texts, model, num_threads)]
@@ -2,8 +2,12 @@ import re
 import os
 import base64
 import mimetypes
+import zlib
 from typing import List, Dict, Optional, Union
-import tiktoken
+
+import numpy as np
+
+from fastchain.tokenizer import count_tokens
 
 
 def is_url(string: str) -> bool:
@@ -81,6 +85,38 @@ def num_tokens_from_string(
     string: str, encoding_name: str = "gpt-3.5-turbo"
 ) -> int:
     """Returns the number of tokens in a text string."""
-    encoding = tiktoken.encoding_for_model(encoding_name)
-    num_tokens = len(encoding.encode(string))
-    return num_tokens
+    return count_tokens(string, encoding_name)
+
+
+def shingle_hashes(text: str, ngram_size: int = 5) -> np.ndarray:
+    """Stable 64-bit hashes of the distinct lowercased word n-grams of a text.
+
+    Every word is hashed once with crc32, the n-gram hashes are then combined
+    with vectorized NumPy arithmetic. Texts with fewer than `ngram_size` words
+    yield a single n-gram of all their words.
+
+    Args:
+        text (str): Input text
+        ngram_size (int): Number of words per n-gram
+
+    Returns:
+        np.ndarray: Sorted unique uint64 n-gram hashes, empty for blank text
+    """
+    words = text.lower().split()
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+
+    word_hashes = np.fromiter(
+        (zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64, count=len(words)
+    )
+    ngram_size = min(ngram_size, len(words))
+    num_ngrams = len(words) - ngram_size + 1
+    hashes = np.zeros(num_ngrams, dtype=np.uint64)
+    # uint64 arithmetic wraps around, which is what the hash relies on
+    for k in range(ngram_size):
+        hashes = hashes * np.uint64(0x100000001B3) + word_hashes[k : k + num_ngrams]
+    # Finalize (splitmix64) so that similar n-grams get unrelated hashes
+    hashes ^= hashes >> np.uint64(33)
+    hashes *= np.uint64(0xFF51AFD7ED558CCD)
+    hashes ^= hashes >> np.uint64(33)
+    return np.unique(hashes)
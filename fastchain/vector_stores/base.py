@@ -4,6 +4,7 @@ from typing import Union
 from docarray import DocList
 
 from fastchain.chunker.schema import Chunk
+from fastchain.embedding.result import EmbeddingBatchResult
 
 
 class VectorStore(ABC):
@@ -15,6 +16,15 @@ class VectorStore(ABC):
     def index(self, data: Union[DocList, Chunk]):
         ...
 
+    def index_embeddings(self, embeddings: EmbeddingBatchResult, chunks: DocList):
+        """Index chunks with their embeddings from a batch result.
+
+        The embedding of every chunk is a view of its row of the result matrix,
+        nothing is copied before the store serializes it.
+        """
+        embeddings.attach(chunks)
+        return self.index(chunks)
+
     @abstractmethod
     def query_db(self):
         ...